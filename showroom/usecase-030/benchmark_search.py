@@ -0,0 +1,109 @@
+"""
+商品検索のベンチマーク
+
+合成した大規模な商品カタログに対して、従来の線形スキャンによる検索と
+n-gram転置インデックス（search_index.NgramIndex）による検索の処理時間を比較します。
+
+使い方:
+    python benchmark_search.py --products 100000 --queries 200
+"""
+
+import argparse
+import random
+import time
+
+from search_index import NgramIndex
+
+CATEGORIES = ["キッチン家電", "生活家電", "空調家電", "美容家電", "オーディオ"]
+NOUNS = [
+    "コーヒーメーカー", "トースター", "ブレンダー", "炊飯器", "電子レンジ", "掃除機",
+    "加湿器", "除湿機", "空気清浄機", "ドライヤー", "ヘッドホン", "スピーカー",
+]
+ADJECTIVES = ["プレミアム", "ハイエンド", "コンパクト", "スマート", "デジタル", "パワー"]
+PHRASES = [
+    "温度制御機能を搭載", "スマートフォンで遠隔操作が可能", "静音設計で夜間も快適",
+    "自動電源オフで安心", "お手入れ簡単な着脱式パーツ", "Wi-Fi接続に対応",
+    "AIが運転を自動調整", "省エネ性能に優れた", "大容量タンクを採用",
+]
+QUERIES = ["コーヒー", "スマート", "静音", "Wi-Fi", "炊飯", "ドライヤー 静音", "省エネ", "AI", "加湿器"]
+
+
+def generate_catalog(size, seed=0):
+    """合成した商品カタログを生成します。"""
+    rng = random.Random(seed)
+    products = {}
+    for i in range(size):
+        noun = rng.choice(NOUNS)
+        products[f"SKU-{i:07d}"] = {
+            "name": f"{rng.choice(ADJECTIVES)}{noun} {i}",
+            "description": "。".join(rng.sample(PHRASES, 3)) + f"。{noun}の定番モデル。",
+            "category": rng.choice(CATEGORIES),
+        }
+    return products
+
+
+def linear_search(products, query, category=None):
+    """従来の実装と同じ線形スキャンによる検索"""
+    results = []
+    for product_id, product in products.items():
+        if query.lower() in product["name"].lower() or query.lower() in product["description"].lower():
+            if category is None or product["category"] == category:
+                results.append(product_id)
+    return results
+
+
+def run_benchmark(num_products, num_queries, seed=0):
+    """ベンチマークを実行して結果を表示します。"""
+    products = generate_catalog(num_products, seed)
+    rng = random.Random(seed)
+    # よく使われる語に加えて、型番のような絞り込みの強いクエリも混ぜる
+    workload = [
+        (
+            rng.choice(QUERIES) if i % 2 == 0 else str(rng.randrange(num_products)),
+            rng.choice([None] + CATEGORIES),
+        )
+        for i in range(num_queries)
+    ]
+
+    start = time.perf_counter()
+    index = NgramIndex({"name": 3, "description": 1})
+    for product_id, product in products.items():
+        index.add(product_id, product, category=product["category"])
+    build_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    linear_counts = [len(linear_search(products, q, c)) for q, c in workload]
+    linear_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    index_counts = [len(index.search(q, category=c)) for q, c in workload]
+    index_time = time.perf_counter() - start
+
+    # 空白を含まないクエリは線形スキャンと同じ件数になるはず
+    mismatches = sum(
+        1
+        for (q, _), a, b in zip(workload, linear_counts, index_counts)
+        if " " not in q and a != b
+    )
+
+    print(f"商品数: {num_products:,} / クエリ数: {num_queries:,}")
+    print(f"インデックス構築: {build_time:.2f} 秒")
+    print(f"線形スキャン:     {linear_time:.3f} 秒 ({linear_time / num_queries * 1000:.2f} ms/クエリ)")
+    print(f"n-gramインデックス: {index_time:.3f} 秒 ({index_time / num_queries * 1000:.2f} ms/クエリ)")
+    if index_time > 0:
+        print(f"高速化: {linear_time / index_time:.1f} 倍")
+    print(f"件数の不一致: {mismatches}")
+
+
+def main():
+    """メイン関数"""
+    parser = argparse.ArgumentParser(description="商品検索のベンチマーク")
+    parser.add_argument("--products", type=int, default=100000, help="生成する商品数")
+    parser.add_argument("--queries", type=int, default=200, help="実行するクエリ数")
+    parser.add_argument("--seed", type=int, default=0, help="乱数シード")
+    args = parser.parse_args()
+    run_benchmark(args.products, args.queries, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -9,12 +9,12 @@
 import os
 import sys
 import json
+import uuid
 from datetime import datetime
 from typing import Dict, List, Optional, Any, Union
-from pydantic import BaseModel, Field
 from dotenv import load_dotenv
 import openai
-from flask import Flask, request, jsonify, render_template
+from flask import Flask, Response, request, jsonify, render_template, stream_with_context
 
 # 商品データを読み込み
 from product_data import (
@@ -24,6 +24,10 @@ from product_data import (
     get_policy,
     get_order_status,
 )
+from prompt_config import TOOLS, INSTRUCTIONS, PROMPT_VERSION
+from session_store import create_session_store, new_session, append_history
+from tool_cache import cache_stats
+from tool_dispatcher import ToolRegistry
 
 # Python 3.7以降の場合、標準入出力のエンコーディングをUTF-8に設定
 if sys.version_info >= (3, 7):
@@ -44,155 +48,33 @@ def setup_environment():
     return api_key
 
 
-# --- ツール関数のモデル定義 ---
+def setup_tool_registry():
+    """ツール名と実行する関数の対応を登録したレジストリを作成します。"""
+    registry = ToolRegistry(max_workers=5, default_timeout=10.0)
+    registry.register("get_product_info", get_product_info)
+    registry.register("search_products", search_products)
+    registry.register("get_faq", get_faq)
+    registry.register("get_policy", get_policy)
+    registry.register("get_order_status", get_order_status, timeout=15.0)
+    return registry
 
-class ProductInfoRequest(BaseModel):
-    """商品情報取得のリクエストモデル"""
-    product_id: str = Field(..., description="商品ID（例: TS-100）")
 
+TOOL_REGISTRY = setup_tool_registry()
 
-class SearchProductsRequest(BaseModel):
-    """商品検索のリクエストモデル"""
-    query: str = Field(..., description="検索キーワード")
-    category: Optional[str] = Field(None, description="商品カテゴリ（指定しない場合は全カテゴリから検索）")
 
+# --- チャットボット処理関数 ---
 
-class FaqRequest(BaseModel):
-    """FAQ検索のリクエストモデル"""
-    query: Optional[str] = Field(None, description="検索キーワード（指定しない場合は全FAQを取得）")
-
-
-class PolicyRequest(BaseModel):
-    """ポリシー情報取得のリクエストモデル"""
-    policy_type: str = Field(..., description="ポリシータイプ（shipping, returns, warranty, privacy）")
-
-
-class OrderStatusRequest(BaseModel):
-    """注文状況取得のリクエストモデル"""
-    order_id: str = Field(..., description="注文ID（例: ORD-12345）")
-
-
-# --- ツール定義 ---
-
-def setup_tools():
-    """ツール定義を設定します。"""
-    return [
-        {
-            "type": "function",
-            "name": "get_product_info",
-            "description": "商品IDを指定して商品の詳細情報を取得します",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "product_id": {
-                        "type": "string",
-                        "description": "商品ID（例: TS-100）"
-                    }
-                },
-                "required": ["product_id"]
-            }
-        },
-        {
-            "type": "function",
-            "name": "search_products",
-            "description": "キーワードで商品を検索します",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "query": {
-                        "type": "string",
-                        "description": "検索キーワード"
-                    },
-                    "category": {
-                        "type": "string",
-                        "description": "商品カテゴリ（指定しない場合は全カテゴリから検索）"
-                    }
-                },
-                "required": ["query"]
-            }
-        },
-        {
-            "type": "function",
-            "name": "get_faq",
-            "description": "よくある質問（FAQ）を検索します",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "query": {
-                        "type": "string",
-                        "description": "検索キーワード（指定しない場合は全FAQを取得）"
-                    }
-                }
-            }
-        },
-        {
-            "type": "function",
-            "name": "get_policy",
-            "description": "会社のポリシー情報を取得します",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "policy_type": {
-                        "type": "string",
-                        "description": "ポリシータイプ（shipping, returns, warranty, privacy）"
-                    }
-                },
-                "required": ["policy_type"]
-            }
-        },
-        {
-            "type": "function",
-            "name": "get_order_status",
-            "description": "注文IDを指定して注文状況を確認します",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "order_id": {
-                        "type": "string",
-                        "description": "注文ID（例: ORD-12345）"
-                    }
-                },
-                "required": ["order_id"]
-            }
-        }
-    ]
-
+# セッションに保存する直近の会話履歴の件数（サーバー側の会話チェーンが失効した場合のフォールバック用）
+MAX_SESSION_HISTORY = 10
 
-# --- チャットボット処理関数 ---
 
-def process_chat(client, user_message, conversation_history=None):
+def build_messages(user_message, conversation_history=None):
     """
-    ユーザーからのメッセージを処理し、適切な応答を生成します。
-    
-    Args:
-        client (openai.Client): OpenAIクライアント
-        user_message (str): ユーザーからのメッセージ
-        conversation_history (list, optional): 過去の会話履歴
-    
+    会話履歴と現在のユーザーメッセージから、APIに送信する入力を作成します。
+
     Returns:
-        dict: 応答メッセージとステータス
-    """
-    tools = setup_tools()
-    instructions = """
-    あなたは家電製品を販売するオンラインショップのカスタマーサポートアシスタントです。
-    親切、丁寧、プロフェッショナルな対応を心がけ、必要に応じて提供されたツールを使用して
-    お客様のお問い合わせに回答してください。
-    
-    以下のガイドラインに従ってください：
-    1. 常に礼儀正しく、敬語を使って対応する
-    2. 質問に対しては具体的かつ簡潔に回答する
-    3. 商品や注文に関する質問には、必ずツールを使用して正確な情報を提供する
-    4. わからないことや情報がない場合は、誤った情報を提供せず、正直に伝える
-    5. 複雑な問題については、カスタマーサポート窓口への連絡を案内する
-    6. 個人情報やセキュリティに関する事項は慎重に扱う
-    
-    お客様が以下のような質問をした場合は、対応するツールを使用してください：
-    - 商品に関する質問 → get_product_info または search_products
-    - 注文や配送に関する質問 → get_order_status
-    - 返品や保証に関する質問 → get_policy
-    - よくある質問 → get_faq
+        tuple: (入力メッセージのリスト, 前回のレスポンスID)
     """
-    
     # 会話履歴がある場合は、それを含めてリクエストを作成
     messages = []
     previous_response_id = None
@@ -208,67 +90,134 @@ def process_chat(client, user_message, conversation_history=None):
     # 現在のユーザーメッセージを追加
     messages.append({"role": "user", "content": user_message})
     
-    # OpenAI APIを呼び出し
+    return messages, previous_response_id
+
+
+def build_session_messages(user_message, session, fallback_to_history=True):
+    """
+    セッションの状態から、APIに送信する入力を作成します。
+
+    前回のレスポンスIDがある場合は新しいユーザーメッセージだけを送信し、
+    会話の文脈はサーバー側の会話チェーンから引き継ぎます。
+
+    Returns:
+        tuple: (入力メッセージのリスト, 前回のレスポンスID, 会話チェーン失効時に送信する入力)
+    """
+    user_input = {"role": "user", "content": user_message}
+    local_messages = session.get("history", []) + [user_input] if fallback_to_history else [user_input]
+    
+    if session.get("response_id"):
+        return [user_input], session["response_id"], local_messages
+    return local_messages, None, None
+
+
+def is_expired_chain_error(error):
+    """前回のレスポンスIDが見つからない（会話チェーンが失効した）ことを示すエラーか判定します。"""
+    if isinstance(error, openai.NotFoundError):
+        return True
+    return isinstance(error, openai.BadRequestError) and "previous_response" in str(error)
+
+
+def create_initial_response(client, messages, previous_response_id, fallback_messages=None, **kwargs):
+    """
+    ツール定義付きで最初のリクエストを送信します。
+
+    前回のレスポンスIDの会話チェーンが失効していた場合は、fallback_messages
+    （セッションに保存した直近の会話履歴）で会話をやり直します。
+    """
     try:
-        response = client.responses.create(
+        return client.responses.create(
             model="gpt-4o",
-            instructions=instructions,
+            instructions=INSTRUCTIONS,
             input=messages,
-            tools=tools,
+            tools=TOOLS,
             tool_choice="auto",
             previous_response_id=previous_response_id,
+            **kwargs,
+        )
+    except openai.APIStatusError as e:
+        if previous_response_id is None or fallback_messages is None or not is_expired_chain_error(e):
+            raise
+        return client.responses.create(
+            model="gpt-4o",
+            instructions=INSTRUCTIONS,
+            input=fallback_messages,
+            tools=TOOLS,
+            tool_choice="auto",
+            **kwargs,
+        )
+
+
+def load_session(session_store, session_id):
+    """セッションを読み込みます。存在しない場合は新しいセッションを作成します。"""
+    if session_store is None:
+        return None
+    return session_store.get(session_id) or new_session()
+
+
+def save_session(session_store, session_id, session, user_message, message, response_id, fallback_to_history=True):
+    """応答後のセッションの状態（最後のレスポンスIDと直近の会話履歴）を保存します。"""
+    session["response_id"] = response_id
+    append_history(session, user_message, message, MAX_SESSION_HISTORY if fallback_to_history else 0)
+    session_store.save(session_id, session)
+
+
+def process_chat(client, user_message, conversation_history=None, session_store=None, session_id=None,
+                 fallback_to_history=True):
+    """
+    ユーザーからのメッセージを処理し、適切な応答を生成します。
+    
+    session_store を指定した場合は、会話履歴の代わりにセッションに保存した
+    前回のレスポンスIDを使って会話を継続します。
+    
+    Args:
+        client (openai.Client): OpenAIクライアント
+        user_message (str): ユーザーからのメッセージ
+        conversation_history (list, optional): 過去の会話履歴
+        session_store (optional): セッションストア（session_store.py）
+        session_id (str, optional): セッションID
+        fallback_to_history (bool): 会話チェーン失効時に直近の会話履歴で会話をやり直すかどうか
+    
+    Returns:
+        dict: 応答メッセージとステータス
+    """
+    session = load_session(session_store, session_id)
+    if session is not None:
+        messages, previous_response_id, fallback_messages = build_session_messages(
+            user_message, session, fallback_to_history
         )
+    else:
+        messages, previous_response_id = build_messages(user_message, conversation_history)
+        fallback_messages = None
+    
+    # OpenAI APIを呼び出し
+    try:
+        response = create_initial_response(client, messages, previous_response_id, fallback_messages)
         
         # 関数呼び出しがある場合は処理
         function_calls = [msg for msg in response.output if msg.type == "function_call"]
         if function_calls:
-            function_outputs = []
-            for fc in function_calls:
-                # 関数名とパラメータを取得
-                func_name = fc.name
-                params = json.loads(fc.arguments)
-                
-                # 対応する関数を呼び出し
-                if func_name == "get_product_info":
-                    result = get_product_info(**params)
-                elif func_name == "search_products":
-                    result = search_products(**params)
-                elif func_name == "get_faq":
-                    result = get_faq(**params)
-                elif func_name == "get_policy":
-                    result = get_policy(**params)
-                elif func_name == "get_order_status":
-                    result = get_order_status(**params)
-                else:
-                    result = {"error": "未実装の関数です"}
-                
-                # 関数の出力を追加
-                function_outputs.append({
-                    "type": "function_call_output",
-                    "call_id": fc.call_id,
-                    "output": json.dumps(result, ensure_ascii=False),
-                })
+            # 登録済みのツールを並行に実行（出力は呼び出し順を維持）
+            function_outputs = TOOL_REGISTRY.dispatch(function_calls)
             
             # ツール出力を含めて最終応答を生成
-            final_response = client.responses.create(
+            response = client.responses.create(
                 model="gpt-4o",
-                instructions=instructions,
+                instructions=INSTRUCTIONS,
                 input=function_outputs,
                 previous_response_id=response.id,
             )
-            
-            return {
-                "status": "success",
-                "message": final_response.output_text,
-                "response_id": final_response.id,
-            }
         
-        # 関数呼び出しがない場合は直接レスポンスを返す
-        return {
+        result = {
             "status": "success",
             "message": response.output_text,
             "response_id": response.id,
         }
+        if session is not None:
+            save_session(session_store, session_id, session, user_message, result["message"], response.id,
+                         fallback_to_history)
+            result["session_id"] = session_id
+        return result
         
     except Exception as e:
         return {
@@ -277,13 +226,91 @@ def process_chat(client, user_message, conversation_history=None):
         }
 
 
+def process_chat_stream(client, user_message, conversation_history=None, session_store=None, session_id=None,
+                        fallback_to_history=True):
+    """
+    ユーザーからのメッセージを処理し、応答をストリーミングで生成します。
+
+    応答テキストは生成され次第 delta イベントとして返します。関数呼び出しがある場合は
+    ツールを実行した後、最終応答も同様にストリーミングします。
+    引数は process_chat と同じです。
+
+    Yields:
+        dict: type が delta / tool_call / done / error のいずれかのイベント
+    """
+    session = load_session(session_store, session_id)
+    if session is not None:
+        messages, previous_response_id, fallback_messages = build_session_messages(
+            user_message, session, fallback_to_history
+        )
+    else:
+        messages, previous_response_id = build_messages(user_message, conversation_history)
+        fallback_messages = None
+
+    try:
+        stream = create_initial_response(
+            client, messages, previous_response_id, fallback_messages, stream=True
+        )
+
+        function_calls = []
+        text_parts = []
+        response_id = None
+        for event in stream:
+            if event.type == "response.output_text.delta":
+                text_parts.append(event.delta)
+                yield {"type": "delta", "delta": event.delta}
+            elif event.type == "response.output_item.done" and event.item.type == "function_call":
+                function_calls.append(event.item)
+                yield {"type": "tool_call", "name": event.item.name}
+            elif event.type in ("response.created", "response.completed"):
+                # 応答IDは最初の response.created で取得する（response.completed が届かない場合に備える）
+                response_id = event.response.id
+
+        if function_calls:
+            if response_id is None:
+                raise RuntimeError("応答IDを取得できなかったため、ツールの実行結果を送信できません")
+
+            # 登録済みのツールを並行に実行（出力は呼び出し順を維持）
+            function_outputs = TOOL_REGISTRY.dispatch(function_calls)
+
+            # ツール出力を含めて最終応答をストリーミングで生成
+            final_stream = client.responses.create(
+                model="gpt-4o",
+                instructions=INSTRUCTIONS,
+                input=function_outputs,
+                previous_response_id=response_id,
+                stream=True,
+            )
+            for event in final_stream:
+                if event.type == "response.output_text.delta":
+                    text_parts.append(event.delta)
+                    yield {"type": "delta", "delta": event.delta}
+                elif event.type in ("response.created", "response.completed"):
+                    response_id = event.response.id
+
+        done = {"type": "done", "response_id": response_id}
+        if session is not None:
+            save_session(session_store, session_id, session, user_message, "".join(text_parts), response_id,
+                         fallback_to_history)
+            done["session_id"] = session_id
+        yield done
+
+    except Exception as e:
+        yield {
+            "type": "error",
+            "message": f"エラーが発生しました: {str(e)}",
+        }
+
+
 # --- コンソールインターフェース ---
 
 def console_interface():
     """コンソールベースのチャットインターフェース"""
     api_key = setup_environment()
     client = openai.Client(api_key=api_key)
-    conversation_history = []
+    # 会話の状態はセッションストアに保存し、毎回の送信は新しいメッセージのみにする
+    session_store = create_session_store("memory")
+    session_id = uuid.uuid4().hex
     
     print("家電製品カスタマーサポートチャットボットへようこそ！")
     print("ご質問や商品に関するお問い合わせをどうぞ。終了するには 'exit' と入力してください。\n")
@@ -294,21 +321,12 @@ def console_interface():
             print("\nご利用ありがとうございました。またのお問い合わせをお待ちしております。")
             break
         
-        # ユーザーメッセージを会話履歴に追加
-        conversation_history.append({"role": "user", "content": user_input})
-        
         # チャットボットの応答を処理
         print("\n処理中...\n")
-        response = process_chat(client, user_input, conversation_history)
+        response = process_chat(client, user_input, session_store=session_store, session_id=session_id)
         
         if response["status"] == "success":
             print(f"アシスタント: {response['message']}\n")
-            # アシスタントの応答を会話履歴に追加
-            conversation_history.append({
-                "role": "assistant",
-                "content": response["message"],
-                "response_id": response.get("response_id")
-            })
         else:
             print(f"エラー: {response['message']}\n")
 
@@ -317,6 +335,7 @@ def console_interface():
 
 app = Flask(__name__)
 api_client = None
+session_store = None
 
 
 @app.route('/')
@@ -325,25 +344,69 @@ def home():
     return render_template('index.html')
 
 
+def get_chat_context(data):
+    """
+    リクエストから会話の継続方法を決定します。
+
+    会話履歴（history）のみが送信された場合は従来どおり履歴を使い、
+    それ以外はセッションID（未指定の場合は新規発行）でサーバー側のセッションを使います。
+    """
+    if "history" in data and "session_id" not in data:
+        return {"conversation_history": data.get("history", [])}
+    return {
+        "session_store": session_store,
+        "session_id": data.get("session_id") or uuid.uuid4().hex,
+    }
+
+
 @app.route('/api/chat', methods=['POST'])
 def chat():
     """チャットAPIエンドポイント"""
     data = request.json
     user_message = data.get('message')
-    conversation_history = data.get('history', [])
     
     if not user_message:
         return jsonify({"status": "error", "message": "メッセージが空です"})
     
-    response = process_chat(api_client, user_message, conversation_history)
+    response = process_chat(api_client, user_message, **get_chat_context(data))
     return jsonify(response)
 
 
+@app.route('/api/chat/stream', methods=['POST'])
+def chat_stream():
+    """チャットAPIエンドポイント（Server-Sent Eventsで応答をストリーミング）"""
+    data = request.json
+    user_message = data.get('message')
+    
+    if not user_message:
+        return jsonify({"status": "error", "message": "メッセージが空です"})
+    
+    context = get_chat_context(data)
+    
+    def generate():
+        for event in process_chat_stream(api_client, user_message, **context):
+            yield f"data: {json.dumps(event, ensure_ascii=False)}\n\n"
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.route('/api/cache/stats', methods=['GET'])
+def tool_cache_stats():
+    """ツール結果キャッシュのヒット数・ミス数などの統計を返すエンドポイント"""
+    return jsonify(cache_stats())
+
+
 def web_interface():
     """Webベースのチャットインターフェース"""
-    global api_client
+    global api_client, session_store
     api_key = setup_environment()
     api_client = openai.Client(api_key=api_key)
+    # 環境変数 SESSION_STORE で memory（既定）または sqlite を選択
+    session_store = create_session_store()
     
     # テンプレートディレクトリの作成
     os.makedirs(os.path.join(os.path.dirname(__file__), 'templates'), exist_ok=True)
@@ -443,6 +506,9 @@ def web_interface():
             // 会話履歴を保存
             let conversationHistory = [];
             
+            // サーバー側で会話の状態を保持するセッションID
+            let sessionId = null;
+            
             function addMessage(message, isUser = false) {
                 const messageDiv = document.createElement('div');
                 messageDiv.classList.add('message');
@@ -456,6 +522,7 @@ def web_interface():
                     role: isUser ? 'user' : 'assistant',
                     content: message
                 });
+                return messageDiv;
             }
             
             function addSystemMessage(message) {
@@ -493,36 +560,69 @@ def web_interface():
                 // ローディングインジケータを表示
                 const loadingIndicator = addLoadingIndicator();
                 
+                // ストリーミング中のボットの応答
+                let botMessageDiv = null;
+                let botText = '';
+                
                 try {
-                    // APIリクエスト
-                    const response = await fetch('/api/chat', {
+                    // APIリクエスト（応答はServer-Sent Eventsで逐次受信）
+                    const response = await fetch('/api/chat/stream', {
                         method: 'POST',
                         headers: {
                             'Content-Type': 'application/json'
                         },
                         body: JSON.stringify({
                             message: message,
-                            history: conversationHistory.slice(0, -1) // 最後のユーザーメッセージは除外
+                            session_id: sessionId // 会話の文脈はサーバー側のセッションから引き継ぐ
                         })
                     });
                     
-                    const data = await response.json();
-                    
-                    // ローディングインジケータを削除
-                    removeLoadingIndicator(loadingIndicator);
+                    const reader = response.body.getReader();
+                    const decoder = new TextDecoder('utf-8');
+                    let buffer = '';
                     
-                    if (data.status === 'success') {
-                        // ボットの応答を表示
-                        addMessage(data.message);
+                    while (true) {
+                        const { value, done } = await reader.read();
+                        if (done) break;
+                        buffer += decoder.decode(value, { stream: true });
                         
-                        // response_idがある場合は会話履歴に追加
-                        if (data.response_id) {
-                            conversationHistory[conversationHistory.length - 1].response_id = data.response_id;
+                        // イベントは空行で区切られる
+                        const events = buffer.split('\\n\\n');
+                        buffer = events.pop();
+                        
+                        for (const chunk of events) {
+                            if (!chunk.startsWith('data: ')) continue;
+                            const data = JSON.parse(chunk.slice(6));
+                            
+                            if (data.type === 'delta') {
+                                // 最初のテキストを受信したらローディングインジケータを応答に置き換える
+                                if (!botMessageDiv) {
+                                    removeLoadingIndicator(loadingIndicator);
+                                    botMessageDiv = addMessage('');
+                                }
+                                botText += data.delta;
+                                botMessageDiv.textContent = botText;
+                                conversationHistory[conversationHistory.length - 1].content = botText;
+                                chatContainer.scrollTop = chatContainer.scrollHeight;
+                            } else if (data.type === 'tool_call') {
+                                loadingIndicator.textContent = '情報を確認しています...';
+                            } else if (data.type === 'done') {
+                                if (data.session_id) {
+                                    sessionId = data.session_id;
+                                }
+                                // response_idがある場合は会話履歴に追加
+                                if (data.response_id && botMessageDiv) {
+                                    conversationHistory[conversationHistory.length - 1].response_id = data.response_id;
+                                }
+                            } else if (data.type === 'error') {
+                                // エラーメッセージを表示
+                                addSystemMessage('エラーが発生しました: ' + data.message);
+                            }
                         }
-                    } else {
-                        // エラーメッセージを表示
-                        addSystemMessage('エラーが発生しました: ' + data.message);
                     }
+                    
+                    // ローディングインジケータを削除
+                    removeLoadingIndicator(loadingIndicator);
                 } catch (error) {
                     // ローディングインジケータを削除
                     removeLoadingIndicator(loadingIndicator);
@@ -553,6 +653,7 @@ def web_interface():
     
     # Flaskアプリの起動
     print("Webインターフェースを起動しています...")
+    print(f"プロンプトバージョン: {PROMPT_VERSION}")
     print("以下のURLにアクセスしてください: http://localhost:5000")
     app.run(debug=True)
 
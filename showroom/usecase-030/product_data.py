@@ -3,8 +3,19 @@
 
 このモジュールは、商品情報、よくある質問、およびポリシー情報を提供します。
 実際のアプリケーションでは、これらのデータはデータベースから取得します。
+
+商品とFAQの検索には、モジュール読み込み時に構築する文字n-gram転置インデックスを使用します。
+データを変更した場合は add_product / remove_product / add_faq / remove_faq で差分を反映するか、
+reload_indexes() でインデックスを再構築してください。
+
+get_faq と get_policy の結果は tool_cache でキャッシュします。
+上記の関数でデータを変更するとキャッシュも破棄されます（POLICIES を直接変更した場合は
+tool_cache.invalidate("get_policy") を呼び出してください）。
 """
 
+from search_index import NgramIndex
+from tool_cache import cached_tool, invalidate
+
 # 商品カタログ
 PRODUCTS = {
     "TS-100": {
@@ -173,6 +184,63 @@ ORDERS = {
 }
 
 
+# 検索インデックス
+_PRODUCT_INDEX = NgramIndex({"name": 3, "description": 1})
+_FAQ_INDEX = NgramIndex({"question": 2, "answer": 1})
+
+
+def reload_indexes():
+    """PRODUCTS と FAQS の内容から検索インデックスを再構築します。"""
+    _PRODUCT_INDEX.clear()
+    for product_id, product in PRODUCTS.items():
+        _PRODUCT_INDEX.add(product_id, product, category=product.get("category"))
+
+    _rebuild_faq_index()
+    invalidate()
+
+
+def _rebuild_faq_index():
+    _FAQ_INDEX.clear()
+    for faq_id, faq in enumerate(FAQS):
+        _FAQ_INDEX.add(faq_id, faq)
+
+
+def add_product(product_id, product):
+    """商品を追加（または更新）し、検索インデックスに反映します。"""
+    PRODUCTS[product_id] = product
+    _PRODUCT_INDEX.add(product_id, product, category=product.get("category"))
+
+
+def remove_product(product_id):
+    """商品を削除し、検索インデックスから取り除きます。"""
+    if product_id not in PRODUCTS:
+        return False
+    del PRODUCTS[product_id]
+    _PRODUCT_INDEX.remove(product_id)
+    return True
+
+
+def add_faq(faq):
+    """FAQを追加し、検索インデックスに反映します。"""
+    FAQS.append(faq)
+    _FAQ_INDEX.add(len(FAQS) - 1, faq)
+    invalidate("get_faq")
+
+
+def remove_faq(faq_id):
+    """FAQ（FAQS での位置）を削除し、検索インデックスから取り除きます。"""
+    if not 0 <= faq_id < len(FAQS):
+        return False
+    del FAQS[faq_id]
+    # 検索インデックスの文書IDは FAQS での位置のため、後続のFAQの位置がずれた分を再構築する
+    _rebuild_faq_index()
+    invalidate("get_faq")
+    return True
+
+
+reload_indexes()
+
+
 # ツール関数
 def get_product_info(product_id):
     """商品情報を取得します。"""
@@ -184,25 +252,22 @@ def get_product_info(product_id):
 def search_products(query, category=None):
     """商品を検索します。"""
     results = []
-    for product_id, product in PRODUCTS.items():
-        if query.lower() in product["name"].lower() or query.lower() in product["description"].lower():
-            if category is None or product["category"] == category:
-                results.append({"id": product_id, **product})
+    for product_id, _ in _PRODUCT_INDEX.search(query, category=category):
+        results.append({"id": product_id, **PRODUCTS[product_id]})
     return {"results": results, "count": len(results)}
 
 
+@cached_tool(ttl=600)
 def get_faq(query=None):
     """FAQを検索します。"""
     if query is None:
         return {"faqs": FAQS}
-    
-    results = []
-    for faq in FAQS:
-        if query.lower() in faq["question"].lower() or query.lower() in faq["answer"].lower():
-            results.append(faq)
+
+    results = [FAQS[faq_id] for faq_id, _ in _FAQ_INDEX.search(query)]
     return {"faqs": results, "count": len(results)}
 
 
+@cached_tool(ttl=3600)
 def get_policy(policy_type):
     """ポリシー情報を取得します。"""
     if policy_type in POLICIES:
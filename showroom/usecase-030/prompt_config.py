@@ -0,0 +1,163 @@
+"""
+ツール定義とインストラクション
+
+ツール定義とインストラクションはリクエストごとに変わらないため、モジュールの読み込み時に
+一度だけ構築し、変更できない形で共有します。毎回同じ内容を送信することでプロンプトの先頭部分が
+リクエスト間でバイト単位で一致し、サーバー側のプロンプトキャッシュが効きやすくなります。
+内容を変更すると PROMPT_VERSION（内容のハッシュ値）も変わります。
+"""
+
+import hashlib
+import json
+
+
+class FrozenDict(dict):
+    """変更できない辞書（JSONへのシリアライズは通常の辞書と同じ）"""
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("FrozenDict は変更できません")
+
+    __setitem__ = __delitem__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+    def __hash__(self):
+        return hash(json.dumps(self, ensure_ascii=False, sort_keys=True))
+
+
+def freeze(value):
+    """辞書とリストを再帰的に FrozenDict とタプルに変換します。"""
+    if isinstance(value, dict):
+        return FrozenDict((key, freeze(item)) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+# --- ツール定義 ---
+
+
+def setup_tools():
+    """ツール定義を設定します。"""
+    return [
+        {
+            "type": "function",
+            "name": "get_product_info",
+            "description": "商品IDを指定して商品の詳細情報を取得します",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "product_id": {
+                        "type": "string",
+                        "description": "商品ID（例: TS-100）"
+                    }
+                },
+                "required": ["product_id"]
+            }
+        },
+        {
+            "type": "function",
+            "name": "search_products",
+            "description": "キーワードで商品を検索します",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "query": {
+                        "type": "string",
+                        "description": "検索キーワード"
+                    },
+                    "category": {
+                        "type": "string",
+                        "description": "商品カテゴリ（指定しない場合は全カテゴリから検索）"
+                    }
+                },
+                "required": ["query"]
+            }
+        },
+        {
+            "type": "function",
+            "name": "get_faq",
+            "description": "よくある質問（FAQ）を検索します",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "query": {
+                        "type": "string",
+                        "description": "検索キーワード（指定しない場合は全FAQを取得）"
+                    }
+                }
+            }
+        },
+        {
+            "type": "function",
+            "name": "get_policy",
+            "description": "会社のポリシー情報を取得します",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "policy_type": {
+                        "type": "string",
+                        "description": "ポリシータイプ（shipping, returns, warranty, privacy）"
+                    }
+                },
+                "required": ["policy_type"]
+            }
+        },
+        {
+            "type": "function",
+            "name": "get_order_status",
+            "description": "注文IDを指定して注文状況を確認します",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "order_id": {
+                        "type": "string",
+                        "description": "注文ID（例: ORD-12345）"
+                    }
+                },
+                "required": ["order_id"]
+            }
+        }
+    ]
+
+
+# --- インストラクション ---
+
+
+def setup_instructions():
+    """アシスタントへの指示（インストラクション）を設定します。"""
+    return """
+    あなたは家電製品を販売するオンラインショップのカスタマーサポートアシスタントです。
+    親切、丁寧、プロフェッショナルな対応を心がけ、必要に応じて提供されたツールを使用して
+    お客様のお問い合わせに回答してください。
+    
+    以下のガイドラインに従ってください：
+    1. 常に礼儀正しく、敬語を使って対応する
+    2. 質問に対しては具体的かつ簡潔に回答する
+    3. 商品や注文に関する質問には、必ずツールを使用して正確な情報を提供する
+    4. わからないことや情報がない場合は、誤った情報を提供せず、正直に伝える
+    5. 複雑な問題については、カスタマーサポート窓口への連絡を案内する
+    6. 個人情報やセキュリティに関する事項は慎重に扱う
+    
+    お客様が以下のような質問をした場合は、対応するツールを使用してください：
+    - 商品に関する質問 → get_product_info または search_products
+    - 注文や配送に関する質問 → get_order_status
+    - 返品や保証に関する質問 → get_policy
+    - よくある質問 → get_faq
+    """
+
+
+def compute_prompt_version(instructions, tools):
+    """インストラクションとツール定義の内容からバージョンハッシュを計算します。"""
+    payload = json.dumps(
+        {"instructions": instructions, "tools": tools},
+        ensure_ascii=False,
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:12]
+
+
+# モジュール読み込み時に一度だけ構築する共有定義
+TOOLS = freeze(setup_tools())
+INSTRUCTIONS = setup_instructions()
+PROMPT_VERSION = compute_prompt_version(INSTRUCTIONS, TOOLS)
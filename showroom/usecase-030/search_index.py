@@ -0,0 +1,261 @@
+"""
+文字n-gram転置インデックス
+
+商品カタログやFAQをキーワード検索するための転置インデックスを提供します。
+日本語（CJK）の文章は単語の区切りが空白で表されないため、形態素解析を使わずに
+文字単位のバイグラム／トライグラムでインデックスを構築します。
+
+検索時はクエリのn-gramを含む文書の集合を求めてから、正規化済みテキストに対して
+部分文字列の確認を行うため、従来の線形スキャンと同じ結果を保ちつつ高速に検索できます。
+
+ただし、従来はクエリ全体を1つの部分文字列として照合していたのに対し、空白で区切られたクエリは
+検索語ごとに照合し、すべての検索語を含む文書を返します（AND条件）。空白を含まないクエリの結果は
+従来と同じです。空のクエリは従来どおりすべての文書（カテゴリ指定時はそのカテゴリの文書）を返します。
+"""
+
+import heapq
+import threading
+import unicodedata
+from collections import defaultdict
+
+
+def normalize_text(text):
+    """検索用にテキストを正規化します（NFKC正規化 + 小文字化）。"""
+    if not text:
+        return ""
+    return unicodedata.normalize("NFKC", str(text)).lower()
+
+
+def split_query(query):
+    """クエリを空白で区切った検索語のリストに変換します。"""
+    return [term for term in normalize_text(query).split() if term]
+
+
+def iter_ngrams(text, n):
+    """正規化済みテキストから文字n-gramを生成します（空白をまたぐn-gramは除外）。"""
+    for word in text.split():
+        if len(word) < n:
+            continue
+        for i in range(len(word) - n + 1):
+            yield word[i : i + n]
+
+
+def count_overlapping(text, term):
+    """text に term が出現する回数を、重なり合う出現も含めて数えます（str.count は重なりを数えない）。"""
+    count = 0
+    pos = text.find(term)
+    while pos != -1:
+        count += 1
+        pos = text.find(term, pos + 1)
+    return count
+
+
+class NgramIndex:
+    """
+    文字バイグラム／トライグラムによる転置インデックス
+
+    文書はID・カテゴリ・重み付きフィールドの組として登録します。
+    フィールドの重みはランキングに使用され、一致した回数 × 重み の合計がスコアになります。
+
+    Args:
+        field_weights (dict): フィールド名と重みの対応（例: {"name": 3, "description": 1}）
+    """
+
+    NGRAM_SIZES = (2, 3)
+
+    def __init__(self, field_weights):
+        self.field_weights = dict(field_weights)
+        # n-gram -> {文書ID: 出現回数 × フィールド重み}
+        self._postings = {n: defaultdict(dict) for n in self.NGRAM_SIZES}
+        self._categories = defaultdict(set)
+        self._documents = {}
+        self._order = {}
+        self._next_order = 0
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._documents)
+
+    def __contains__(self, doc_id):
+        return doc_id in self._documents
+
+    def add(self, doc_id, fields, category=None):
+        """
+        文書をインデックスに追加します。同じIDの文書が既にある場合は置き換えます。
+
+        Args:
+            doc_id: 文書ID
+            fields (dict): フィールド名とテキストの対応
+            category (str, optional): 事前フィルタリングに使うカテゴリ
+        """
+        normalized = {
+            name: normalize_text(fields.get(name)) for name in self.field_weights
+        }
+        with self._lock:
+            if doc_id in self._documents:
+                self._remove_postings(doc_id)
+            else:
+                self._order[doc_id] = self._next_order
+                self._next_order += 1
+
+            self._documents[doc_id] = (category, normalized)
+            self._categories[category].add(doc_id)
+            for n, postings in self._postings.items():
+                for name, text in normalized.items():
+                    weight = self.field_weights[name]
+                    for gram in iter_ngrams(text, n):
+                        doc_scores = postings[gram]
+                        doc_scores[doc_id] = doc_scores.get(doc_id, 0) + weight
+
+    def remove(self, doc_id):
+        """
+        文書をインデックスから削除します。
+
+        Returns:
+            bool: 削除した場合はTrue、登録されていなかった場合はFalse
+        """
+        with self._lock:
+            if doc_id not in self._documents:
+                return False
+            self._remove_postings(doc_id)
+            del self._documents[doc_id]
+            del self._order[doc_id]
+            return True
+
+    def clear(self):
+        """インデックスを空にします。"""
+        with self._lock:
+            for postings in self._postings.values():
+                postings.clear()
+            self._categories.clear()
+            self._documents.clear()
+            self._order.clear()
+            self._next_order = 0
+
+    def _remove_postings(self, doc_id):
+        category, normalized = self._documents[doc_id]
+        members = self._categories.get(category)
+        if members is not None:
+            members.discard(doc_id)
+            if not members:
+                del self._categories[category]
+        for n, postings in self._postings.items():
+            for text in normalized.values():
+                for gram in iter_ngrams(text, n):
+                    doc_scores = postings.get(gram)
+                    if doc_scores is None:
+                        continue
+                    doc_scores.pop(doc_id, None)
+                    if not doc_scores:
+                        del postings[gram]
+
+    def _match(self, term, scope):
+        """
+        検索語に一致する文書とそのスコアを返します。
+
+        検索語の長さがn-gramの長さと同じ場合はポスティングの値をそのままスコアとして使い、
+        それより長い場合はn-gramの積集合で候補を絞り込んでから部分文字列として確認します。
+        """
+        sizes = self.NGRAM_SIZES
+        if len(term) < min(sizes):
+            # n-gramを作れない短い検索語は、絞り込み済みの文書を直接確認する
+            candidates = self._documents.keys() if scope is None else scope
+            return self._verify(term, candidates)
+
+        if len(term) in sizes:
+            doc_scores = self._postings[len(term)].get(term)
+            if not doc_scores:
+                return {}
+            if scope is None:
+                return doc_scores
+            if len(scope) < len(doc_scores):
+                return {doc_id: doc_scores[doc_id] for doc_id in scope if doc_id in doc_scores}
+            return {doc_id: score for doc_id, score in doc_scores.items() if doc_id in scope}
+
+        postings = self._postings[max(sizes)]
+        doc_sets = []
+        for gram in set(iter_ngrams(term, max(sizes))):
+            doc_scores = postings.get(gram)
+            if not doc_scores:
+                return {}
+            doc_sets.append(doc_scores.keys())
+        if scope is not None:
+            doc_sets.append(scope)
+
+        doc_sets.sort(key=len)
+        candidates = set(doc_sets[0])
+        for doc_ids in doc_sets[1:]:
+            candidates &= doc_ids
+            if not candidates:
+                return {}
+        return self._verify(term, candidates)
+
+    def _verify(self, term, candidates):
+        """
+        候補の文書に検索語が含まれるか確認し、スコアを計算します。
+
+        出現回数は、n-gram のポスティングと同じく重なり合う出現も数えます（「ああ」は「あああ」に2回出現）。
+        """
+        weights = self.field_weights
+        matches = {}
+        for doc_id in candidates:
+            _, normalized = self._documents[doc_id]
+            score = 0
+            for name, text in normalized.items():
+                count = count_overlapping(text, term)
+                if count:
+                    score += count * weights[name]
+            if score:
+                matches[doc_id] = score
+        return matches
+
+    def search(self, query, category=None, limit=None):
+        """
+        クエリに一致する文書をスコア順に検索します。
+
+        空白で区切られた検索語はすべて（AND条件で）いずれかのフィールドに含まれる必要があります。
+        検索語がない場合は、すべての文書（カテゴリ指定時はそのカテゴリの文書）をスコア0で登録順に返します。
+
+        Args:
+            query (str): 検索キーワード
+            category (str, optional): カテゴリで事前に絞り込む場合に指定
+            limit (int, optional): 返す件数の上限
+
+        Returns:
+            list: (文書ID, スコア) のリスト（スコアの降順、同点は登録順）
+        """
+        terms = split_query(query)
+
+        with self._lock:
+            scope = None
+            if category is not None:
+                scope = self._categories.get(category)
+                if not scope:
+                    return []
+
+            if not terms:
+                doc_ids = self._documents.keys() if scope is None else scope
+                ranked = sorted((self._order[doc_id], doc_id) for doc_id in doc_ids)
+                if limit is not None:
+                    ranked = ranked[:limit]
+                return [(doc_id, 0) for _, doc_id in ranked]
+
+            # 絞り込みの強い長い検索語から順に評価し、候補を減らしていく
+            scores = None
+            for term in sorted(set(terms), key=len, reverse=True):
+                matches = self._match(term, scope if scores is None else scores.keys())
+                if not matches:
+                    return []
+                if scores is None:
+                    scores = dict(matches)
+                else:
+                    scores = {doc_id: scores[doc_id] + score for doc_id, score in matches.items()}
+
+            order = self._order
+            ranked = [(-score, order[doc_id], doc_id) for doc_id, score in scores.items()]
+
+        if limit is not None:
+            ranked = heapq.nsmallest(limit, ranked)
+        else:
+            ranked.sort()
+        return [(doc_id, -neg_score) for neg_score, _, doc_id in ranked]
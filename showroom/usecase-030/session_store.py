@@ -0,0 +1,169 @@
+"""
+会話セッションの保存
+
+Webチャットの会話状態をサーバー側で保持するためのセッションストアを提供します。
+Responses APIは前回のレスポンスIDを指定するだけで会話の文脈を引き継げるため、
+セッションには最後のレスポンスIDのみを保存し、毎回の送信は新しいユーザーメッセージだけにします。
+
+サーバー側の会話チェーンが失効した場合に備えて、直近の会話履歴を一定件数だけ保存しておき、
+その履歴を使って会話をやり直すこともできます。
+
+- MemorySessionStore: プロセス内のメモリに保存（LRU + 有効期限）
+- SQLiteSessionStore: SQLiteファイルに保存（プロセスの再起動後も保持）
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+
+def new_session(history=None):
+    """空のセッションを作成します。"""
+    return {"response_id": None, "history": list(history or [])}
+
+
+def append_history(session, user_message, assistant_message, max_history):
+    """セッションの会話履歴に1往復分を追加し、直近 max_history 件に切り詰めます。"""
+    if max_history <= 0:
+        session["history"] = []
+        return session
+    history = session.get("history", [])
+    history.append({"role": "user", "content": user_message})
+    history.append({"role": "assistant", "content": assistant_message})
+    session["history"] = history[-max_history:]
+    return session
+
+
+class MemorySessionStore:
+    """
+    メモリ上のセッションストア（LRU + 有効期限）
+
+    Args:
+        max_sessions (int): 保持するセッション数の上限（超えた場合は最も古く使われたものから削除）
+        ttl (float): セッションの有効期限（秒）
+    """
+
+    def __init__(self, max_sessions=1000, ttl=3600):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id):
+        """セッションを取得します。存在しないか期限切れの場合は None を返します。"""
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return None
+            expires_at, session = entry
+            if expires_at < time.time():
+                del self._sessions[session_id]
+                return None
+            self._sessions.move_to_end(session_id)
+            return json.loads(session)
+
+    def save(self, session_id, session):
+        """セッションを保存し、有効期限を延長します。"""
+        with self._lock:
+            self._sessions[session_id] = (
+                time.time() + self.ttl,
+                json.dumps(session, ensure_ascii=False),
+            )
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+    def delete(self, session_id):
+        """セッションを削除します。"""
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+
+class SQLiteSessionStore:
+    """
+    SQLiteファイルに保存するセッションストア
+
+    Args:
+        db_path (str): SQLiteデータベースファイルのパス
+        ttl (float): セッションの有効期限（秒）
+    """
+
+    def __init__(self, db_path, ttl=3600):
+        self.db_path = db_path
+        self.ttl = ttl
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS sessions (
+                    session_id TEXT PRIMARY KEY,
+                    data TEXT NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_sessions_expires_at ON sessions (expires_at)"
+            )
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, session_id):
+        """セッションを取得します。存在しないか期限切れの場合は None を返します。"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT data FROM sessions WHERE session_id = ? AND expires_at >= ?",
+                (session_id, time.time()),
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save(self, session_id, session):
+        """セッションを保存し、有効期限を延長します。期限切れのセッションもあわせて削除します。"""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO sessions (session_id, data, expires_at) VALUES (?, ?, ?)",
+                (session_id, json.dumps(session, ensure_ascii=False), now + self.ttl),
+            )
+            conn.execute("DELETE FROM sessions WHERE expires_at < ?", (now,))
+
+    def delete(self, session_id):
+        """セッションを削除します。"""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+
+def create_session_store(backend=None, **kwargs):
+    """
+    セッションストアを作成します。
+
+    Args:
+        backend (str, optional): "memory" または "sqlite"（未指定の場合は環境変数 SESSION_STORE、既定は "memory"）
+        **kwargs: 各ストアのコンストラクタに渡す引数
+
+    Returns:
+        MemorySessionStore | SQLiteSessionStore: セッションストア
+    """
+    backend = backend or os.environ.get("SESSION_STORE", "memory")
+    if backend == "memory":
+        return MemorySessionStore(**kwargs)
+    if backend == "sqlite":
+        kwargs.setdefault(
+            "db_path",
+            os.environ.get(
+                "SESSION_DB_PATH",
+                os.path.join(os.path.dirname(os.path.abspath(__file__)), "sessions.db"),
+            ),
+        )
+        return SQLiteSessionStore(**kwargs)
+    raise ValueError(f"未対応のセッションストアです: {backend}")
@@ -0,0 +1,146 @@
+"""
+tool_cache のテスト（有効期限・LRUによる削除・引数の正規化・キャッシュの破棄）
+
+実行方法:
+    python -m pytest test_tool_cache.py
+"""
+
+import ast
+import os
+
+import pytest
+
+import tool_cache
+from tool_cache import TTLCache, cached_tool, invalidate
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """time.monotonic の代わりに、テストから進められる時計を使います。"""
+    now = [1000.0]
+    monkeypatch.setattr(tool_cache.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_entry_expires_after_ttl(clock):
+    cache = TTLCache(ttl=10, maxsize=4)
+    cache.set("key", "value")
+
+    clock[0] += 10
+    assert cache.get("key") == (True, "value")
+
+    clock[0] += 0.01
+    assert cache.get("key") == (False, None)
+    assert cache.stats()["size"] == 0
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_set_refreshes_expiry(clock):
+    cache = TTLCache(ttl=10)
+    cache.set("key", "old")
+    clock[0] += 8
+    cache.set("key", "new")
+    clock[0] += 8
+    assert cache.get("key") == (True, "new")
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = TTLCache(ttl=60, maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    # a を参照すると、最も長く使われていないのは b になる
+    assert cache.get("a") == (True, 1)
+    cache.set("c", 3)
+
+    assert cache.get("b") == (False, None)
+    assert cache.get("a") == (True, 1)
+    assert cache.get("c") == (True, 3)
+    assert cache.evictions == 1
+    assert cache.stats()["size"] == 2
+
+
+def test_equivalent_arguments_share_one_entry(clock):
+    calls = []
+
+    @cached_tool(ttl=60, name="test_equivalent_arguments")
+    def lookup(query, category=None, limit=10):
+        calls.append((query, category, limit))
+        return {"query": query, "category": category, "limit": limit}
+
+    # 位置引数・キーワード引数・既定値の省略・キーワード引数の順序が違っても同じキーになる
+    first = lookup("電池")
+    assert lookup("電池", None, 10) is first
+    assert lookup(query="電池") is first
+    assert lookup(limit=10, query="電池", category=None) is first
+    assert calls == [("電池", None, 10)]
+
+    lookup("電池", limit=5)
+    lookup("電池", category="phone")
+    assert len(calls) == 3
+    assert lookup.cache.stats()["size"] == 3
+
+
+def test_canonical_key_is_stable_json():
+    def func(b, a=1):
+        pass
+
+    signature = tool_cache.inspect.signature(func)
+    assert tool_cache.canonical_key(signature, (2,), {}) == '{"a":1,"b":2}'
+    assert tool_cache.canonical_key(signature, (), {"a": 1, "b": 2}) == '{"a":1,"b":2}'
+
+
+def test_arguments_that_do_not_bind_are_not_cached():
+    @cached_tool(ttl=60, name="test_unbound_arguments")
+    def lookup(query):
+        return query
+
+    with pytest.raises(TypeError):
+        lookup("a", "b")
+    assert lookup.cache.stats()["size"] == 0
+
+
+def test_invalidate_clears_only_the_named_cache(clock):
+    calls = {"first": 0, "second": 0}
+
+    @cached_tool(ttl=60, name="test_invalidate_first")
+    def first(key):
+        calls["first"] += 1
+        return key
+
+    @cached_tool(ttl=60, name="test_invalidate_second")
+    def second(key):
+        calls["second"] += 1
+        return key
+
+    first("x")
+    second("x")
+    invalidate("test_invalidate_first")
+    first("x")
+    second("x")
+    assert calls == {"first": 2, "second": 1}
+    assert first.cache.invalidations == 1
+    assert second.cache.invalidations == 0
+
+    # 名前を指定しない場合はすべてのキャッシュを破棄する
+    invalidate()
+    first("x")
+    second("x")
+    assert calls == {"first": 3, "second": 2}
+
+
+def _code_without_docstring(path):
+    """モジュールの説明（docstring）を除いたコードの構文木を文字列で返します。"""
+    with open(path, encoding="utf-8") as f:
+        module = ast.parse(f.read())
+    body = module.body
+    if body and isinstance(body[0], ast.Expr) and isinstance(body[0].value, ast.Constant):
+        body = body[1:]
+    return ast.dump(ast.Module(body=body, type_ignores=[]))
+
+
+@pytest.mark.parametrize("usecase", ["usecase-040", "usecase-041"])
+def test_copies_match_this_module(usecase):
+    # usecase-040 / usecase-041 の tool_cache.py はこのファイルのコピー（説明のコピー元の記載以外は同じ）
+    here = os.path.dirname(os.path.abspath(__file__))
+    copy_path = os.path.join(os.path.dirname(here), usecase, "tool_cache.py")
+    assert _code_without_docstring(copy_path) == _code_without_docstring(tool_cache.__file__)
@@ -0,0 +1,152 @@
+"""
+ツール関数の結果キャッシュ
+
+同じ引数に対して常に同じ結果を返すツール関数（ポリシー・FAQ・緊急情報・予防情報など）の結果を
+一定時間メモリに保持し、同じ引数での呼び出しに再計算なしで応答します。
+
+- キャッシュのキーは引数を正規化したJSON文字列（位置引数・キーワード引数・既定値の違いを吸収）
+- ツールごとに有効期限（TTL）と保持件数の上限（LRUで古いものから削除）を設定
+- データを変更した場合は invalidate() でキャッシュを破棄
+- ヒット数・ミス数などの統計は cache_stats() で取得
+
+キャッシュした結果は呼び出し元で共有されるため、変更しないでください。
+
+usecase-040・usecase-041 に同じ内容のコピーがあります。変更した場合はコピーも更新してください
+（test_tool_cache.py でコードが一致することを確認しています）。
+"""
+
+import functools
+import inspect
+import json
+import threading
+import time
+from collections import OrderedDict
+
+# ツール名 → キャッシュ
+_CACHES = {}
+
+
+def canonical_key(signature, args, kwargs):
+    """引数を既定値を含めて名前付きで束縛し、キー順を揃えたJSON文字列に変換します。"""
+    bound = signature.bind(*args, **kwargs)
+    bound.apply_defaults()
+    return json.dumps(
+        bound.arguments, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str
+    )
+
+
+class TTLCache:
+    """
+    有効期限付きのLRUキャッシュ
+
+    Args:
+        ttl (float): 有効期限（秒）
+        maxsize (int): 保持する件数の上限（超えた場合は最も古く使われたものから削除）
+    """
+
+    def __init__(self, ttl, maxsize=256):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        """
+        キャッシュから値を取得します。
+
+        Returns:
+            tuple: (見つかったかどうか, 値)
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at >= time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return True, value
+                del self._entries[key]
+            self.misses += 1
+            return False, None
+
+    def set(self, key, value):
+        """値をキャッシュに保存します。"""
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """キャッシュを空にします。"""
+        with self._lock:
+            self._entries.clear()
+            self.invalidations += 1
+
+    def stats(self):
+        """ヒット数・ミス数などの統計を返します。"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+def cached_tool(ttl=300, maxsize=256, name=None):
+    """
+    ツール関数の結果をキャッシュするデコレーター
+
+    Args:
+        ttl (float): 有効期限（秒）
+        maxsize (int): 保持する件数の上限
+        name (str, optional): キャッシュ名（未指定の場合は関数名）
+    """
+
+    def decorator(func):
+        cache_name = name or func.__name__
+        cache = TTLCache(ttl, maxsize)
+        signature = inspect.signature(func)
+        _CACHES[cache_name] = cache
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            try:
+                key = canonical_key(signature, args, kwargs)
+            except TypeError:
+                # 引数が関数の定義と合わない場合はキャッシュせずに呼び出し、通常どおりエラーにする
+                return func(*args, **kwargs)
+            found, value = cache.get(key)
+            if found:
+                return value
+            value = func(*args, **kwargs)
+            cache.set(key, value)
+            return value
+
+        wrapper.cache = cache
+        return wrapper
+
+    return decorator
+
+
+def invalidate(*names):
+    """指定したツールのキャッシュを破棄します（未指定の場合はすべて）。"""
+    for cache_name, cache in _CACHES.items():
+        if not names or cache_name in names:
+            cache.clear()
+
+
+def cache_stats():
+    """ツールごとのキャッシュの統計を返します。"""
+    return {cache_name: cache.stats() for cache_name, cache in _CACHES.items()}
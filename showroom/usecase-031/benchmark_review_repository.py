@@ -0,0 +1,98 @@
+"""
+レビュー検索のベンチマーク
+
+サンプルのレビューを複製して合成した大量のレビューに対して、従来のリスト全体の走査による絞り込み
+（review_data の従来の関数と同じ処理）と、ReviewRepository のインデックスによる絞り込みの
+処理時間を比較し、結果が一致することを確認します。
+
+使い方:
+    python benchmark_review_repository.py --reviews 200000
+"""
+
+import argparse
+import datetime
+import random
+import time
+
+from review_data import get_all_reviews
+from review_repository import ReviewRepository
+
+PRODUCT_COUNT = 500
+
+
+def generate_reviews(count, seed=0):
+    """サンプルのレビューの製品ID・評価点・日付を変えて複製し、合成したレビューを生成します。"""
+    rng = random.Random(seed)
+    samples = get_all_reviews()
+    start = datetime.date(2020, 1, 1)
+    reviews = []
+    for i in range(count):
+        review = dict(rng.choice(samples))
+        review["review_id"] = f"R{i:07d}"
+        review["product_id"] = f"P-{rng.randrange(PRODUCT_COUNT):03d}"
+        review["rating"] = rng.randint(1, 5)
+        review["date"] = (start + datetime.timedelta(days=rng.randrange(1460))).isoformat()
+        reviews.append(review)
+    return reviews
+
+
+def linear_find(reviews, product_id=None, min_rating=None, max_rating=None, start_date=None, end_date=None, query=None):
+    """従来の review_data の関数を順に適用した場合と同じ、リスト全体の走査による絞り込み。"""
+    results = reviews
+    if product_id is not None:
+        results = [r for r in results if r["product_id"] == product_id]
+    if min_rating is not None:
+        results = [r for r in results if r["rating"] >= min_rating]
+    if max_rating is not None:
+        results = [r for r in results if r["rating"] <= max_rating]
+    if start_date is not None:
+        results = [r for r in results if r["date"] >= start_date]
+    if end_date is not None:
+        results = [r for r in results if r["date"] <= end_date]
+    if query:
+        q = query.lower()
+        results = [r for r in results if q in r["title"].lower() or q in r["text"].lower()]
+    return results
+
+
+QUERIES = [
+    ("製品ID", {"product_id": "P-042"}),
+    ("評価点 1〜2", {"min_rating": 1, "max_rating": 2}),
+    ("日付（1か月）", {"start_date": "2022-03-01", "end_date": "2022-03-31"}),
+    ("キーワード「ノイズ」", {"query": "ノイズ"}),
+    ("組み合わせ", {"product_id": "P-042", "min_rating": 4, "start_date": "2021-01-01", "query": "カメラ"}),
+]
+
+
+def main():
+    """メイン関数"""
+    parser = argparse.ArgumentParser(description="レビュー検索のベンチマーク")
+    parser.add_argument("--reviews", type=int, default=200000, help="合成するレビュー数")
+    parser.add_argument("--repeat", type=int, default=5, help="計測の繰り返し回数")
+    parser.add_argument("--seed", type=int, default=0, help="乱数シード")
+    args = parser.parse_args()
+
+    reviews = generate_reviews(args.reviews, args.seed)
+    start = time.perf_counter()
+    repository = ReviewRepository(reviews)
+    print(f"合成レビュー: {len(reviews):,} 件（インデックスの構築 {time.perf_counter() - start:.2f} 秒）\n")
+
+    print(f"{'条件':<20} {'件数':>8} | {'走査 (ms)':>10} | {'インデックス (ms)':>16}")
+    for label, conditions in QUERIES:
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            expected = linear_find(reviews, **conditions)
+        linear_time = (time.perf_counter() - start) / args.repeat
+
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            results = repository.find(**conditions)
+        indexed_time = (time.perf_counter() - start) / args.repeat
+
+        if results != expected:
+            raise SystemExit(f"検索結果が一致しません: {label}")
+        print(f"{label:<20} {len(results):>8,} | {linear_time * 1000:>10.2f} | {indexed_time * 1000:>16.2f}")
+
+
+if __name__ == "__main__":
+    main()
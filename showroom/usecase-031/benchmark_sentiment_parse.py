@@ -0,0 +1,197 @@
+"""
+感情分析レスポンスのパースのベンチマーク
+
+合成した大きなバッチの感情分析結果に対して、従来の正規表現による自由形式テキストのパースと、
+JSONスキーマによる構造化出力（sentiment_schema.parse_sentiment_analysis）のパースの
+処理時間と失敗率（感情が「不明」になったレビューの割合）を比較します。
+
+自由形式テキストには、実際のモデル出力で見られる表記ゆれ（全角コロン、Markdownの強調、
+番号付きの見出しなど）を一定の割合で混ぜます。構造化出力はスキーマで形式が保証されるため、
+表記ゆれは発生しません。
+
+使い方:
+    python benchmark_sentiment_parse.py --batch-sizes 5 50 200 1000 --drift 0.1
+"""
+
+import argparse
+import json
+import random
+import re
+import time
+
+from sentiment_schema import SENTIMENT_LABELS, UNKNOWN_SENTIMENT, parse_sentiment_analysis
+
+POINTS = ["カメラの画質が良い", "バッテリーの持ちが良い", "価格が高い", "動作が重い", "デザインが美しい", "発熱が気になる"]
+KEYWORDS = ["カメラ", "バッテリー", "画面", "価格", "デザイン", "音質", "性能"]
+
+
+def generate_batch(size, seed=0):
+    """合成したレビューと、それに対応する感情分析結果を生成します。"""
+    rng = random.Random(seed)
+    reviews, analyses = [], []
+    for i in range(size):
+        review_id = f"R{seed:03d}-{i:05d}"
+        reviews.append(
+            {
+                "review_id": review_id,
+                "product_id": "SP-100",
+                "product_name": "TechX Phone Pro",
+                "rating": rng.randint(1, 5),
+                "text": "合成レビュー",
+            }
+        )
+        analyses.append(
+            {
+                "review_id": review_id,
+                "sentiment": rng.choice(SENTIMENT_LABELS),
+                "sentiment_score": rng.randint(1, 5),
+                "positive_points": rng.sample(POINTS, 2),
+                "negative_points": rng.sample(POINTS, 1),
+                "keywords": rng.sample(KEYWORDS, 3),
+            }
+        )
+    return reviews, analyses
+
+
+def render_text(analyses, drift, rng):
+    """感情分析結果を従来のプロンプトで指定していた自由形式テキストに変換します（一部に表記ゆれを含む）。"""
+    sections = []
+    for n, a in enumerate(analyses, 1):
+        colon = "：" if rng.random() < drift else ":"
+        label = "**感情**" if rng.random() < drift else "感情"
+        heading = f"{n}. レビューID" if rng.random() < drift else "- レビューID"
+        sections.append(
+            "\n".join(
+                [
+                    f"{heading}{colon} {a['review_id']}",
+                    f"- {label}: {a['sentiment']}",
+                    f"- 感情スコア: {a['sentiment_score']}",
+                    "- ポジティブポイント:",
+                    *[f"  - {p}" for p in a["positive_points"]],
+                    "- ネガティブポイント:",
+                    *[f"  - {p}" for p in a["negative_points"]],
+                    f"- キーワード: {', '.join(a['keywords'])}",
+                ]
+            )
+        )
+    return "\n\n".join(sections)
+
+
+def parse_sentiment_text(analysis_text, original_reviews):
+    """従来の実装と同じ正規表現による感情分析テキストのパース"""
+    results = []
+    for review in original_reviews:
+        review_id = review["review_id"]
+        pattern = rf"レビューID:\s*{review_id}.*?(?=レビューID:|$)"
+        match = re.search(pattern, analysis_text, re.DOTALL)
+        if match:
+            analysis_section = match.group(0)
+            sentiment_match = re.search(
+                r"感情:\s*(ポジティブ|ネガティブ|ニュートラル)", analysis_section
+            )
+            sentiment = sentiment_match.group(1) if sentiment_match else "不明"
+            score_match = re.search(r"感情スコア:\s*(\d+)", analysis_section)
+            sentiment_score = int(score_match.group(1)) if score_match else 3
+            positive_points = []
+            pos_section_match = re.search(
+                r"ポジティブポイント:(.*?)ネガティブポイント:",
+                analysis_section,
+                re.DOTALL,
+            )
+            if pos_section_match:
+                pos_text = pos_section_match.group(1)
+                positive_points = [
+                    point.strip()
+                    for point in re.findall(r"-\s*(.*?)(?=$|\n)", pos_text)
+                    if point.strip()
+                ]
+            negative_points = []
+            neg_section_match = re.search(
+                r"ネガティブポイント:(.*?)キーワード:", analysis_section, re.DOTALL
+            )
+            if neg_section_match:
+                neg_text = neg_section_match.group(1)
+                negative_points = [
+                    point.strip()
+                    for point in re.findall(r"-\s*(.*?)(?=$|\n)", neg_text)
+                    if point.strip()
+                ]
+            keywords = []
+            keyword_match = re.search(
+                r"キーワード:(.*?)(?=$)", analysis_section, re.DOTALL
+            )
+            if keyword_match:
+                keyword_text = keyword_match.group(1)
+                keywords = [
+                    word.strip()
+                    for word in re.findall(r"[\w\s]+", keyword_text)
+                    if word.strip()
+                ]
+            results.append(
+                {
+                    "review_id": review_id,
+                    "product_id": review["product_id"],
+                    "product_name": review["product_name"],
+                    "rating": review["rating"],
+                    "sentiment": sentiment,
+                    "sentiment_score": sentiment_score,
+                    "positive_points": positive_points,
+                    "negative_points": negative_points,
+                    "keywords": keywords,
+                    "original_review": review,
+                }
+            )
+        else:
+            results.append(
+                {
+                    "review_id": review_id,
+                    "product_id": review["product_id"],
+                    "product_name": review["product_name"],
+                    "rating": review["rating"],
+                    "sentiment": "不明",
+                    "sentiment_score": 3,
+                    "positive_points": [],
+                    "negative_points": [],
+                    "keywords": [],
+                    "original_review": review,
+                }
+            )
+    return results
+
+
+def measure(parser, text, reviews, repeat):
+    """パースの処理時間（1回あたりの秒数）と失敗率を計測します。"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        results = parser(text, reviews)
+    elapsed = (time.perf_counter() - start) / repeat
+    failures = sum(1 for r in results if r["sentiment"] == UNKNOWN_SENTIMENT)
+    return elapsed, failures / len(reviews)
+
+
+def main():
+    """メイン関数"""
+    parser = argparse.ArgumentParser(description="感情分析レスポンスのパースのベンチマーク")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[5, 50, 200, 1000], help="バッチサイズ")
+    parser.add_argument("--drift", type=float, default=0.1, help="自由形式テキストに表記ゆれを混ぜる割合")
+    parser.add_argument("--repeat", type=int, default=3, help="計測の繰り返し回数")
+    parser.add_argument("--seed", type=int, default=0, help="乱数シード")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    print(f"{'バッチサイズ':>8} | {'正規表現 (ms)':>12} {'失敗率':>7} | {'JSONスキーマ (ms)':>16} {'失敗率':>7}")
+    for size in args.batch_sizes:
+        reviews, analyses = generate_batch(size, args.seed)
+        text = render_text(analyses, args.drift, rng)
+        structured = json.dumps({"reviews": analyses}, ensure_ascii=False)
+
+        regex_time, regex_failure = measure(parse_sentiment_text, text, reviews, args.repeat)
+        json_time, json_failure = measure(parse_sentiment_analysis, structured, reviews, args.repeat)
+        print(
+            f"{size:>8} | {regex_time * 1000:>12.2f} {regex_failure:>7.1%} |"
+            f" {json_time * 1000:>16.2f} {json_failure:>7.1%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+レビューテキストのトークン化のベンチマーク
+
+サンプルのレビュー本文を組み合わせて合成した大量のレビューに対して、従来の tokenize_reviews の処理
+（1文字ずつの小文字化、レビューごとの正規表現・ストップワードの再構築、全トークンのリスト作成）と、
+tokenizer モジュールの一括処理の処理時間を比較し、単語の出現頻度が一致することを確認します。
+
+従来の処理は時間がかかるため、--legacy-limit 件までのレビューで計測し、
+100万件あたりの処理時間に換算して表示します。
+
+使い方:
+    python benchmark_tokenizer.py --reviews 1000000 --workers 4
+"""
+
+import argparse
+import os
+import random
+import re
+import time
+from collections import Counter
+
+from review_data import get_all_reviews
+from tokenizer import count_terms, term_document_matrix, tokenize_texts
+
+SENTENCE_PATTERN = re.compile(r"[^。！？]+[。！？]?")
+
+
+def generate_texts(count, seed=0):
+    """サンプルのレビュー本文の文をランダムに組み合わせて、合成したレビュー本文を生成します。"""
+    rng = random.Random(seed)
+    sentences = [
+        sentence
+        for review in get_all_reviews()
+        for sentence in SENTENCE_PATTERN.findall(review["title"] + "。" + review["text"])
+        if sentence.strip()
+    ]
+    return ["".join(rng.choices(sentences, k=rng.randint(2, 6))) for _ in range(count)]
+
+
+def legacy_tokenize(texts):
+    """従来の main.clean_review_text と tokenize_reviews の処理（全トークンのリストから頻度を集計）。"""
+    tokenized_reviews = []
+    all_tokens = []
+    for review in texts:
+        jp_word_pattern = re.compile(r'[一-龠]+|[ぁ-ん]+|[ァ-ヴー]+|[a-zA-Z]+|[0-9]+')
+        jp_stopwords = set([
+            'の', 'に', 'は', 'を', 'た', 'が', 'で', 'て', 'と', 'し', 'れ', 'さ',
+            'ある', 'いる', 'する', 'には', 'なる', 'から', 'まで', 'として', 'について',
+            'これ', 'それ', 'あれ', 'この', 'その', 'あの', 'ため', 'また', 'しかし',
+            'および', 'ただし', 'ところ', 'ながら', 'または', 'ほか',
+            'たり', 'だり', 'なお', 'たち', 'でも', 'もの', 'こと', 'より', 'など',
+            'なに', 'ので', 'みたい', 'これら', 'それら', 'において',
+        ])
+        important_words = [
+            'カメラ', '性能', 'バッテリー', '画面', '電池', '持ち', '画質', '充電',
+            '音質', '処理', '速度', '操作', '使い', '機能', '価格', '値段', '高級',
+            '安い', '高い', '軽い', '重い', '薄い', '厚い', '美しい', '優れた',
+            '素晴らしい', '最高', '便利', '不便', '快適', '不快', '問題', 'トラブル',
+            '故障', '修理', '不具合', '満足', '不満', '購入', 'デザイン', '使いやすい',
+            '使いにくい', '品質', '評価', '高評価', '低評価', '期待', '残念', '驚き',
+        ]
+        text_lower = ""
+        for char in review:
+            if 'a' <= char <= 'z' or 'A' <= char <= 'Z':
+                text_lower += char.lower()
+            else:
+                text_lower += char
+        text = re.sub(r'[!"#$%&\'()*+,-./:;<=>?@\[\\\]^_`{|}~]', "", text_lower)
+        text = re.sub(r"\s+", " ", text).strip()
+        filtered_tokens = [
+            token
+            for token in jp_word_pattern.findall(text)
+            if (len(token) >= 2 and token.lower() not in jp_stopwords) or token in important_words
+        ]
+        tokenized_reviews.append(filtered_tokens)
+        all_tokens.extend(filtered_tokens)
+    return Counter(all_tokens)
+
+
+def measure(label, func, count):
+    """処理時間を計測し、100万件あたりの処理時間に換算して表示します。"""
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<36} {count:>9,} 件 {elapsed:>8.2f} 秒  (100万件あたり {elapsed * 1_000_000 / count:>7.1f} 秒)")
+    return result
+
+
+def main():
+    """メイン関数"""
+    parser = argparse.ArgumentParser(description="レビューテキストのトークン化のベンチマーク")
+    parser.add_argument("--reviews", type=int, default=200000, help="合成するレビュー数")
+    parser.add_argument("--legacy-limit", type=int, default=20000, help="従来の処理で計測するレビュー数の上限")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="並行処理のプロセス数")
+    parser.add_argument("--seed", type=int, default=0, help="乱数シード")
+    args = parser.parse_args()
+
+    texts = generate_texts(args.reviews, args.seed)
+    print(f"合成レビュー: {len(texts):,} 件（平均 {sum(map(len, texts)) / len(texts):.0f} 文字）\n")
+
+    legacy_texts = texts[: args.legacy_limit]
+    legacy = measure("従来の tokenize_reviews", lambda: legacy_tokenize(legacy_texts), len(legacy_texts))
+    if count_terms(legacy_texts) != legacy:
+        raise SystemExit("単語の出現頻度が従来の処理と一致しません")
+
+    measure("tokenize_texts（レビューごとの単語）", lambda: tokenize_texts(texts), len(texts))
+    measure("count_terms（頻度の集計）", lambda: count_terms(texts), len(texts))
+    if args.workers > 1:
+        measure(
+            f"count_terms（{args.workers} プロセス）",
+            lambda: count_terms(texts, workers=args.workers),
+            len(texts),
+        )
+    try:
+        matrix, vocabulary = measure(
+            "term_document_matrix（疎行列）",
+            lambda: term_document_matrix(texts, workers=args.workers),
+            len(texts),
+        )
+        print(f"\n疎行列: {matrix.shape[0]:,} × {matrix.shape[1]:,}（非ゼロ要素 {matrix.nnz:,}）")
+    except ImportError:
+        print("\nscipy がインストールされていないため、疎行列の計測をスキップしました")
+    print("従来の処理と単語の出現頻度が一致しました")
+
+
+if __name__ == "__main__":
+    main()
@@ -11,9 +11,11 @@ import os
 import sys
 import json
 import argparse
+import hashlib
 from typing import List, Dict, Any, Optional, Union
 import math
 import re
+import time
 import pandas as pd
 import matplotlib.pyplot as plt
 import matplotlib
@@ -145,8 +147,30 @@ def setup_japanese_fonts():
 # 日本語フォントのセットアップを実行
 japanese_font_prop, japanese_font_family = setup_japanese_fonts()
 
+# バッチの並行実行とレート制限
+from batch_dispatcher import RateLimiter, estimate_tokens, run_batches
+
+# 感情分析の構造化出力（JSONスキーマ）とパーサー
+from sentiment_schema import (
+    SENTIMENT_TEXT_FORMAT,
+    UNKNOWN_SENTIMENT,
+    SentimentParseError,
+    build_sentiment_result,
+    parse_sentiment_analysis,
+)
+
+# 感情分析結果の永続キャッシュ
+from sentiment_cache import SentimentCache, content_key
+
+# レビューテキストの一括トークン化
+
+# レビューの集計の差分更新
+from review_analytics import ReviewAggregates
+
 # 商品レビューデータを読み込み
+from review_repository import ReviewRepository
 from review_data import (
+    get_repository,
     get_all_reviews,
     get_product_reviews,
     get_reviews_by_rating,
@@ -184,84 +208,6 @@ def prepare_reviews_dataframe(reviews):
     return df
 
 
-def clean_review_text(text):
-    """レビューテキストのクリーニングを行います。"""
-    # 日本語テキスト用のクリーニング
-    # 英数字は小文字に変換するが、日本語はそのまま
-    text_lower = ""
-    for char in text:
-        if 'a' <= char <= 'z' or 'A' <= char <= 'Z':
-            text_lower += char.lower()
-        else:
-            text_lower += char
-    
-    # 記号や特殊文字を除去（ただし日本語文字は保持）
-    text = re.sub(r'[!"#$%&\'()*+,-./:;<=>?@\[\\\]^_`{|}~]', "", text_lower)
-    
-    # 数字を除去（必要に応じてコメントアウト）
-    # text = re.sub(r"\d+", "", text)
-    
-    # 余分な空白を除去
-    text = re.sub(r"\s+", " ", text).strip()
-    
-    return text
-
-
-def tokenize_reviews(reviews_df, column="text"):
-    """レビューテキストをトークン化します。"""
-    # 日本語テキスト用のより良いトークン化
-    import re
-    
-    # 日本語の単語境界を認識するパターン（簡易版）
-    # 名詞や動詞などの単語を抽出するパターン
-    jp_word_pattern = re.compile(r'[一-龠]+|[ぁ-ん]+|[ァ-ヴー]+|[a-zA-Z]+|[0-9]+')
-    
-    # 一般的な日本語の助詞・助動詞・接続詞（ストップワード）
-    jp_stopwords = set([
-        'の', 'に', 'は', 'を', 'た', 'が', 'で', 'て', 'と', 'し', 'れ', 'さ',
-        'ある', 'いる', 'する', 'には', 'なる', 'から', 'まで', 'として', 'について',
-        'これ', 'それ', 'あれ', 'この', 'その', 'あの', 'ため', 'また', 'しかし',
-        'および', 'ただし', 'ところ', 'ながら', 'および', 'または', 'および', 'ほか',
-        'たり', 'だり', 'なお', 'たち', 'でも', 'もの', 'こと', 'より', 'など',
-        'なに', 'ので', 'みたい', 'これら', 'それら', 'において', 'において',
-    ])
-    
-    # レビューの重要な単語だけを抽出（名詞、形容詞、動詞など）
-    important_words = [
-        'カメラ', '性能', 'バッテリー', '画面', '電池', '持ち', '画質', '充電', 
-        '音質', '処理', '速度', '操作', '使い', '機能', '価格', '値段', '高級', 
-        '安い', '高い', '軽い', '重い', '薄い', '厚い', '美しい', '優れた', 
-        '素晴らしい', '最高', '便利', '不便', '快適', '不快', '問題', 'トラブル',
-        '故障', '修理', '不具合', '満足', '不満', '購入', 'デザイン', '使いやすい', 
-        '使いにくい', '品質', '評価', '高評価', '低評価', '期待', '残念', '驚き'
-    ]
-    
-    tokenized_reviews = []
-    all_tokens = []
-    
-    for review in reviews_df[column]:
-        # テキストをクリーニング
-        clean_text = clean_review_text(review)
-        
-        # 日本語の単語を抽出
-        tokens = jp_word_pattern.findall(clean_text)
-        
-        # フィルタリング（ストップワードを除去し、短すぎる単語も除去）
-        filtered_tokens = []
-        for token in tokens:
-            # 2文字以上、かつストップワードでない、または重要語リストにある単語
-            if (len(token) >= 2 and token.lower() not in jp_stopwords) or token in important_words:
-                filtered_tokens.append(token)
-        
-        tokenized_reviews.append(filtered_tokens)
-        all_tokens.extend(filtered_tokens)
-    
-    print(f"抽出された単語の例: {all_tokens[:20]}")
-    print(f"単語の総数: {len(all_tokens)}, ユニーク単語数: {len(set(all_tokens))}")
-    
-    return tokenized_reviews
-
-
 # --- 基本的な統計分析 ---
 def calculate_rating_distribution(reviews_df):
     """評価点の分布を計算します。"""
@@ -372,12 +318,17 @@ def plot_review_trends(monthly_counts, monthly_ratings, title="レビュート
     return plt
 
 
-def create_word_cloud(tokenized_reviews, title="頻出ワードクラウド"):
-    """トークン化されたレビューからワードクラウドを生成します。"""
-    all_tokens = [
-        token for review_tokens in tokenized_reviews for token in review_tokens
-    ]
-    word_freq = Counter(all_tokens)
+def create_word_cloud(tokenized_reviews=None, title="頻出ワードクラウド", word_freq=None):
+    """
+    トークン化されたレビューからワードクラウドを生成します。
+
+    集計済みの単語の出現頻度（tokenizer.count_terms の結果）を word_freq に指定した場合は、
+    tokenized_reviews の代わりにそれを使います。
+    """
+    if word_freq is None:
+        word_freq = Counter()
+        for review_tokens in tokenized_reviews:
+            word_freq.update(review_tokens)
     font_path = None
     potential_font_paths = []
     
@@ -503,125 +454,165 @@ def create_word_cloud(tokenized_reviews, title="頻出ワードクラウド"):
 
 
 # --- OpenAI APIを使用した高度な分析 ---
-def extract_sentiments_with_openai(client, reviews, batch_size=5):
-    """OpenAI APIを使用してレビューの感情分析を行います。"""
-    sentiments = []
-    for i in range(0, len(reviews), batch_size):
-        batch = reviews[i : i + batch_size]
-        prompt = f"""
+# 感情分析の出力トークン数の上限（レビュー1件あたり。TPMの見積もりにも使用）
+SENTIMENT_OUTPUT_TOKENS_PER_REVIEW = 300
+
+# 感情分析に使うモデルとインストラクション
+SENTIMENT_MODEL = "gpt-4o"
+SENTIMENT_INSTRUCTIONS = "あなたは製品レビュー分析の専門家です。与えられたレビューの感情分析、キーポイント抽出、キーワード特定を行ってください。"
+
+
+def build_sentiment_prompt(batch):
+    """感情分析のプロンプトを作成します（出力形式は SENTIMENT_SCHEMA で指定）。"""
+    return f"""
         以下の製品レビューを分析し、各レビューの感情（ポジティブ、ネガティブ、ニュートラル）を判定し、
         主要なポジティブポイントとネガティブポイントを抽出してください。
         
         レビュー:
         {json.dumps(batch, ensure_ascii=False, indent=2)}
         
-        各レビューについて以下の形式で回答してください:
-        - レビューID: (レビューのID)
-        - 感情: (ポジティブ/ネガティブ/ニュートラル)
-        - 感情スコア: (1-5の範囲で、5が最もポジティブ)
-        - ポジティブポイント: (箇条書きで最大3つ)
-        - ネガティブポイント: (箇条書きで最大3つ)
-        - キーワード: (重要なキーワードを最大5つ)
+        すべてのレビューについて、レビューIDごとに以下を回答してください:
+        - 感情: ポジティブ/ネガティブ/ニュートラル
+        - 感情スコア: 1-5の範囲で、5が最もポジティブ
+        - ポジティブポイント: 最大3つ
+        - ネガティブポイント: 最大3つ
+        - キーワード: 重要なキーワードを最大5つ
         """
-        try:
-            response = client.responses.create(
-                model="gpt-4o",
-                instructions="あなたは製品レビュー分析の専門家です。与えられたレビューの感情分析、キーポイント抽出、キーワード特定を行ってください。",
-                input=prompt,
-                max_output_tokens=4000,
-            )
-            analysis_text = response.output_text
-            reviews_analysis = parse_sentiment_analysis(analysis_text, batch)
-            sentiments.extend(reviews_analysis)
-            print(
-                f"バッチ {i//batch_size + 1}/{math.ceil(len(reviews)/batch_size)} の感情分析が完了しました"
-            )
-        except Exception as e:
-            print(f"エラー: {str(e)}")
-            print(f"バッチ {i//batch_size + 1} の処理に失敗しました。スキップします。")
-    return sentiments
 
 
-def parse_sentiment_analysis(analysis_text, original_reviews):
-    """OpenAI APIからのレスポンスをパースして構造化された感情分析データを抽出します。"""
-    results = []
-    for review in original_reviews:
-        review_id = review["review_id"]
-        pattern = rf"レビューID:\s*{review_id}.*?(?=レビューID:|$)"
-        match = re.search(pattern, analysis_text, re.DOTALL)
-        if match:
-            analysis_section = match.group(0)
-            sentiment_match = re.search(
-                r"感情:\s*(ポジティブ|ネガティブ|ニュートラル)", analysis_section
-            )
-            sentiment = sentiment_match.group(1) if sentiment_match else "不明"
-            score_match = re.search(r"感情スコア:\s*(\d+)", analysis_section)
-            sentiment_score = int(score_match.group(1)) if score_match else 3
-            positive_points = []
-            pos_section_match = re.search(
-                r"ポジティブポイント:(.*?)ネガティブポイント:",
-                analysis_section,
-                re.DOTALL,
-            )
-            if pos_section_match:
-                pos_text = pos_section_match.group(1)
-                positive_points = [
-                    point.strip()
-                    for point in re.findall(r"-\s*(.*?)(?=$|\n)", pos_text)
-                    if point.strip()
-                ]
-            negative_points = []
-            neg_section_match = re.search(
-                r"ネガティブポイント:(.*?)キーワード:", analysis_section, re.DOTALL
-            )
-            if neg_section_match:
-                neg_text = neg_section_match.group(1)
-                negative_points = [
-                    point.strip()
-                    for point in re.findall(r"-\s*(.*?)(?=$|\n)", neg_text)
-                    if point.strip()
-                ]
-            keywords = []
-            keyword_match = re.search(
-                r"キーワード:(.*?)(?=$)", analysis_section, re.DOTALL
-            )
-            if keyword_match:
-                keyword_text = keyword_match.group(1)
-                keywords = [
-                    word.strip()
-                    for word in re.findall(r"[\w\s]+", keyword_text)
-                    if word.strip()
-                ]
-            results.append(
-                {
-                    "review_id": review_id,
-                    "product_id": review["product_id"],
-                    "product_name": review["product_name"],
-                    "rating": review["rating"],
-                    "sentiment": sentiment,
-                    "sentiment_score": sentiment_score,
-                    "positive_points": positive_points,
-                    "negative_points": negative_points,
-                    "keywords": keywords,
-                    "original_review": review,
-                }
-            )
-        else:
-            results.append(
-                {
-                    "review_id": review_id,
-                    "product_id": review["product_id"],
-                    "product_name": review["product_name"],
-                    "rating": review["rating"],
-                    "sentiment": "不明",
-                    "sentiment_score": 3,
-                    "positive_points": [],
-                    "negative_points": [],
-                    "keywords": [],
-                    "original_review": review,
-                }
-            )
-    return results
+def compute_sentiment_prompt_version():
+    """インストラクション・プロンプト・出力スキーマの内容から、感情分析のプロンプトのバージョン（ハッシュ値）を計算します。"""
+    payload = json.dumps(
+        [SENTIMENT_INSTRUCTIONS, build_sentiment_prompt([]), SENTIMENT_TEXT_FORMAT],
+        ensure_ascii=False,
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:12]
+
+
+SENTIMENT_PROMPT_VERSION = compute_sentiment_prompt_version()
+
+
+def sentiment_output_tokens(batch):
+    """バッチの感情分析で指定する出力トークン数の上限を返します。"""
+    return SENTIMENT_OUTPUT_TOKENS_PER_REVIEW * len(batch) + 100
+
+
+def analyze_sentiment_batch(client, batch):
+    """
+    1バッチ分のレビューの感情分析をOpenAI APIで実行します（JSONスキーマによる構造化出力）。
+
+    出力が途中で終了した場合（出力トークン数の上限に達した場合など）や、出力を解析できない場合は
+    SentimentParseError を送出し、バッチごと再試行させます。
+    """
+    response = client.responses.create(
+        model=SENTIMENT_MODEL,
+        instructions=SENTIMENT_INSTRUCTIONS,
+        input=build_sentiment_prompt(batch),
+        text=SENTIMENT_TEXT_FORMAT,
+        max_output_tokens=sentiment_output_tokens(batch),
+    )
+    if getattr(response, "status", None) == "incomplete":
+        reason = getattr(getattr(response, "incomplete_details", None), "reason", None)
+        raise SentimentParseError(f"感情分析の出力が途中で終了しました（理由: {reason}）")
+    return parse_sentiment_analysis(response.output_text, batch)
+
+
+def extract_sentiments_with_openai(
+    client,
+    reviews,
+    batch_size=20,
+    concurrency=4,
+    requests_per_minute=None,
+    tokens_per_minute=None,
+    max_retries=5,
+    cache=None,
+):
+    """
+    OpenAI APIを使用してレビューの感情分析を行います。
+
+    複数のバッチを同時に送信し、RPM / TPM の上限を超えないように送信間隔を調整します。
+    失敗したバッチは指数バックオフで再試行し、結果はレビューの順序で返します。
+    キャッシュを指定した場合は、キャッシュにないレビューだけをAPIに送信します。
+
+    Args:
+        client (openai.Client): OpenAIクライアント
+        reviews (list): レビューのリスト
+        batch_size (int): 1リクエストで分析するレビュー数
+        concurrency (int): 同時に送信するバッチ数（1 の場合はデバッグ用に逐次処理）
+        requests_per_minute (int, optional): 1分あたりのリクエスト数の上限
+        tokens_per_minute (int, optional): 1分あたりのトークン数の上限
+        max_retries (int): バッチごとの再試行の最大回数
+        cache (SentimentCache, optional): 感情分析結果の永続キャッシュ
+
+    Returns:
+        list: レビューごとの感情分析結果（再試行しても失敗したバッチは感情「不明」で返す）
+    """
+    keys, cached = None, {}
+    pending = reviews
+    if cache is not None:
+        keys = [content_key(review, SENTIMENT_PROMPT_VERSION, SENTIMENT_MODEL) for review in reviews]
+        cached = cache.get_many(keys)
+        pending = [review for review, key in zip(reviews, keys) if key not in cached]
+        print(f"感情分析キャッシュ: {len(reviews) - len(pending)} 件ヒット / {len(pending)} 件を新規に分析します")
+
+    batches = [pending[i : i + batch_size] for i in range(0, len(pending), batch_size)]
+    rate_limiter = RateLimiter(requests_per_minute, tokens_per_minute)
+    start = time.monotonic()
+
+    def report_progress(completed, total, index, error):
+        elapsed = time.monotonic() - start
+        remaining = elapsed / completed * (total - completed)
+        status = "失敗しました" if error else "完了しました"
+        print(
+            f"バッチ {index + 1} の感情分析が{status}"
+            f"（{completed}/{total}, 経過 {elapsed:.1f}秒, 残り約 {remaining:.1f}秒）"
+        )
+        if error:
+            print(f"エラー: {str(error)}")
+
+    def report_retry(index, attempt, error, delay):
+        print(f"バッチ {index + 1} を {delay:.1f}秒後に再試行します（{attempt}回目）: {str(error)}")
+
+    outcomes = run_batches(
+        batches,
+        lambda batch: analyze_sentiment_batch(client, batch),
+        max_workers=concurrency,
+        rate_limiter=rate_limiter,
+        estimate=lambda batch: estimate_tokens(build_sentiment_prompt(batch)) + sentiment_output_tokens(batch),
+        max_retries=max_retries,
+        on_progress=report_progress,
+        on_retry=report_retry,
+    )
+
+    fresh = []
+    failed = 0
+    for batch, (result, error) in zip(batches, outcomes):
+        if error is not None:
+            failed += 1
+            # 失敗したバッチもレビューの件数と順序を保つため、感情「不明」の結果を入れる
+            result = [build_sentiment_result(review) for review in batch]
+        fresh.extend(result)
+    if failed:
+        print(f"警告: {failed}/{len(batches)} バッチの感情分析に失敗しました（感情「不明」として出力します）")
+
+    if cache is None:
+        return fresh
+
+    # キャッシュ済みの結果と新しく分析した結果をレビューの順序で結合し、新しい結果を保存する
+    sentiments = []
+    new_entries = []
+    fresh_results = iter(fresh)
+    for review, key in zip(reviews, keys):
+        if key in cached:
+            sentiments.append(build_sentiment_result(review, cached[key]))
+            continue
+        result = next(fresh_results)
+        sentiments.append(result)
+        if result["sentiment"] != UNKNOWN_SENTIMENT:
+            new_entries.append((key, result))
+    cache.put_many(new_entries)
+    return sentiments
 
 
 def extract_insights_with_openai(client, sentiment_analysis, product_name):
@@ -749,11 +740,33 @@ def generate_report_with_openai(
 
 
 # --- メイン処理関数 ---
-def analyze_product_reviews(client, product_id=None, output_dir="output"):
-    """製品レビューの分析を実行し、結果を可視化・出力します。"""
+def analyze_product_reviews(
+    client,
+    product_id=None,
+    output_dir="output",
+    batch_size=20,
+    concurrency=4,
+    requests_per_minute=None,
+    tokens_per_minute=None,
+    cache_path=None,
+    tokenize_workers=1,
+    repository=None,
+    analytics_path=None,
+):
+    """
+    製品レビューの分析を実行し、結果を可視化・出力します。
+
+    cache_path を指定した場合は、感情分析の結果をそのファイルにキャッシュし、
+    前回から変更のないレビューはAPIに送信しません。
+    tokenize_workers に2以上を指定した場合は、単語の集計を複数のプロセスで並行に行います
+    （既定値は1。プロセスの起動とテキストの受け渡しの負担が大きく、計測では速くなりませんでした）。
+    repository を指定した場合は、サンプルデータの代わりにそのリポジトリのレビューを分析します。
+    analytics_path を指定した場合は、評価点・月ごとの件数・単語の出現頻度の集計をそのファイルに保存し、
+    次回は追加されたレビューだけを集計に加えます。
+    """
     os.makedirs(output_dir, exist_ok=True)
     if product_id:
-        reviews = get_product_reviews(product_id)
+        reviews = (repository or get_repository()).find(product_id=product_id)
         if not reviews:
             print(f"製品ID '{product_id}' のレビューが見つかりません。")
             return
@@ -763,10 +776,13 @@ def analyze_product_reviews(client, product_id=None, output_dir="output"):
         product_id = "SP-100"
         product_name = "TechX Phone Pro"
     print(f"「{product_name}」のレビュー分析を開始します（合計 {len(reviews)} 件）")
-    reviews_df = prepare_reviews_dataframe(reviews)
-    rating_counts = calculate_rating_distribution(reviews_df)
-    monthly_counts, monthly_ratings = calculate_review_trends(reviews_df)
-    tokenized_reviews = tokenize_reviews(reviews_df)
+    aggregates = ReviewAggregates(analytics_path)
+    new_count = aggregates.update(reviews, workers=tokenize_workers)
+    print(f"集計に追加したレビュー: {new_count} 件（累計 {aggregates.review_count} 件）")
+    rating_counts = aggregates.rating_distribution()
+    monthly_counts, monthly_ratings = aggregates.review_trends()
+    word_freq = aggregates.word_frequencies()
+    print(f"頻出単語の例: {[token for token, _ in word_freq.most_common(20)]}")
     plt_rating = plot_rating_distribution(
         rating_counts, f"「{product_name}」の評価点分布"
     )
@@ -776,18 +792,18 @@ def analyze_product_reviews(client, product_id=None, output_dir="output"):
     )
     plt_trend.savefig(f"{output_dir}/{product_id}_review_trends.png")
     plt_wordcloud, word_freq = create_word_cloud(
-        tokenized_reviews, f"「{product_name}」のレビューワードクラウド"
+        title=f"「{product_name}」のレビューワードクラウド", word_freq=word_freq
     )
     plt_wordcloud.savefig(f"{output_dir}/{product_id}_wordcloud.png")
     stats = {
         "product_id": product_id,
         "product_name": product_name,
         "total_reviews": len(reviews),
-        "average_rating": reviews_df["rating"].mean(),
+        "average_rating": aggregates.average_rating(),
         "rating_distribution": rating_counts.to_dict(),
         "review_period": {
-            "start": reviews_df["date"].min().strftime("%Y-%m-%d"),
-            "end": reviews_df["date"].max().strftime("%Y-%m-%d"),
+            "start": aggregates.first_date,
+            "end": aggregates.last_date,
         },
         "top_keywords": dict(word_freq.most_common(20)),
     }
@@ -795,7 +811,15 @@ def analyze_product_reviews(client, product_id=None, output_dir="output"):
         json.dump(stats, f, ensure_ascii=False, indent=2)
     print("基本統計分析が完了しました。")
     print("OpenAI APIを使用した感情分析を開始します...")
-    sentiment_analysis = extract_sentiments_with_openai(client, reviews)
+    sentiment_analysis = extract_sentiments_with_openai(
+        client,
+        reviews,
+        batch_size=batch_size,
+        concurrency=concurrency,
+        requests_per_minute=requests_per_minute,
+        tokens_per_minute=tokens_per_minute,
+        cache=SentimentCache(cache_path) if cache_path else None,
+    )
     with open(
         f"{output_dir}/{product_id}_sentiment_analysis.json", "w", encoding="utf-8"
     ) as f:
@@ -830,6 +854,48 @@ def main():
     parser.add_argument(
         "--output", "-o", type=str, default="output", help="出力ディレクトリのパス"
     )
+    parser.add_argument(
+        "--batch-size", type=int, default=20, help="感情分析の1リクエストあたりのレビュー数"
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=4, help="同時に送信する感情分析のバッチ数"
+    )
+    parser.add_argument(
+        "--serial", action="store_true", help="感情分析のバッチを1つずつ順番に処理（デバッグ用）"
+    )
+    parser.add_argument(
+        "--rpm", type=int, default=None, help="1分あたりのリクエスト数の上限"
+    )
+    parser.add_argument(
+        "--tpm", type=int, default=None, help="1分あたりのトークン数の上限"
+    )
+    parser.add_argument(
+        "--cache",
+        type=str,
+        default=None,
+        help="感情分析キャッシュのファイルパス（デフォルト: 出力ディレクトリの sentiment_cache.sqlite3）",
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true", help="感情分析キャッシュを使わずにすべてのレビューを分析"
+    )
+    parser.add_argument(
+        "--reviews-file",
+        type=str,
+        default=None,
+        help="分析するレビューの Parquet / Arrow ファイル（未指定の場合はサンプルデータ）",
+    )
+    parser.add_argument(
+        "--checkpoint",
+        type=str,
+        default=None,
+        help="レビューの集計のチェックポイントファイル（デフォルト: 出力ディレクトリの {製品ID}_analytics.json）",
+    )
+    parser.add_argument(
+        "--no-checkpoint", action="store_true", help="チェックポイントを使わずにすべてのレビューを集計"
+    )
+    parser.add_argument(
+        "--tokenize-workers", type=int, default=1, help="単語の集計に使うプロセス数（デフォルト: 1。複数のプロセスでも速くならない場合が多い）"
+    )
     args = parser.parse_args()
     api_key = setup_environment()
     client = openai.Client(api_key=api_key)
@@ -850,7 +916,21 @@ def main():
             product_id = "SP-100"
     else:
         product_id = args.product
-    analyze_product_reviews(client, product_id, args.output)
+    analyze_product_reviews(
+        client,
+        product_id,
+        args.output,
+        batch_size=args.batch_size,
+        concurrency=1 if args.serial else args.concurrency,
+        requests_per_minute=args.rpm,
+        tokens_per_minute=args.tpm,
+        cache_path=None if args.no_cache else (args.cache or os.path.join(args.output, "sentiment_cache.sqlite3")),
+        tokenize_workers=args.tokenize_workers,
+        repository=ReviewRepository.from_file(args.reviews_file) if args.reviews_file else None,
+        analytics_path=None if args.no_checkpoint else (
+            args.checkpoint or os.path.join(args.output, f"{product_id}_analytics.json")
+        ),
+    )
     print("\n分析が完了しました！")
     print(f"結果は '{args.output}' ディレクトリに保存されています。")
 
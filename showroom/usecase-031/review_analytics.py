@@ -0,0 +1,202 @@
+"""
+レビューの集計の差分更新
+
+追記のみのレビューフィードに対して、評価点ごとの件数・月ごとの件数と評価点の合計・単語の出現頻度を
+チェックポイントファイル（JSON）に保存し、前回のチェックポイント以降に追加されたレビューだけを
+集計に加えます。集計の更新にかかる時間は追加されたレビューの数に比例します。
+
+集計結果は、main.calculate_rating_distribution / calculate_review_trends と同じ形の pandas.Series
+（plot_rating_distribution / plot_review_trends にそのまま渡せる形）と、create_word_cloud に渡せる
+単語の出現頻度（Counter）として取り出せます。
+
+フィードが追記のみであることは、前回までに集計したレビューの内容（ID・評価点・日付・本文）のハッシュ値で
+確認し、一致しない場合（集計済みのレビューの編集・削除）はすべてのレビューを集計し直します。
+ハッシュ値の確認は毎回すべての集計済みのレビューについて行いますが、単語の分割と集計よりはるかに軽い処理です。
+"""
+
+import hashlib
+import json
+import os
+from collections import Counter
+
+from tokenizer import count_terms
+
+CHECKPOINT_VERSION = 2
+
+# レビューのハッシュ値の和を求める法（SHA-256 の値の範囲）
+DIGEST_MODULUS = 1 << 256
+
+
+def review_month(date):
+    """レビューの日付（YYYY-MM-DD 形式の文字列や日付オブジェクト）から YYYY-MM 形式の月を返します。"""
+    return str(date)[:7]
+
+
+def reviews_digest(reviews, digest=0):
+    """
+    集計に使うレビューの内容（ID・評価点・日付・本文）のハッシュ値の和を、digest に加えて返します。
+
+    レビューごとの SHA-256 の和（2^256 を法とする）のため、レビューを分けて加えても同じ値になり、
+    チェックポイントに保存した値に追加されたレビューの分だけを加えて更新できます。
+    """
+    for review in reviews:
+        content = "\x1f".join(
+            (str(review["review_id"]), str(review["rating"]), str(review["date"])[:10], str(review["text"]))
+        )
+        digest += int.from_bytes(hashlib.sha256(content.encode("utf-8")).digest(), "big")
+    return digest % DIGEST_MODULUS
+
+
+class ReviewAggregates:
+    """
+    差分更新できるレビューの集計
+
+    Args:
+        checkpoint_path (str, optional): チェックポイントファイルのパス（None の場合は保存しない）
+    """
+
+    def __init__(self, checkpoint_path=None):
+        self.checkpoint_path = checkpoint_path
+        self._reset()
+        if checkpoint_path and os.path.exists(checkpoint_path):
+            self._load()
+
+    def _reset(self):
+        self.review_count = 0
+        self.last_review_id = None
+        self.content_digest = 0
+        self.rating_counts = Counter()
+        self.rating_sum = 0
+        self.monthly_counts = Counter()
+        self.monthly_rating_sums = Counter()
+        self.term_counts = Counter()
+        self.first_date = None
+        self.last_date = None
+
+    def _load(self):
+        with open(self.checkpoint_path, encoding="utf-8") as f:
+            state = json.load(f)
+        if state.get("version") != CHECKPOINT_VERSION:
+            # 形式の異なるチェックポイントは使わずに集計し直す
+            return
+        self.review_count = state["review_count"]
+        self.last_review_id = state["last_review_id"]
+        self.content_digest = int(state["content_digest"], 16)
+        # JSONのキーは文字列になるため、評価点は [評価点, 件数] の組で保存している
+        self.rating_counts = Counter({rating: count for rating, count in state["rating_counts"]})
+        self.rating_sum = state["rating_sum"]
+        self.monthly_counts = Counter(state["monthly_counts"])
+        self.monthly_rating_sums = Counter(state["monthly_rating_sums"])
+        self.term_counts = Counter(state["term_counts"])
+        self.first_date = state["first_date"]
+        self.last_date = state["last_date"]
+
+    def save(self):
+        """チェックポイントファイルに集計を保存します。"""
+        if not self.checkpoint_path:
+            return
+        state = {
+            "version": CHECKPOINT_VERSION,
+            "review_count": self.review_count,
+            "last_review_id": self.last_review_id,
+            "content_digest": format(self.content_digest, "x"),
+            "rating_counts": sorted(self.rating_counts.items()),
+            "rating_sum": self.rating_sum,
+            "monthly_counts": dict(self.monthly_counts),
+            "monthly_rating_sums": dict(self.monthly_rating_sums),
+            "term_counts": dict(self.term_counts),
+            "first_date": self.first_date,
+            "last_date": self.last_date,
+        }
+        directory = os.path.dirname(self.checkpoint_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # 書き込み中に中断してもチェックポイントが壊れないよう、一時ファイルを置き換える
+        temp_path = f"{self.checkpoint_path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f, ensure_ascii=False)
+        os.replace(temp_path, self.checkpoint_path)
+
+    def fold(self, reviews, workers=1):
+        """
+        レビューを集計に加えます。
+
+        Args:
+            reviews (list): 追加するレビュー
+            workers (int): 単語の集計に使うプロセス数
+        """
+        for review in reviews:
+            rating = review["rating"]
+            date = str(review["date"])[:10]
+            month = review_month(date)
+            self.rating_counts[rating] += 1
+            self.rating_sum += rating
+            self.monthly_counts[month] += 1
+            self.monthly_rating_sums[month] += rating
+            if self.first_date is None or date < self.first_date:
+                self.first_date = date
+            if self.last_date is None or date > self.last_date:
+                self.last_date = date
+        self.term_counts.update(count_terms([review["text"] for review in reviews], workers=workers))
+        if reviews:
+            self.review_count += len(reviews)
+            self.last_review_id = reviews[-1]["review_id"]
+            self.content_digest = reviews_digest(reviews, self.content_digest)
+
+    def update(self, reviews, workers=1):
+        """
+        追記のみのレビューのリストから、前回のチェックポイント以降のレビューだけを集計に加えて保存します。
+
+        Args:
+            reviews (list): これまでのすべてのレビュー（追加順）
+            workers (int): 単語の集計に使うプロセス数
+
+        Returns:
+            int: 新しく集計したレビューの数
+        """
+        if self.review_count and (
+            len(reviews) < self.review_count
+            or reviews_digest(reviews[: self.review_count]) != self.content_digest
+        ):
+            print("集計済みのレビューの編集または削除を検出したため、すべてのレビューを集計し直します。")
+            self._reset()
+        new_reviews = reviews[self.review_count :]
+        self.fold(new_reviews, workers=workers)
+        self.save()
+        return len(new_reviews)
+
+    # --- 集計結果 ---
+    def average_rating(self):
+        """平均評価点を返します。"""
+        return self.rating_sum / self.review_count if self.review_count else float("nan")
+
+    def rating_distribution(self):
+        """評価点ごとのレビュー数（calculate_rating_distribution と同じ形の Series）を返します。"""
+        import pandas as pd
+
+        ratings = sorted(self.rating_counts)
+        return pd.Series(
+            [self.rating_counts[rating] for rating in ratings],
+            index=pd.Index(ratings, name="rating"),
+            name="count",
+            dtype="int64",
+        )
+
+    def review_trends(self):
+        """月ごとのレビュー数と平均評価点（calculate_review_trends と同じ形の Series の組）を返します。"""
+        import pandas as pd
+
+        months = sorted(self.monthly_counts)
+        index = pd.Index(months, name="month")
+        monthly_counts = pd.Series([self.monthly_counts[m] for m in months], index=index, dtype="int64")
+        monthly_ratings = pd.Series(
+            [self.monthly_rating_sums[m] / self.monthly_counts[m] for m in months],
+            index=index,
+            name="rating",
+            dtype="float64",
+        )
+        return monthly_counts, monthly_ratings
+
+    def word_frequencies(self):
+        """単語の出現頻度（create_word_cloud の word_freq に渡せる Counter）を返します。"""
+        return Counter(self.term_counts)
@@ -3,8 +3,13 @@
 
 このモジュールでは、製品レビュー分析のためのサンプルデータを提供します。
 実際のアプリケーションでは、これらのデータはデータベースやCSVファイルから読み込みます。
+
+検索用の関数は、サンプルデータから一度だけ構築する ReviewRepository（review_repository.py）の
+インデックスを使います。
 """
 
+from review_repository import ReviewRepository
+
 # スマートフォン製品のレビューサンプル
 SMARTPHONE_REVIEWS = [
     {
@@ -473,75 +478,37 @@ EARPHONE_REVIEWS = [
 ]
 
 
+_repository = None
+
+
+def get_repository():
+    """サンプルデータのインデックス付きリポジトリを返します（初回の呼び出し時に構築）。"""
+    global _repository
+    if _repository is None:
+        _repository = ReviewRepository(SMARTPHONE_REVIEWS + LAPTOP_REVIEWS + EARPHONE_REVIEWS)
+    return _repository
+
+
 def get_all_reviews():
     """全ての製品レビューを取得します。"""
-    return SMARTPHONE_REVIEWS + LAPTOP_REVIEWS + EARPHONE_REVIEWS
+    return get_repository().all()
 
 
 def get_product_reviews(product_id=None):
     """指定された製品IDのレビューを取得します。製品IDが指定されていない場合は、全ての製品のレビューを返します。"""
-    all_reviews = get_all_reviews()
-
-    if product_id is None:
-        return all_reviews
-
-    return [review for review in all_reviews if review["product_id"] == product_id]
+    return get_repository().find(product_id=product_id)
 
 
 def get_reviews_by_rating(min_rating=None, max_rating=None):
     """評価点の範囲でレビューをフィルタリングします。"""
-    all_reviews = get_all_reviews()
-
-    if min_rating is None and max_rating is None:
-        return all_reviews
-
-    filtered_reviews = all_reviews
-
-    if min_rating is not None:
-        filtered_reviews = [
-            review for review in filtered_reviews if review["rating"] >= min_rating
-        ]
-
-    if max_rating is not None:
-        filtered_reviews = [
-            review for review in filtered_reviews if review["rating"] <= max_rating
-        ]
-
-    return filtered_reviews
+    return get_repository().find(min_rating=min_rating, max_rating=max_rating)
 
 
 def get_reviews_by_date_range(start_date=None, end_date=None):
     """日付範囲でレビューをフィルタリングします。"""
-    all_reviews = get_all_reviews()
-
-    if start_date is None and end_date is None:
-        return all_reviews
-
-    filtered_reviews = all_reviews
-
-    if start_date is not None:
-        filtered_reviews = [
-            review for review in filtered_reviews if review["date"] >= start_date
-        ]
-
-    if end_date is not None:
-        filtered_reviews = [
-            review for review in filtered_reviews if review["date"] <= end_date
-        ]
-
-    return filtered_reviews
+    return get_repository().find(start_date=start_date, end_date=end_date)
 
 
 def search_reviews(query):
     """レビューテキスト内でキーワード検索を行います。"""
-    all_reviews = get_all_reviews()
-
-    if not query:
-        return all_reviews
-
-    query = query.lower()
-    return [
-        review
-        for review in all_reviews
-        if query in review["title"].lower() or query in review["text"].lower()
-    ]
+    return get_repository().find(query=query)
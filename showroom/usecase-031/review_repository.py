@@ -0,0 +1,253 @@
+"""
+インデックス付きのレビューリポジトリ
+
+レビューを読み込み時に一度だけインデックス化し、製品ID・評価点・日付範囲・キーワードによる
+絞り込みをリスト全体の走査なしで行います。
+
+- 製品IDごとのバケット
+- 評価点ごとのバケット（評価点の分布も集計済み）
+- 日付順に並べたインデックス（日付範囲は二分探索）
+- タイトル・本文の文字バイグラムの転置インデックス（部分一致検索の候補を絞り込む）
+
+複数の条件を指定した場合は、最も候補の少ないインデックスから始めて1回の走査で残りの条件を判定します。
+結果は常に読み込み時のレビューの順序で返します。
+
+レビューはサンプルデータ（辞書のリスト）のほか、Parquet / Arrow（Feather）ファイルから読み込めます
+（ファイルの読み書きには pyarrow が必要です）。
+"""
+
+import bisect
+import datetime
+import os
+from collections import defaultdict
+
+# Parquet / Arrow ファイルとして扱う拡張子
+PARQUET_EXTENSIONS = (".parquet", ".pq")
+ARROW_EXTENSIONS = (".arrow", ".feather", ".ipc")
+
+
+def _bigrams(text):
+    return {text[i : i + 2] for i in range(len(text) - 1)}
+
+
+def _normalize_date(value):
+    """日付を従来のサンプルデータと同じ YYYY-MM-DD 形式の文字列に揃えます。"""
+    if isinstance(value, datetime.datetime):
+        value = value.date()
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+    return value
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError as e:
+        raise ImportError(
+            "Parquet / Arrow ファイルの読み書きには pyarrow が必要です（pip install pyarrow）"
+        ) from e
+
+
+class ReviewRepository:
+    """
+    インデックス付きのレビューリポジトリ
+
+    Args:
+        reviews (iterable): レビューの辞書（product_id, rating, date, title, text を含む）
+    """
+
+    def __init__(self, reviews):
+        self._reviews = []
+        self._by_product = defaultdict(list)
+        self._by_rating = defaultdict(list)
+        self._text_index = defaultdict(list)
+        for review in reviews:
+            self._add(review)
+        self._build_date_index()
+
+    def _add(self, review):
+        date = _normalize_date(review["date"])
+        if date is not review["date"]:
+            review = dict(review, date=date)
+        position = len(self._reviews)
+        self._reviews.append(review)
+        self._by_product[review["product_id"]].append(position)
+        self._by_rating[review["rating"]].append(position)
+        # タイトルと本文をまたいだ一致を防ぐため、間に改行を挟んでインデックス化する
+        text_index = self._text_index
+        for bigram in _bigrams(f"{review['title']}\n{review['text']}".lower()):
+            text_index[bigram].append(position)
+
+    def _build_date_index(self):
+        self._date_order = sorted(range(len(self._reviews)), key=lambda p: self._reviews[p]["date"])
+        self._sorted_dates = [self._reviews[p]["date"] for p in self._date_order]
+
+    def extend(self, reviews):
+        """レビューを追加し、インデックスを更新します。"""
+        for review in reviews:
+            self._add(review)
+        self._build_date_index()
+
+    def __len__(self):
+        return len(self._reviews)
+
+    def all(self):
+        """すべてのレビューを読み込み時の順序で返します。"""
+        return list(self._reviews)
+
+    def product_ids(self):
+        """製品IDの一覧を返します。"""
+        return list(self._by_product)
+
+    def rating_histogram(self, product_id=None):
+        """評価点ごとのレビュー数を返します（評価点の昇順）。"""
+        if product_id is None:
+            return {rating: len(self._by_rating[rating]) for rating in sorted(self._by_rating)}
+        histogram = {}
+        for position in self._by_product.get(product_id, []):
+            rating = self._reviews[position]["rating"]
+            histogram[rating] = histogram.get(rating, 0) + 1
+        return dict(sorted(histogram.items()))
+
+    # --- 条件ごとの候補 ---
+    def _rating_candidates(self, min_rating, max_rating):
+        buckets = [
+            bucket
+            for rating, bucket in self._by_rating.items()
+            if (min_rating is None or rating >= min_rating) and (max_rating is None or rating <= max_rating)
+        ]
+        return sum(map(len, buckets)), lambda: [position for bucket in buckets for position in bucket]
+
+    def _date_candidates(self, start_date, end_date):
+        lo = 0 if start_date is None else bisect.bisect_left(self._sorted_dates, start_date)
+        hi = len(self._sorted_dates) if end_date is None else bisect.bisect_right(self._sorted_dates, end_date)
+        return max(hi - lo, 0), lambda: self._date_order[lo:hi]
+
+    def _text_positions(self, query, limit):
+        """
+        検索語のバイグラムをすべて含むレビューの位置を返します。
+
+        1文字の検索語や、他の条件の候補数（limit）より絞り込めない場合は None を返し、
+        部分一致の判定を走査時に行います。
+        """
+        bigrams = _bigrams(query)
+        if not bigrams:
+            return None
+        postings = [self._text_index.get(bigram, []) for bigram in bigrams]
+        smallest = min(postings, key=len)
+        if len(smallest) >= limit:
+            return None
+        candidates = set(smallest)
+        for posting in postings:
+            if posting is not smallest:
+                candidates.intersection_update(posting)
+                if not candidates:
+                    break
+        return candidates
+
+    def find(
+        self,
+        product_id=None,
+        min_rating=None,
+        max_rating=None,
+        start_date=None,
+        end_date=None,
+        query=None,
+    ):
+        """
+        条件に一致するレビューを返します（指定しなかった条件は絞り込みに使いません）。
+
+        Args:
+            product_id (str, optional): 製品ID
+            min_rating (int, optional): 評価点の下限
+            max_rating (int, optional): 評価点の上限
+            start_date (str, optional): 日付の下限（YYYY-MM-DD）
+            end_date (str, optional): 日付の上限（YYYY-MM-DD）
+            query (str, optional): タイトルまたは本文に含まれるキーワード（大文字と小文字は区別しない）
+
+        Returns:
+            list: 条件に一致するレビュー（読み込み時の順序）
+        """
+        query = query.lower() if query else None
+        start_date = _normalize_date(start_date)
+        end_date = _normalize_date(end_date)
+
+        # 各インデックスの候補数を求め、最も候補の少ないインデックスの候補だけを展開する
+        sources = []
+        if product_id is not None:
+            bucket = self._by_product.get(product_id, [])
+            sources.append((len(bucket), lambda: bucket))
+        if min_rating is not None or max_rating is not None:
+            sources.append(self._rating_candidates(min_rating, max_rating))
+        if start_date is not None or end_date is not None:
+            sources.append(self._date_candidates(start_date, end_date))
+        if query:
+            limit = min(size for size, _ in sources) if sources else len(self._reviews) + 1
+            text_positions = self._text_positions(query, limit)
+            if text_positions is not None:
+                sources.append((len(text_positions), lambda: text_positions))
+
+        if sources:
+            _, expand = min(sources, key=lambda source: source[0])
+            candidates = sorted(expand())
+        else:
+            candidates = range(len(self._reviews))
+
+        results = []
+        for position in candidates:
+            review = self._reviews[position]
+            if product_id is not None and review["product_id"] != product_id:
+                continue
+            if min_rating is not None and review["rating"] < min_rating:
+                continue
+            if max_rating is not None and review["rating"] > max_rating:
+                continue
+            if start_date is not None and review["date"] < start_date:
+                continue
+            if end_date is not None and review["date"] > end_date:
+                continue
+            if query and query not in review["title"].lower() and query not in review["text"].lower():
+                continue
+            results.append(review)
+        return results
+
+    # --- ファイルの読み書き ---
+    @classmethod
+    def from_file(cls, path):
+        """
+        Parquet / Arrow（Feather）ファイルからレビューを読み込みます。
+
+        Args:
+            path (str): .parquet / .pq / .arrow / .feather / .ipc ファイルのパス
+        """
+        _require_pyarrow()
+        extension = os.path.splitext(path)[1].lower()
+        if extension in PARQUET_EXTENSIONS:
+            import pyarrow.parquet as pq
+
+            table = pq.read_table(path)
+        elif extension in ARROW_EXTENSIONS:
+            import pyarrow.feather as feather
+
+            table = feather.read_table(path)
+        else:
+            raise ValueError(f"対応していないファイル形式です: {path}")
+        return cls(table.to_pylist())
+
+    def to_file(self, path):
+        """レビューを Parquet / Arrow（Feather）ファイルに保存します（形式は拡張子で判定）。"""
+        _require_pyarrow()
+        import pyarrow as pa
+
+        table = pa.Table.from_pylist(self._reviews)
+        extension = os.path.splitext(path)[1].lower()
+        if extension in PARQUET_EXTENSIONS:
+            import pyarrow.parquet as pq
+
+            pq.write_table(table, path)
+        elif extension in ARROW_EXTENSIONS:
+            import pyarrow.feather as feather
+
+            feather.write_feather(table, path)
+        else:
+            raise ValueError(f"対応していないファイル形式です: {path}")
@@ -0,0 +1,68 @@
+"""
+感情分析結果の永続キャッシュ
+
+レビューの内容（タイトル・本文など）・プロンプトのバージョン・モデル名から計算したハッシュ値をキーとして、
+感情分析の結果をSQLiteファイルに保存します。
+
+毎回の分析では、キャッシュにないレビュー（新しいレビューや本文が編集されたレビュー）だけを
+APIに送信し、キャッシュ済みの結果と合わせて返します。プロンプトやモデルを変更した場合は
+キーが変わるため、古い結果が使われることはありません。
+
+キャッシュには本文から決まる解析結果（感情・スコア・ポイント・キーワード）のみを保存し、
+レビューIDや評価点などは分析のたびに元のレビューから補います。
+"""
+
+import hashlib
+import json
+
+from sqlite_store import SQLiteStore
+
+# キャッシュに保存する解析結果のフィールド
+ANALYSIS_FIELDS = ("sentiment", "sentiment_score", "positive_points", "negative_points", "keywords")
+
+# 解析結果に影響するレビューのフィールド（いずれかが編集された場合は再分析する）
+REVIEW_CONTENT_FIELDS = ("product_name", "rating", "title", "text")
+
+
+def content_key(review, prompt_version, model):
+    """レビューの内容・プロンプトのバージョン・モデル名からキャッシュのキー（SHA-256）を計算します。"""
+    content = [review.get(field) for field in REVIEW_CONTENT_FIELDS]
+    payload = json.dumps([model, prompt_version, content], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SentimentCache(SQLiteStore):
+    """
+    SQLiteファイルに保存する感情分析結果のキャッシュ（キー → 解析結果）
+
+    Args:
+        db_path (str): SQLiteデータベースファイルのパス
+    """
+
+    table = "sentiments"
+    value_column = "analysis"
+
+    def __init__(self, db_path):
+        super().__init__(db_path)
+        self.hits = 0
+        self.misses = 0
+
+    def encode(self, result):
+        """感情分析データ（ANALYSIS_FIELDS を含む辞書）から解析結果だけをJSONに変換します。"""
+        return json.dumps({field: result[field] for field in ANALYSIS_FIELDS}, ensure_ascii=False)
+
+    def decode(self, stored):
+        return json.loads(stored)
+
+    def get_many(self, keys):
+        """
+        複数のキーの解析結果をまとめて取得し、ヒット数とミス数を記録します。
+
+        Returns:
+            dict: キー → 解析結果（キャッシュにないキーは含まない）
+        """
+        keys = list(dict.fromkeys(keys))
+        found = super().get_many(keys)
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
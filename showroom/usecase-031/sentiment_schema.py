@@ -0,0 +1,127 @@
+"""
+感情分析の構造化出力
+
+感情分析のレスポンスを Responses API の構造化出力（text.format の json_schema）で受け取るための
+JSONスキーマと、そのレスポンスを感情分析データに変換するパーサーを提供します。
+
+モデルはスキーマに従ったJSONを返すため、パースは json.loads 1回とレビューIDによる突き合わせだけで済み、
+バッチサイズに比例した時間で処理できます。また、見出しの表記ゆれなどで解析に失敗することもありません。
+"""
+
+import json
+
+SENTIMENT_LABELS = ("ポジティブ", "ネガティブ", "ニュートラル")
+
+# 解析に失敗したレビューの感情と感情スコア
+UNKNOWN_SENTIMENT = "不明"
+DEFAULT_SENTIMENT_SCORE = 3
+
+class SentimentParseError(ValueError):
+    """感情分析の出力を解析できない場合（出力が途中で打ち切られた場合など）に送出する例外（バッチごと再試行する）"""
+
+
+SENTIMENT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "reviews": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "review_id": {"type": "string", "description": "レビューのID"},
+                    "sentiment": {"type": "string", "enum": list(SENTIMENT_LABELS)},
+                    "sentiment_score": {
+                        "type": "integer",
+                        "enum": [1, 2, 3, 4, 5],
+                        "description": "感情スコア（5が最もポジティブ）",
+                    },
+                    "positive_points": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "主要なポジティブポイント（最大3つ）",
+                    },
+                    "negative_points": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "主要なネガティブポイント（最大3つ）",
+                    },
+                    "keywords": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "重要なキーワード（最大5つ）",
+                    },
+                },
+                "required": [
+                    "review_id",
+                    "sentiment",
+                    "sentiment_score",
+                    "positive_points",
+                    "negative_points",
+                    "keywords",
+                ],
+                "additionalProperties": False,
+            },
+        }
+    },
+    "required": ["reviews"],
+    "additionalProperties": False,
+}
+
+# responses.create の text 引数に指定する出力形式
+SENTIMENT_TEXT_FORMAT = {
+    "format": {
+        "type": "json_schema",
+        "name": "review_sentiments",
+        "schema": SENTIMENT_SCHEMA,
+        "strict": True,
+    }
+}
+
+
+def build_sentiment_result(review, analysis=None):
+    """元のレビューと解析結果から感情分析データを作成します。"""
+    analysis = analysis or {}
+    sentiment = analysis.get("sentiment")
+    score = analysis.get("sentiment_score")
+    return {
+        "review_id": review["review_id"],
+        "product_id": review["product_id"],
+        "product_name": review["product_name"],
+        "rating": review["rating"],
+        "sentiment": sentiment if sentiment in SENTIMENT_LABELS else UNKNOWN_SENTIMENT,
+        "sentiment_score": score if isinstance(score, int) and 1 <= score <= 5 else DEFAULT_SENTIMENT_SCORE,
+        "positive_points": list(analysis.get("positive_points") or []),
+        "negative_points": list(analysis.get("negative_points") or []),
+        "keywords": list(analysis.get("keywords") or []),
+        "original_review": review,
+    }
+
+
+def parse_sentiment_analysis(analysis_text, original_reviews):
+    """
+    構造化出力のJSONをパースして、レビューごとの感情分析データを作成します。
+
+    Args:
+        analysis_text (str): SENTIMENT_SCHEMA に従ったJSON文字列
+        original_reviews (list): 分析を依頼したレビューのリスト
+
+    Returns:
+        list: 元のレビューと同じ順序の感情分析データ（モデルが結果を返さなかったレビューは感情「不明」）
+
+    Raises:
+        SentimentParseError: JSONとして解析できない場合や、reviews のリストがない場合
+    """
+    try:
+        data = json.loads(analysis_text or "")
+    except ValueError as e:
+        raise SentimentParseError(f"感情分析の出力をJSONとして解析できませんでした: {str(e)}") from e
+    items = data.get("reviews") if isinstance(data, dict) else None
+    if not isinstance(items, list):
+        raise SentimentParseError("感情分析の出力に reviews のリストがありません")
+
+    by_id = {}
+    for item in items:
+        if isinstance(item, dict) and "review_id" in item:
+            by_id.setdefault(str(item["review_id"]), item)
+
+    return [build_sentiment_result(review, by_id.get(str(review["review_id"]))) for review in original_reviews]
@@ -0,0 +1,104 @@
+"""
+SQLiteファイルに保存するキーと値の永続ストア
+
+キャッシュや翻訳メモリなど、ハッシュ値のキーと値の組を SQLite ファイルの1つのテーブルに保存する
+クラスの共通部分です。各クラスは SQLiteStore を継承し、テーブル名・列名と、必要に応じて
+値の変換（encode / decode）だけを定義します。
+
+- 複数のキーをまとめて取得・保存（SQLiteの変数の上限を超えないように分割して問い合わせ）
+- 同じキーの値は上書き（INSERT OR REPLACE）
+- 接続は操作ごとに開いて閉じるため、複数のスレッドやプロセスから同じファイルを使用可能
+
+usecase-034/sqlite_store.py のコピーです。変更はコピー元に行い、このファイルにも反映してください。
+"""
+
+import sqlite3
+import time
+from contextlib import contextmanager
+
+# 1回の問い合わせで指定するキーの数の上限
+QUERY_BATCH_SIZE = 500
+
+
+class SQLiteStore:
+    """
+    SQLiteファイルのテーブルに保存するキーと値のストア
+
+    サブクラスでは table（テーブル名）・key_column（キーの列名）・value_column（値の列名）を定義します。
+
+    Args:
+        db_path (str): SQLiteデータベースファイルのパス
+    """
+
+    table = None
+    key_column = "cache_key"
+    value_column = "value"
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        with self._connect() as conn:
+            conn.execute(
+                f"""
+                CREATE TABLE IF NOT EXISTS {self.table} (
+                    {self.key_column} TEXT PRIMARY KEY,
+                    {self.value_column} TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+                """
+            )
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def encode(self, value):
+        """保存する値をテーブルに格納する文字列に変換します（既定では変換しない）。"""
+        return value
+
+    def decode(self, stored):
+        """テーブルに格納した文字列を値に戻します（既定では変換しない）。"""
+        return stored
+
+    def get_many(self, keys):
+        """
+        複数のキーの値をまとめて取得します。
+
+        Returns:
+            dict: キー → 値（保存されていないキーは含まない）
+        """
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        with self._connect() as conn:
+            # SQLiteの変数の上限を超えないように分割して問い合わせる
+            for i in range(0, len(keys), QUERY_BATCH_SIZE):
+                chunk = keys[i : i + QUERY_BATCH_SIZE]
+                placeholders = ",".join("?" * len(chunk))
+                rows = conn.execute(
+                    f"SELECT {self.key_column}, {self.value_column} FROM {self.table} "
+                    f"WHERE {self.key_column} IN ({placeholders})",
+                    chunk,
+                ).fetchall()
+                found.update((key, self.decode(stored)) for key, stored in rows)
+        return found
+
+    def put_many(self, items):
+        """(キー, 値) の組をまとめて保存します。"""
+        now = time.time()
+        rows = [(key, self.encode(value), now) for key, value in items]
+        if not rows:
+            return
+        with self._connect() as conn:
+            conn.executemany(
+                f"INSERT OR REPLACE INTO {self.table} ({self.key_column}, {self.value_column}, created_at) "
+                "VALUES (?, ?, ?)",
+                rows,
+            )
+
+    def __len__(self):
+        with self._connect() as conn:
+            return conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
@@ -0,0 +1,195 @@
+"""
+レート制限付きのバッチ並行実行
+
+長い文書のチャンクをOpenAI APIに送信する際に、複数のチャンクを同時に処理しつつ、
+1分あたりのリクエスト数（RPM）とトークン数（TPM）の上限を超えないように送信を調整します。
+
+- RateLimiter: RPM / TPM のトークンバケット（上限に達した場合は空きができるまで待機）
+- call_with_retry: 指数バックオフ（ジッター付き）による再試行
+- run_batches: スレッドプールで N 件のチャンク（バッチ）を同時に処理し、結果を入力と同じ順序で返す
+
+usecase-031/batch_dispatcher.py のコピーです（モジュールの説明以外は同じ内容）。変更はコピー元に行い、
+このファイルにも反映してください。
+"""
+
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# 再試行しても結果が変わらないエラー（リクエスト内容の誤りなど）のHTTPステータス
+NON_RETRYABLE_STATUS = frozenset({400, 401, 403, 404, 422})
+
+
+def estimate_tokens(text):
+    """
+    テキストのトークン数を概算します。
+
+    日本語は1文字がおおよそ1トークン、英数字は4文字がおおよそ1トークンになるため、
+    ASCII以外の文字数とASCII文字数の1/4の合計を使います（レート制限の見積もり用）。
+    """
+    ascii_chars = sum(1 for c in text if ord(c) < 128)
+    return (len(text) - ascii_chars) + ascii_chars // 4 + 1
+
+
+class RateLimiter:
+    """
+    1分あたりのリクエスト数とトークン数を制限するトークンバケット
+
+    Args:
+        requests_per_minute (int, optional): 1分あたりのリクエスト数の上限（None の場合は制限なし）
+        tokens_per_minute (int, optional): 1分あたりのトークン数の上限（None の場合は制限なし）
+    """
+
+    def __init__(self, requests_per_minute=None, tokens_per_minute=None):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._request_allowance = float(requests_per_minute or 0)
+        self._token_allowance = float(tokens_per_minute or 0)
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        elapsed = now - self._updated_at
+        self._updated_at = now
+        if self.requests_per_minute:
+            self._request_allowance = min(
+                self.requests_per_minute,
+                self._request_allowance + elapsed * self.requests_per_minute / 60.0,
+            )
+        if self.tokens_per_minute:
+            self._token_allowance = min(
+                self.tokens_per_minute,
+                self._token_allowance + elapsed * self.tokens_per_minute / 60.0,
+            )
+
+    def acquire(self, tokens=0):
+        """
+        リクエスト1件分とトークン数分の枠が空くまで待機してから、枠を消費します。
+
+        1回の要求が1分あたりの上限を超える場合は、上限いっぱいまで空くのを待ちます。
+
+        Returns:
+            float: 待機した秒数
+        """
+        if self.tokens_per_minute:
+            tokens = min(tokens, self.tokens_per_minute)
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill(time.monotonic())
+                request_shortage = 1 - self._request_allowance if self.requests_per_minute else 0
+                token_shortage = tokens - self._token_allowance if self.tokens_per_minute else 0
+                if request_shortage <= 0 and token_shortage <= 0:
+                    if self.requests_per_minute:
+                        self._request_allowance -= 1
+                    if self.tokens_per_minute:
+                        self._token_allowance -= tokens
+                    return waited
+                delay = max(
+                    request_shortage * 60.0 / self.requests_per_minute if request_shortage > 0 else 0,
+                    token_shortage * 60.0 / self.tokens_per_minute if token_shortage > 0 else 0,
+                )
+            time.sleep(delay)
+            waited += delay
+
+
+def is_retryable(error):
+    """エラーが再試行で解決する可能性があるか判定します（レート制限・タイムアウト・サーバーエラーなど）。"""
+    status = getattr(error, "status_code", None)
+    return status not in NON_RETRYABLE_STATUS
+
+
+def call_with_retry(func, max_retries=5, base_delay=1.0, max_delay=60.0, on_retry=None):
+    """
+    関数を呼び出し、失敗した場合は指数バックオフで再試行します。
+
+    Args:
+        func (callable): 引数なしで呼び出す関数
+        max_retries (int): 再試行の最大回数
+        base_delay (float): 最初の再試行までの待機秒数（再試行ごとに2倍）
+        max_delay (float): 待機秒数の上限
+        on_retry (callable, optional): 再試行の前に (試行回数, エラー, 待機秒数) で呼び出す関数
+
+    Returns:
+        関数の戻り値（再試行しても失敗した場合は最後の例外を送出）
+    """
+    attempt = 0
+    while True:
+        try:
+            return func()
+        except Exception as e:
+            if attempt >= max_retries or not is_retryable(e):
+                raise
+            # 同時に失敗したリクエストが同じタイミングで再送しないようにジッターを加える
+            delay = min(max_delay, base_delay * (2 ** attempt)) * random.uniform(0.5, 1.0)
+            attempt += 1
+            if on_retry:
+                on_retry(attempt, e, delay)
+            time.sleep(delay)
+
+
+def run_batches(
+    batches,
+    worker,
+    max_workers=4,
+    rate_limiter=None,
+    estimate=None,
+    max_retries=5,
+    base_delay=1.0,
+    on_progress=None,
+    on_retry=None,
+):
+    """
+    バッチを並行に処理し、結果を入力と同じ順序で返します。
+
+    Args:
+        batches (list): バッチのリスト
+        worker (callable): バッチを受け取って結果を返す関数
+        max_workers (int): 同時に処理するバッチ数（1 の場合は呼び出し元のスレッドで順番に処理）
+        rate_limiter (RateLimiter, optional): 送信前に枠を確保するレートリミッター
+        estimate (callable, optional): バッチの消費トークン数を見積もる関数
+        max_retries (int): バッチごとの再試行の最大回数
+        base_delay (float): 最初の再試行までの待機秒数
+        on_progress (callable, optional): バッチの完了ごとに (完了数, 総数, バッチ番号, エラー) で呼び出す関数
+        on_retry (callable, optional): 再試行の前に (バッチ番号, 試行回数, エラー, 待機秒数) で呼び出す関数
+
+    Returns:
+        list: (結果, エラー) のリスト（成功したバッチのエラーは None、失敗したバッチの結果は None）
+    """
+
+    def process(index):
+        batch = batches[index]
+
+        def attempt():
+            if rate_limiter:
+                rate_limiter.acquire(estimate(batch) if estimate else 0)
+            return worker(batch)
+
+        retry_callback = (lambda n, e, d: on_retry(index, n, e, d)) if on_retry else None
+        try:
+            return call_with_retry(attempt, max_retries, base_delay, on_retry=retry_callback), None
+        except Exception as e:
+            return None, e
+
+    outcomes = [None] * len(batches)
+    completed = 0
+
+    if max_workers <= 1:
+        # デバッグ用の逐次処理（例外の追跡やブレークポイントの設定がしやすい）
+        for index in range(len(batches)):
+            outcomes[index] = process(index)
+            completed += 1
+            if on_progress:
+                on_progress(completed, len(batches), index, outcomes[index][1])
+        return outcomes
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="batch") as executor:
+        futures = {executor.submit(process, index): index for index in range(len(batches))}
+        for future in as_completed(futures):
+            index = futures[future]
+            outcomes[index] = future.result()
+            completed += 1
+            if on_progress:
+                on_progress(completed, len(batches), index, outcomes[index][1])
+    return outcomes
@@ -0,0 +1,110 @@
+"""
+チャンク分割のベンチマーク
+
+サンプルファイル（日本語・英語・フランス語）を繰り返して作成した数MBのテキストに対して、
+従来の文字数によるチャンク分割（main.chunk_text の従来の処理）と、text_chunker の
+トークン数によるチャンク分割の処理時間を比較します。
+
+テキストの大きさを倍にしたときに処理時間もおおよそ倍になること（線形時間）と、
+チャンクのトークン数が上限を超えないことを確認できます。
+
+使い方:
+    python benchmark_chunker.py --sizes 1 2 4 8 --max-tokens 1500
+"""
+
+import argparse
+import os
+import time
+
+from text_chunker import chunk_text_by_tokens, get_token_counter
+
+SAMPLE_FILES = ["sample_ja.txt", "sample_en.txt", "sample_fr.txt"]
+
+
+def load_sample_text():
+    """サンプルファイルを連結したテキストを返します。"""
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    texts = []
+    for name in SAMPLE_FILES:
+        with open(os.path.join(script_dir, name), encoding="utf-8") as f:
+            texts.append(f.read())
+    return "\n\n".join(texts)
+
+
+def legacy_chunk_text(text, max_chunk_size=4000):
+    """従来の main.chunk_text の処理（文字数で判定し、文字列の連結でチャンクを作成）。"""
+    try:
+        from nltk.tokenize import sent_tokenize
+
+        sentences = sent_tokenize(text)
+    except Exception:
+        sentences = [s.strip() for s in text.split('\n') if s.strip()]
+
+    chunks = []
+    current_chunk = ""
+    for sentence in sentences:
+        if len(current_chunk) + len(sentence) + 1 <= max_chunk_size:
+            current_chunk += sentence + " "
+        else:
+            if current_chunk:
+                chunks.append(current_chunk.strip())
+            current_chunk = sentence + " "
+            if len(sentence) > max_chunk_size:
+                chunks.pop()
+                words = sentence.split()
+                sub_chunk = ""
+                for word in words:
+                    if len(sub_chunk) + len(word) + 1 <= max_chunk_size:
+                        sub_chunk += word + " "
+                    else:
+                        chunks.append(sub_chunk.strip())
+                        sub_chunk = word + " "
+                if sub_chunk:
+                    chunks.append(sub_chunk.strip())
+                current_chunk = ""
+    if current_chunk:
+        chunks.append(current_chunk.strip())
+    return chunks
+
+
+def measure(func):
+    """処理時間（秒）と結果を返します。"""
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+def main():
+    """メイン関数"""
+    parser = argparse.ArgumentParser(description="チャンク分割のベンチマーク")
+    parser.add_argument("--sizes", type=float, nargs="+", default=[1, 2, 4, 8], help="テキストの大きさ（MB）")
+    parser.add_argument("--max-tokens", type=int, default=1500, help="1チャンクのトークン数の上限")
+    parser.add_argument("--overlap-tokens", type=int, default=0, help="チャンクのオーバーラップのトークン数")
+    args = parser.parse_args()
+
+    count_tokens = get_token_counter()
+    print(f"トークン数の計測: {'tiktoken' if count_tokens.__name__ == '<lambda>' else '概算（tiktoken 未インストール）'}\n")
+    sample = load_sample_text()
+    print(
+        f"{'サイズ (MB)':>10} | {'従来 (秒)':>9} {'最大トークン':>10} | "
+        f"{'トークン分割 (秒)':>15} {'MB/秒':>7} {'チャンク数':>9} {'最大トークン':>10}"
+    )
+    for size in args.sizes:
+        target = int(size * 1024 * 1024)
+        text = (sample * (target // len(sample.encode("utf-8")) + 1))
+        text = text.encode("utf-8")[:target].decode("utf-8", "ignore")
+
+        legacy_time, legacy_chunks = measure(lambda: legacy_chunk_text(text))
+        new_time, chunks = measure(
+            lambda: chunk_text_by_tokens(text, args.max_tokens, args.overlap_tokens, count_tokens)
+        )
+        legacy_max = max(count_tokens(chunk) for chunk in legacy_chunks)
+        new_max = max(count_tokens(chunk) for chunk in chunks)
+        print(
+            f"{size:>10.1f} | {legacy_time:>9.2f} {legacy_max:>10,} | "
+            f"{new_time:>15.2f} {size / new_time:>7.2f} {len(chunks):>9,} {new_max:>10,}"
+        )
+
+
+if __name__ == "__main__":
+    main()
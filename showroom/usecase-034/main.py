@@ -28,11 +28,25 @@ import seaborn as sns
 from langdetect import detect, DetectorFactory
 from nltk.tokenize import sent_tokenize
 import nltk
-import PyPDF2
 import docx
 from dotenv import load_dotenv
 import openai
 
+# チャンクの並行処理とレート制限
+from batch_dispatcher import RateLimiter, call_with_retry, estimate_tokens, run_batches
+
+# トークン数に基づくチャンク分割
+from text_chunker import DEFAULT_MAX_TOKENS, chunk_text_by_tokens, get_token_counter, segment_text
+
+# チャンク要約の永続キャッシュ
+from summary_cache import SummaryCache, summary_key
+
+# 翻訳メモリ
+from translation_memory import TranslationMemory, segment_key
+
+# PDFのページ単位の抽出
+from pdf_extractor import extract_pdf_text
+
 # 結果の再現性のために言語検出のシード値を固定
 DetectorFactory.seed = 0
 
@@ -71,8 +85,8 @@ def setup_environment():
     return api_key
 
 
-def read_file(file_path: str) -> Tuple[str, str]:
-    """ファイルを読み込み、テキスト内容とファイル拡張子を返します。"""
+def read_file(file_path: str, pdf_workers: int = 1) -> Tuple[str, str]:
+    """ファイルを読み込み、テキスト内容とファイル拡張子を返します（PDFは pdf_workers 個のプロセスで並行に抽出）。"""
     file_path = os.path.expanduser(file_path)
     file_ext = os.path.splitext(file_path)[1].lower()
     
@@ -84,12 +98,7 @@ def read_file(file_path: str) -> Tuple[str, str]:
         
         # PDFファイル
         elif file_ext == '.pdf':
-            content = ''
-            with open(file_path, 'rb') as f:
-                pdf_reader = PyPDF2.PdfReader(f)
-                for page_num in range(len(pdf_reader.pages)):
-                    page = pdf_reader.pages[page_num]
-                    content += page.extract_text() + '\n\n'
+            content = extract_pdf_text(file_path, separator='\n\n', workers=pdf_workers)
         
         # Word文書
         elif file_ext in ['.docx', '.doc']:
@@ -147,58 +156,14 @@ def get_language_name(language_code: str) -> str:
     return language_dict.get(language_code, f'その他 ({language_code})')
 
 
-def chunk_text(text: str, max_chunk_size: int = 4000) -> List[str]:
-    """テキストを文単位で分割し、指定サイズ以下のチャンクに分けます。"""
-    try:
-        # 通常の文分割を試みる
-        sentences = sent_tokenize(text)
-    except Exception as e:
-        print(f"chunk_text: 文分割エラー: {str(e)}")
-        # 代替として段落（改行）で分割
-        print("代替として段落による分割を使用します。")
-        sentences = [s.strip() for s in text.split('\n') if s.strip()]
-        if not sentences:
-            # 改行での分割が失敗した場合は、単純に文字数で分割
-            print("最終手段として固定長分割を使用します。")
-            sentences = [text[i:i+200] for i in range(0, len(text), 200)]
-    
-    chunks = []
-    current_chunk = ""
-    
-    for sentence in sentences:
-        # この文/段落を追加しても最大サイズを超えない場合
-        if len(current_chunk) + len(sentence) + 1 <= max_chunk_size:
-            current_chunk += sentence + " "
-        # 最大サイズを超える場合
-        else:
-            # 現在のチャンクが空でなければリストに追加
-            if current_chunk:
-                chunks.append(current_chunk.strip())
-            # 新しいチャンクを開始
-            current_chunk = sentence + " "
-            
-            # もし一文だけで最大サイズを超える場合は、その文自体を分割
-            if len(sentence) > max_chunk_size:
-                # 既に追加した文をチャンクから取り除く
-                chunks.pop()
-                # 文を単語単位で分割して複数のチャンクに
-                words = sentence.split()
-                sub_chunk = ""
-                for word in words:
-                    if len(sub_chunk) + len(word) + 1 <= max_chunk_size:
-                        sub_chunk += word + " "
-                    else:
-                        chunks.append(sub_chunk.strip())
-                        sub_chunk = word + " "
-                if sub_chunk:
-                    chunks.append(sub_chunk.strip())
-                current_chunk = ""
-    
-    # 最後のチャンクをリストに追加
-    if current_chunk:
-        chunks.append(current_chunk.strip())
-    
-    return chunks
+def chunk_text(text: str, max_tokens: int = DEFAULT_MAX_TOKENS, overlap_tokens: int = 0) -> List[str]:
+    """
+    テキストを文単位で分割し、トークン数が max_tokens 以下のチャンクに分けます。
+
+    日本語・中国語の句点や改行も文の区切りとして扱い、overlap_tokens を指定した場合は
+    前のチャンクの末尾の文を次のチャンクの先頭に重ねます。
+    """
+    return chunk_text_by_tokens(text, max_tokens=max_tokens, overlap_tokens=overlap_tokens)
 
 
 def calculate_chunk_statistics(chunks: List[str]) -> Dict[str, Any]:
@@ -213,17 +178,22 @@ def calculate_chunk_statistics(chunks: List[str]) -> Dict[str, Any]:
     }
 
 
-def translate_text(
-    client, text: str, source_lang: str, target_lang: str, 
-    preserve_formatting: bool = True, tech_terms: List[str] = None
+# 翻訳に使うモデル
+TRANSLATION_MODEL = "gpt-4o"
+
+# 翻訳1リクエストあたりの出力トークン数の上限
+TRANSLATION_MAX_OUTPUT_TOKENS = 4096
+
+
+def build_translation_instruction(
+    source_lang: str, target_lang: str, preserve_formatting: bool = True, tech_terms: List[str] = None
 ) -> str:
-    """テキストを翻訳します。"""
+    """翻訳の指示を生成します。"""
     # 技術用語リストを整形
     tech_terms_str = ""
     if tech_terms and len(tech_terms) > 0:
         tech_terms_str = "以下の専門用語や固有名詞は適切に処理してください：\n" + "\n".join(tech_terms)
     
-    # 翻訳指示を生成
     source_lang_name = get_language_name(source_lang)
     target_lang_name = get_language_name(target_lang)
     
@@ -232,14 +202,7 @@ def translate_text(
     else:
         formatting_instruction = ""
     
-    # テキストを適切なサイズにチャンク分割
-    chunks = chunk_text(text)
-    translated_chunks = []
-    
-    for i, chunk in enumerate(chunks):
-        print(f"チャンク {i+1}/{len(chunks)} を翻訳中...")
-        
-        instruction = f"""
+    return f"""
         これから{source_lang_name}から{target_lang_name}への翻訳をお願いします。
 
         【翻訳指示】
@@ -251,35 +214,240 @@ def translate_text(
 
         あなたは専門的な翻訳者として、上記の指示に従って以下のテキストを翻訳してください。
         """
-        
-        try:
-            response = client.responses.create(
-                model="gpt-4o",
-                instructions=instruction,
-                input=[{"role": "user", "content": [{"type": "input_text", "text": chunk}]}],
-                max_output_tokens=4096,
-            )
-            
-            translated_chunks.append(response.output_text)
-            
-            # APIレート制限を避けるために少し待機
-            time.sleep(0.5)
-            
-        except Exception as e:
-            print(f"翻訳エラー（チャンク {i+1}）: {str(e)}")
-            translated_chunks.append(f"[翻訳エラー: {str(e)}]")
-            traceback.print_exc()
+
+
+def translate_chunk(client, instruction: str, chunk: str) -> str:
+    """1つのチャンクを翻訳します。"""
+    response = client.responses.create(
+        model=TRANSLATION_MODEL,
+        instructions=instruction,
+        input=[{"role": "user", "content": [{"type": "input_text", "text": chunk}]}],
+        max_output_tokens=TRANSLATION_MAX_OUTPUT_TOKENS,
+    )
+    return response.output_text
+
+
+def translate_text(
+    client, text: str, source_lang: str, target_lang: str, 
+    preserve_formatting: bool = True, tech_terms: List[str] = None,
+    concurrency: int = 4, requests_per_minute: Optional[int] = None,
+    tokens_per_minute: Optional[int] = None, max_retries: int = 5,
+    memory: Optional[TranslationMemory] = None
+) -> str:
+    """
+    テキストを翻訳します。
+
+    チャンクを concurrency 件まで同時に翻訳し、RPM / TPM の上限を超えないように送信間隔を調整します。
+    失敗したチャンクは指数バックオフで再試行し、翻訳結果は元のチャンクの順序で結合します。
+    再試行しても翻訳できなかったチャンクがある場合は、エラーの目印を含んだ翻訳を返さずに例外を送出します。
+
+    memory を指定した場合は、テキストを内容に基づいて安定したセグメントに分割し、翻訳メモリにない
+    セグメント（文書内で同じ原文のセグメントは1回だけ）を翻訳して、翻訳メモリの翻訳と元の順序で結合します。
+    """
+    instruction = build_translation_instruction(source_lang, target_lang, preserve_formatting, tech_terms)
+    
+    # テキストを適切なサイズにチャンク分割（翻訳メモリを使う場合は編集しても区切りがずれにくいセグメントに分割）
+    segments = chunk_text(text) if memory is None else segment_text(text)
+    keys, remembered = None, {}
+    chunks = segments
+    if memory is not None:
+        keys = [
+            segment_key(segment, source_lang, target_lang, tech_terms, preserve_formatting, TRANSLATION_MODEL)
+            for segment in segments
+        ]
+        remembered = memory.get_many(keys)
+        sources = {}
+        for segment, key in zip(segments, keys):
+            if key not in remembered:
+                sources.setdefault(key, segment)
+        pending_keys = list(sources)
+        chunks = list(sources.values())
+        hits = sum(1 for key in keys if key in remembered)
+        duplicates = len(keys) - hits - len(chunks)
+        print(
+            f"翻訳メモリ: {len(segments)}セグメント中 {hits} 件ヒット、文書内の重複 {duplicates} 件、"
+            f"{len(chunks)} 件を新規に翻訳します"
+        )
+    rate_limiter = RateLimiter(requests_per_minute, tokens_per_minute)
+    start = time.monotonic()
+    
+    def estimate(chunk):
+        # 入力（指示とチャンク）と、原文と同程度の長さになる出力のトークン数を見積もる
+        return estimate_tokens(instruction + chunk) + min(TRANSLATION_MAX_OUTPUT_TOKENS, estimate_tokens(chunk))
+    
+    def report_progress(completed, total, index, error):
+        elapsed = time.monotonic() - start
+        status = "失敗しました" if error else "完了しました"
+        print(f"チャンク {index + 1} の翻訳が{status}（{completed}/{total}, 経過 {elapsed:.1f}秒）")
+    
+    def report_retry(index, attempt, error, delay):
+        print(f"チャンク {index + 1} を {delay:.1f}秒後に再試行します（{attempt}回目）: {str(error)}")
     
-    # 翻訳されたチャンクを結合
+    print(f"{len(chunks)}チャンクを最大{max(concurrency, 1)}件ずつ同時に翻訳します...")
+    outcomes = run_batches(
+        chunks,
+        lambda chunk: translate_chunk(client, instruction, chunk),
+        max_workers=concurrency,
+        rate_limiter=rate_limiter,
+        estimate=estimate,
+        max_retries=max_retries,
+        on_progress=report_progress,
+        on_retry=report_retry,
+    )
+    
+    if memory is not None:
+        # 翻訳できたセグメントは、他のセグメントが失敗した場合でも次回に再利用できるよう先に保存する
+        memory.put_many(
+            (key, translated) for key, (translated, error) in zip(pending_keys, outcomes) if error is None
+        )
+    
+    failed = [(i, error) for i, (_, error) in enumerate(outcomes) if error is not None]
+    if failed:
+        numbers = ", ".join(str(i + 1) for i, _ in failed)
+        raise RuntimeError(f"チャンク {numbers} の翻訳に失敗しました: {str(failed[0][1])}") from failed[0][1]
+    
+    if memory is None:
+        translated_chunks = [translated for translated, _ in outcomes]
+    else:
+        memory.record(len(segments), hits, duplicates, len(chunks))
+        remembered.update((key, translated) for key, (translated, _) in zip(pending_keys, outcomes))
+        translated_chunks = [remembered[key] for key in keys]
+    
+    # 翻訳されたチャンクを元の順序で結合
     result = "\n".join(translated_chunks)
     return result
 
 
+# 要約に使うモデル
+SUMMARY_MODEL = "gpt-4o"
+
+# map ステージ（チャンクごとの要約）と最終的な要約の出力トークン数の上限
+CHUNK_SUMMARY_MAX_OUTPUT_TOKENS = 2048
+SUMMARY_MAX_OUTPUT_TOKENS = 4096
+
+# reduce ステージで1回のリクエストにまとめる要約の合計トークン数の上限
+REDUCE_INPUT_TOKENS = 8000
+
+
+def build_chunk_summary_instruction(language: str) -> str:
+    """
+    map ステージ（チャンクごとの要約）の指示を生成します。
+
+    要約の長さや焦点に依存しない指示にすることで、それらを変えて要約し直す場合にも
+    チャンクごとの要約をキャッシュから再利用できます。
+    """
+    return f"""
+            次のテキストのセクションを要約してください。
+            これは長い文書の一部であり、最終的にこのセクションの要約を他のセクションと組み合わせます。
+
+            【要約指示】
+            - このセクションの重要なポイントを簡潔に要約してください。
+            - {get_language_name(language)}で作成してください。
+            """
+
+
+def build_reduce_instruction(language: str) -> str:
+    """reduce ステージ（複数の要約の中間的な統合）の指示を生成します。"""
+    return f"""
+            以下は長い文書の連続するセクションの要約です。
+            これらを統合して、1つのまとまった要約を作成してください。この要約はさらに他の要約と組み合わせます。
+
+            【要約指示】
+            - 重要なポイントを漏らさず、重複を排除して簡潔にまとめてください。
+            - {get_language_name(language)}で作成してください。
+            """
+
+
+def summarize_chunk(client, instruction: str, text: str, max_output_tokens: int) -> str:
+    """1つのテキストを指示に従って要約します。"""
+    response = client.responses.create(
+        model=SUMMARY_MODEL,
+        instructions=instruction,
+        input=[{"role": "user", "content": [{"type": "input_text", "text": text}]}],
+        max_output_tokens=max_output_tokens,
+    )
+    return response.output_text
+
+
+def summarize_many(
+    client, instruction: str, texts: List[str], max_output_tokens: int, label: str,
+    concurrency: int = 4, rate_limiter: Optional[RateLimiter] = None, max_retries: int = 5
+) -> List[Tuple[Optional[str], Optional[Exception]]]:
+    """
+    複数のテキストを同時に要約し、(要約, エラー) のリストを元の順序で返します。
+
+    再試行しても要約できなかったテキストは、要約が None でエラーに例外が入ります
+    （check_summaries で要約のリストに変換します）。
+    """
+    def report_progress(completed, total, index, error):
+        status = "失敗しました" if error else "完了しました"
+        print(f"{label} {index + 1} の要約が{status}（{completed}/{total}）")
+    
+    def report_retry(index, attempt, error, delay):
+        print(f"{label} {index + 1} を {delay:.1f}秒後に再試行します（{attempt}回目）: {str(error)}")
+    
+    outcomes = run_batches(
+        texts,
+        lambda text: summarize_chunk(client, instruction, text, max_output_tokens),
+        max_workers=concurrency,
+        rate_limiter=rate_limiter,
+        estimate=lambda text: estimate_tokens(instruction + text) + max_output_tokens,
+        max_retries=max_retries,
+        on_progress=report_progress,
+        on_retry=report_retry,
+    )
+    return outcomes
+
+
+def check_summaries(outcomes: List[Tuple[Optional[str], Optional[Exception]]], label: str) -> List[str]:
+    """summarize_many の結果から要約のリストを返します（要約できなかったテキストがある場合は例外を送出）。"""
+    failed = [(i, error) for i, (_, error) in enumerate(outcomes) if error is not None]
+    if failed:
+        numbers = ", ".join(str(i + 1) for i, _ in failed)
+        raise RuntimeError(f"{label} {numbers} の要約に失敗しました: {str(failed[0][1])}") from failed[0][1]
+    return [summary for summary, _ in outcomes]
+
+
+def group_by_tokens(texts: List[str], max_tokens: int) -> List[List[str]]:
+    """
+    連続するテキストを、合計トークン数が max_tokens 以下になるようにグループにまとめます。
+
+    reduce ステージが必ず進むように、各グループには（残りが1つの場合を除き）2つ以上のテキストを入れます。
+    """
+    count_tokens = get_token_counter()
+    groups = []
+    current, current_tokens = [], 0
+    for text in texts:
+        tokens = count_tokens(text)
+        if len(current) >= 2 and current_tokens + tokens > max_tokens:
+            groups.append(current)
+            current, current_tokens = [], 0
+        current.append(text)
+        current_tokens += tokens
+    if current:
+        groups.append(current)
+    return groups
+
+
 def summarize_text(
     client, text: str, language: str, summary_length: str = "medium", 
-    focus_area: str = "general", format_as_bullets: bool = False
+    focus_area: str = "general", format_as_bullets: bool = False,
+    concurrency: int = 4, requests_per_minute: Optional[int] = None,
+    tokens_per_minute: Optional[int] = None, max_retries: int = 5,
+    cache: Optional[SummaryCache] = None
 ) -> str:
-    """テキストを要約します。"""
+    """
+    テキストを要約します。
+
+    1チャンクに収まらない長い文書は map-reduce で要約します。
+
+    1. map: チャンクごとの要約を同時に作成（cache を指定した場合は作成済みの要約を再利用）
+    2. reduce: 要約の合計が REDUCE_INPUT_TOKENS を超える間は、連続する要約をまとめて統合する処理を繰り返す
+    3. 統合した要約から、要約の長さ・焦点・形式に従って最終的な要約を作成
+
+    再試行しても要約できなかった場合は、1チャンクの文書でも map-reduce でも、エラーの目印を含んだ
+    要約を返さずに例外を送出します（要約できたチャンクはキャッシュに保存してから送出）。
+    """
     # 要約長の設定
     length_settings = {
         "short": "全体の内容を簡潔に要約し、単一の段落（約100-200単語）にまとめてください。",
@@ -299,15 +467,8 @@ def summarize_text(
     format_instruction = "箇条書きのリスト形式で要約を提示してください。" if format_as_bullets else "段落形式で要約を提示してください。"
     
     # テキストを適切なサイズにチャンク分割
-    try:
-        chunks = chunk_text(text)
-        print(f"{len(chunks)}のチャンクに分割しました。")
-    except Exception as e:
-        print(f"チャンク分割エラー: {str(e)}")
-        # 極めて単純なフォールバック - 固定長で分割
-        print("テキストを単純な固定長分割に切り替えています...")
-        chunks = [text[i:i+3000] for i in range(0, len(text), 3000)]
-        print(f"単純分割で{len(chunks)}のチャンクに分割しました。")
+    chunks = chunk_text(text)
+    print(f"{len(chunks)}のチャンクに分割しました。")
     
     # チャンクが1つの場合は直接要約
     if len(chunks) == 1:
@@ -322,61 +483,64 @@ def summarize_text(
         """
         
         try:
-            response = client.responses.create(
-                model="gpt-4o",
-                instructions=instruction,
-                input=[{"role": "user", "content": [{"type": "input_text", "text": text}]}],
-                max_output_tokens=4096,
+            return call_with_retry(
+                lambda: summarize_chunk(client, instruction, text, SUMMARY_MAX_OUTPUT_TOKENS),
+                max_retries=max_retries,
             )
             
-            return response.output_text
-            
         except Exception as e:
-            print(f"要約エラー: {str(e)}")
-            traceback.print_exc()
-            return f"[要約エラー: {str(e)}]"
+            raise RuntimeError(f"要約に失敗しました: {str(e)}") from e
+    
+    # 複数チャンクの場合は map-reduce で要約
+    print(f"テキストが長いため、{len(chunks)}チャンクを map-reduce で要約します...")
+    rate_limiter = RateLimiter(requests_per_minute, tokens_per_minute)
+    
+    # map: チャンクごとの要約（キャッシュにないチャンクだけを要約）
+    map_instruction = build_chunk_summary_instruction(language)
+    keys, cached = None, {}
+    pending = chunks
+    if cache is not None:
+        keys = [summary_key(chunk, map_instruction, SUMMARY_MODEL) for chunk in chunks]
+        cached = cache.get_many(keys)
+        pending = [chunk for chunk, key in zip(chunks, keys) if key not in cached]
+        print(f"チャンク要約キャッシュ: {len(chunks) - len(pending)} 件ヒット / {len(pending)} 件を新規に要約します")
+    
+    outcomes = summarize_many(
+        client, map_instruction, pending, CHUNK_SUMMARY_MAX_OUTPUT_TOKENS, "チャンク",
+        concurrency=concurrency, rate_limiter=rate_limiter, max_retries=max_retries
+    )
+    
+    if cache is not None:
+        # 要約できたチャンクは、他のチャンクが失敗した場合でも次回に再利用できるよう先に保存する
+        cache.put_many(
+            (key, summary) for key, (summary, error) in zip([key for key in keys if key not in cached], outcomes)
+            if error is None
+        )
+    fresh = check_summaries(outcomes, "チャンク")
     
-    # 複数チャンクの場合は階層的要約
+    if cache is None:
+        summaries = fresh
     else:
-        print(f"テキストが長いため、{len(chunks)}チャンクを段階的に要約します...")
-        
-        # 各チャンクの要約を生成
-        chunk_summaries = []
-        
-        for i, chunk in enumerate(chunks):
-            print(f"チャンク {i+1}/{len(chunks)} を要約中...")
-            
-            chunk_instruction = f"""
-            次のテキストのセクションを要約してください。
-            これは長い文書の一部であり、最終的にこのセクションの要約を他のセクションと組み合わせます。
-
-            【要約指示】
-            - このセクションの重要なポイントを簡潔に要約してください。
-            - {get_language_name(language)}で作成してください。
-            """
-            
-            try:
-                response = client.responses.create(
-                    model="gpt-4o",
-                    instructions=chunk_instruction,
-                    input=[{"role": "user", "content": [{"type": "input_text", "text": chunk}]}],
-                    max_output_tokens=2048,
-                )
-                
-                chunk_summaries.append(response.output_text)
-                
-                # APIレート制限を避けるために少し待機
-                time.sleep(0.5)
-                
-            except Exception as e:
-                print(f"セクション要約エラー（チャンク {i+1}）: {str(e)}")
-                chunk_summaries.append(f"[要約エラー: {str(e)}]")
-                traceback.print_exc()
-        
-        # 最終的な要約を生成
-        combined_summaries = "\n\n".join(chunk_summaries)
-        
-        final_instruction = f"""
+        fresh_summaries = iter(fresh)
+        summaries = [cached[key] if key in cached else next(fresh_summaries) for key in keys]
+    
+    # reduce: 要約の合計が1回のリクエストに収まるまで、連続する要約をまとめて統合する
+    reduce_instruction = build_reduce_instruction(language)
+    level = 1
+    while len(summaries) > 1 and sum(map(get_token_counter(), summaries)) > REDUCE_INPUT_TOKENS:
+        groups = group_by_tokens(summaries, REDUCE_INPUT_TOKENS)
+        print(f"要約の統合（段階 {level}）: {len(summaries)}件の要約を{len(groups)}件にまとめます...")
+        summaries = check_summaries(summarize_many(
+            client, reduce_instruction, ["\n\n".join(group) for group in groups],
+            CHUNK_SUMMARY_MAX_OUTPUT_TOKENS, f"統合 {level}-",
+            concurrency=concurrency, rate_limiter=rate_limiter, max_retries=max_retries
+        ), f"統合 {level}-")
+        level += 1
+    
+    # 最終的な要約を生成
+    combined_summaries = "\n\n".join(summaries)
+    
+    final_instruction = f"""
         以下は長い文書の各セクションから生成された要約です。
         これらの要約を統合して、文書全体の一貫性のある要約を作成してください。
 
@@ -387,21 +551,16 @@ def summarize_text(
         - {get_language_name(language)}で要約を作成してください。
         - 重複を排除し、情報を整理して、一貫性のある流れで要約を提示してください。
         """
+    
+    try:
+        rate_limiter.acquire(estimate_tokens(final_instruction + combined_summaries) + SUMMARY_MAX_OUTPUT_TOKENS)
+        return call_with_retry(
+            lambda: summarize_chunk(client, final_instruction, combined_summaries, SUMMARY_MAX_OUTPUT_TOKENS),
+            max_retries=max_retries,
+        )
         
-        try:
-            response = client.responses.create(
-                model="gpt-4o",
-                instructions=final_instruction,
-                input=[{"role": "user", "content": [{"type": "input_text", "text": combined_summaries}]}],
-                max_output_tokens=4096,
-            )
-            
-            return response.output_text
-            
-        except Exception as e:
-            print(f"最終要約エラー: {str(e)}")
-            traceback.print_exc()
-            return f"[最終要約エラー: {str(e)}]"
+    except Exception as e:
+        raise RuntimeError(f"最終要約に失敗しました: {str(e)}") from e
 
 
 def analyze_document(text: str, language: str) -> Dict[str, Any]:
@@ -444,9 +603,14 @@ def analyze_document(text: str, language: str) -> Dict[str, Any]:
 
 def create_document_report(
     content: str, analysis: Dict[str, Any], summary: str = None, 
-    translated_text: str = None, target_lang: str = None
+    translated_text: str = None, target_lang: str = None,
+    translation_stats: Optional[Dict[str, Any]] = None
 ) -> str:
-    """ドキュメントの分析レポートを作成します。"""
+    """
+    ドキュメントの分析レポートを作成します。
+
+    translation_stats（TranslationMemory.stats() の結果）を指定した場合は、翻訳メモリの利用状況も記載します。
+    """
     report = f"""# ドキュメント分析レポート
 生成日時: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
 
@@ -469,6 +633,17 @@ def create_document_report(
     if translated_text and target_lang:
         report += f"\n## {get_language_name(target_lang)}への翻訳\n{translated_text}\n"
     
+    if translation_stats and translation_stats["segments"]:
+        report += f"""
+## 翻訳メモリ
+- セグメント数: {translation_stats['segments']}
+- 翻訳メモリから再利用: {translation_stats['hits']}
+- 文書内の重複: {translation_stats['duplicates']}
+- 新規に翻訳: {translation_stats['translated']}
+- 再利用率: {translation_stats['hit_rate']:.1%}
+- 翻訳メモリの登録数: {translation_stats['entries']}
+"""
+    
     return report
 
 
@@ -550,6 +725,38 @@ def main():
         "--output-dir", "-o", type=str, default="output",
         help="出力ディレクトリ"
     )
+    parser.add_argument(
+        "--concurrency", type=int, default=4,
+        help="同時に翻訳・要約するチャンク数（1 の場合は1つずつ順番に処理）"
+    )
+    parser.add_argument(
+        "--translation-memory", type=str, default=None,
+        help="翻訳メモリのファイルパス（デフォルト: 出力ディレクトリの translation_memory.sqlite3）"
+    )
+    parser.add_argument(
+        "--no-translation-memory", action="store_true",
+        help="翻訳メモリを使わずにすべてのチャンクを翻訳"
+    )
+    parser.add_argument(
+        "--summary-cache", type=str, default=None,
+        help="チャンク要約キャッシュのファイルパス（デフォルト: 出力ディレクトリの summary_cache.sqlite3）"
+    )
+    parser.add_argument(
+        "--no-summary-cache", action="store_true",
+        help="チャンク要約キャッシュを使わずにすべてのチャンクを要約"
+    )
+    parser.add_argument(
+        "--pdf-workers", type=int, default=1,
+        help="PDFのページを並行に抽出するプロセス数"
+    )
+    parser.add_argument(
+        "--rpm", type=int, default=None,
+        help="1分あたりのリクエスト数の上限"
+    )
+    parser.add_argument(
+        "--tpm", type=int, default=None,
+        help="1分あたりのトークン数の上限"
+    )
     
     args = parser.parse_args()
     
@@ -565,7 +772,7 @@ def main():
         
         # ファイル読み込み
         print(f"ファイルを読み込んでいます: {args.file}")
-        content, file_ext = read_file(args.file)
+        content, file_ext = read_file(args.file, pdf_workers=args.pdf_workers)
         
         if not content:
             print("ファイルの内容が空または読み込みに失敗しました。")
@@ -594,12 +801,22 @@ def main():
         translated_text = None
         summary = None
         
+        translation_memory = None
+        if args.mode in ["translate", "all"] and not args.no_translation_memory:
+            translation_memory = TranslationMemory(
+                args.translation_memory or os.path.join(output_dir, "translation_memory.sqlite3")
+            )
+        
         if args.mode in ["translate", "all"]:
             print(f"{get_language_name(source_lang)}から{get_language_name(args.target_lang)}へ翻訳しています...")
             translated_text = translate_text(
                 client, content, source_lang, args.target_lang,
                 preserve_formatting=args.preserve_formatting,
-                tech_terms=args.tech_terms
+                tech_terms=args.tech_terms,
+                concurrency=args.concurrency,
+                requests_per_minute=args.rpm,
+                tokens_per_minute=args.tpm,
+                memory=translation_memory
             )
             
             # 翻訳結果を保存
@@ -617,7 +834,13 @@ def main():
                     client, summary_text, summary_lang,
                     summary_length=args.summary_length,
                     focus_area=args.summary_focus,
-                    format_as_bullets=args.bullet_points
+                    format_as_bullets=args.bullet_points,
+                    concurrency=args.concurrency,
+                    requests_per_minute=args.rpm,
+                    tokens_per_minute=args.tpm,
+                    cache=None if args.no_summary_cache else SummaryCache(
+                        args.summary_cache or os.path.join(output_dir, "summary_cache.sqlite3")
+                    )
                 )
                 
                 # 要約結果を保存
@@ -627,7 +850,8 @@ def main():
         # 分析レポートを作成
         if args.mode in ["analyze", "all"]:
             report = create_document_report(
-                content, analysis, summary, translated_text, args.target_lang
+                content, analysis, summary, translated_text, args.target_lang,
+                translation_stats=translation_memory.stats() if translation_memory else None
             )
             
             # 分析レポートを保存
@@ -0,0 +1,50 @@
+"""
+チャンク要約の永続キャッシュ
+
+長い文書を要約する際の map ステージ（チャンクごとの要約）の結果を、チャンクの本文・要約の指示・
+モデル名から計算したハッシュ値をキーとして SQLite ファイルに保存します。
+
+チャンクごとの要約は要約の長さ（summary_length）や焦点（focus_area）に依存しない指示で作成するため、
+これらを変えて同じ文書を要約し直す場合は、map ステージの結果をすべてキャッシュから再利用できます。
+"""
+
+import hashlib
+import json
+
+from sqlite_store import SQLiteStore
+
+
+def summary_key(chunk, instruction, model):
+    """チャンクの本文・指示・モデル名からキャッシュのキー（SHA-256）を計算します。"""
+    payload = json.dumps([model, instruction, chunk], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SummaryCache(SQLiteStore):
+    """
+    SQLiteファイルに保存するチャンク要約のキャッシュ（キー → 要約）
+
+    Args:
+        db_path (str): SQLiteデータベースファイルのパス
+    """
+
+    table = "chunk_summaries"
+    value_column = "summary"
+
+    def __init__(self, db_path):
+        super().__init__(db_path)
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, keys):
+        """
+        複数のキーの要約をまとめて取得し、ヒット数とミス数を記録します。
+
+        Returns:
+            dict: キー → 要約（キャッシュにないキーは含まない）
+        """
+        keys = list(dict.fromkeys(keys))
+        found = super().get_many(keys)
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
@@ -0,0 +1,230 @@
+"""
+トークン数に基づくテキストのチャンク分割
+
+長い文書をモデルに送信できる大きさのチャンクに分割します。
+
+- チャンクの大きさは文字数ではなく、ローカルのトークナイザー（tiktoken）で数えたトークン数で判定
+  （tiktoken がインストールされていない場合は batch_dispatcher.estimate_tokens の概算を使用）
+- 文の区切りは英語などのピリオドに加えて、日本語・中国語の「。」「！」「？」や改行も認識
+- 分割した文はリストに集めてから1回だけ結合するため、処理時間はテキストの長さに比例
+- 1文がチャンクの上限を超える場合は、その文だけを単語または文字の単位で分割
+- 前のチャンクの末尾の文を次のチャンクの先頭に重ねる（オーバーラップ）指定が可能
+- 翻訳メモリ用に、段落の内容から区切りを決める（編集しても区切りがずれにくい）segment_text を提供
+
+分割はテキストの空白や改行を保ったまま行うため、オーバーラップなしの場合はチャンクを
+順に連結すると元のテキストに戻ります（各チャンクの前後の空白は除去して返します）。
+
+usecase-036 にコピーがあります（estimate_tokens の定義以外は同じ内容）。変更した場合はコピーも更新してください。
+"""
+
+import hashlib
+import re
+from functools import lru_cache
+
+from batch_dispatcher import estimate_tokens
+
+# チャンクの長さの上限（トークン数）の既定値
+DEFAULT_MAX_TOKENS = 1500
+
+# 文の区切り: 句点・感嘆符・疑問符（全角・半角）とそれに続く閉じ括弧・引用符、空白の前のピリオド、改行
+# （空白の前にないピリオドは inner として区別し、小数点や略語の一部として次の断片につなげる）
+SENTENCE_PATTERN = re.compile(
+    r"[^。．！？!?.\n]*"
+    r"(?:[。．！？!?]+[」』）)\]”’\"']*\s*|\.+[」』）)\]”’\"']*(?=\s|$)\s*|(?P<inner>\.)|\n\s*|$)"
+)
+
+# 文の終わりにならない英語の略語（敬称や「e.g.」など）。ピリオドの後に空白が続いても、同じ行の次の語とつなげる
+ABBREVIATION_PATTERN = re.compile(r"(?<![\w.])(?:Mr|Mrs|Ms|Dr|Prof|St|vs|cf|Fig|e\.g|i\.e)\.\Z")
+
+# 長すぎる文を分割する単位（空白を含む単語）
+WORD_PATTERN = re.compile(r"\S+\s*|\s+")
+
+
+@lru_cache(maxsize=None)
+def get_token_counter(model="gpt-4o"):
+    """
+    テキストのトークン数を数える関数を返します。
+
+    tiktoken がインストールされている場合はモデルのエンコーディングで正確に数え、
+    インストールされていない場合は文字種による概算を使います。
+    """
+    try:
+        import tiktoken
+    except ImportError:
+        return estimate_tokens
+    try:
+        encoding = tiktoken.encoding_for_model(model)
+    except KeyError:
+        encoding = tiktoken.get_encoding("o200k_base")
+    return lambda text: len(encoding.encode(text, disallowed_special=()))
+
+
+def _ends_with_abbreviation(text, end):
+    """text の end の直前が略語（ABBREVIATION_PATTERN）のピリオドかどうかを返します。"""
+    return ABBREVIATION_PATTERN.search(text, max(0, end - 6), end) is not None
+
+
+def split_sentences(text):
+    """
+    テキストを文に分割します（空白や改行は直前の文に含めるため、連結すると元のテキストに戻ります）。
+
+    日本語・中国語の句点や全角の感嘆符・疑問符、英語などのピリオド、改行を文の区切りとして扱います。
+    小数点や「Dr.」「e.g.」などの略語（ABBREVIATION_PATTERN）のピリオドでは区切りません。
+    """
+    sentences = []
+    pending = []
+    for match in SENTENCE_PATTERN.finditer(text):
+        piece = match.group()
+        if not piece:
+            continue
+        pending.append(piece)
+        if match.group("inner") is None and not _ends_with_abbreviation(text, match.start() + len(piece.rstrip(" \t"))):
+            sentences.append("".join(pending))
+            pending = []
+    if pending:
+        sentences.append("".join(pending))
+    return sentences
+
+
+def _split_long_piece(piece, max_tokens, count_tokens):
+    """上限を超える1文を、単語（空白のない言語では文字）の単位で上限以下の断片に分割します。"""
+    parts = []
+    buffer, buffer_tokens = [], 0
+    for word in WORD_PATTERN.findall(piece):
+        word_tokens = count_tokens(word)
+        if word_tokens > max_tokens:
+            # 空白を含まない長い文字列は、上限のトークン数と同じ文字数の範囲から縮めながら分割する
+            if buffer:
+                parts.append(("".join(buffer), buffer_tokens))
+                buffer, buffer_tokens = [], 0
+            start = 0
+            while start < len(word):
+                size = max_tokens
+                while True:
+                    window = word[start : start + size]
+                    window_tokens = count_tokens(window)
+                    if window_tokens <= max_tokens or size == 1:
+                        break
+                    size = max(1, size // 2)
+                parts.append((window, window_tokens))
+                start += len(window)
+            continue
+        if buffer and buffer_tokens + word_tokens > max_tokens:
+            parts.append(("".join(buffer), buffer_tokens))
+            buffer, buffer_tokens = [], 0
+        buffer.append(word)
+        buffer_tokens += word_tokens
+    if buffer:
+        parts.append(("".join(buffer), buffer_tokens))
+    return parts
+
+
+def chunk_text_by_tokens(text, max_tokens=DEFAULT_MAX_TOKENS, overlap_tokens=0, count_tokens=None):
+    """
+    テキストをトークン数が上限以下のチャンクに分割します。
+
+    Args:
+        text (str): 分割するテキスト
+        max_tokens (int): 1チャンクのトークン数の上限
+        overlap_tokens (int): 前のチャンクの末尾から次のチャンクの先頭に重ねる文のトークン数の上限
+        count_tokens (callable, optional): トークン数を数える関数（未指定の場合は get_token_counter()）
+
+    Returns:
+        list: チャンクのリスト（前後の空白を除去し、空のチャンクは含まない）
+    """
+    if max_tokens < 1:
+        raise ValueError("max_tokens は1以上を指定してください")
+    if not 0 <= overlap_tokens < max_tokens:
+        raise ValueError("overlap_tokens は0以上、max_tokens 未満を指定してください")
+    count_tokens = count_tokens or get_token_counter()
+
+    # 文（上限を超える文は分割した断片）とそのトークン数のリスト
+    pieces = []
+    for sentence in split_sentences(text):
+        sentence_tokens = count_tokens(sentence)
+        if sentence_tokens > max_tokens:
+            pieces.extend(_split_long_piece(sentence, max_tokens, count_tokens))
+        else:
+            pieces.append((sentence, sentence_tokens))
+
+    chunks = []
+    start, current_tokens = 0, 0
+    for end, (_, piece_tokens) in enumerate(pieces):
+        if end > start and current_tokens + piece_tokens > max_tokens:
+            chunks.append("".join(piece for piece, _ in pieces[start:end]))
+            # 直前のチャンクの末尾の文を、オーバーラップの上限と合わせて max_tokens を超えない範囲で重ねる
+            new_start, overlap = end, 0
+            while (
+                new_start - 1 > start
+                and overlap + pieces[new_start - 1][1] <= overlap_tokens
+                and overlap + pieces[new_start - 1][1] + piece_tokens <= max_tokens
+            ):
+                new_start -= 1
+                overlap += pieces[new_start][1]
+            start, current_tokens = new_start, overlap
+        current_tokens += piece_tokens
+    if start < len(pieces):
+        chunks.append("".join(piece for piece, _ in pieces[start:]))
+
+    return [chunk.strip() for chunk in chunks if chunk.strip()]
+
+
+# 段落の区切り（空行）
+PARAGRAPH_PATTERN = re.compile(r".*?(?:\n[ \t]*\n\s*|$)", re.S)
+
+# segment_text で内容に基づいてセグメントを区切る頻度（平均して何段落ごとに区切るか）
+DEFAULT_BOUNDARY_EVERY = 8
+
+
+def split_paragraphs(text):
+    """テキストを空行で段落に分割します（空行は直前の段落に含めるため、連結すると元のテキストに戻ります）。"""
+    return [match.group() for match in PARAGRAPH_PATTERN.finditer(text) if match.group()]
+
+
+def _is_anchor(paragraph, boundary_every):
+    digest = hashlib.blake2b(" ".join(paragraph.split()).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % boundary_every == 0
+
+
+def segment_text(text, max_tokens=DEFAULT_MAX_TOKENS, boundary_every=DEFAULT_BOUNDARY_EVERY, count_tokens=None):
+    """
+    テキストを段落の境界で、内容に基づいて安定したセグメントに分割します（翻訳メモリ用）。
+
+    文書の先頭から詰めて分割すると、一部を編集しただけで以降のすべての区切りがずれてしまいます。
+    ここでは段落の内容のハッシュ値から区切る位置（アンカー）を決めるため、編集した段落を含む
+    セグメント以外は前の版と同じ区切りになり、翻訳メモリから再利用できます。
+    リクエスト数が増えすぎないよう、max_tokens の1/4に満たないセグメントはアンカーでも区切らず、
+    max_tokens を超える場合はアンカーでなくても区切ります。
+
+    Args:
+        text (str): 分割するテキスト
+        max_tokens (int): 1セグメントのトークン数の上限
+        boundary_every (int): 平均して何段落ごとに区切るか
+        count_tokens (callable, optional): トークン数を数える関数
+
+    Returns:
+        list: セグメントのリスト（前後の空白を除去し、空のセグメントは含まない）
+    """
+    count_tokens = count_tokens or get_token_counter()
+    segments = []
+    current, current_tokens = [], 0
+    for paragraph in split_paragraphs(text):
+        paragraph_tokens = count_tokens(paragraph)
+        if paragraph_tokens > max_tokens:
+            # 上限を超える段落は単独で、文の単位で分割する
+            if current:
+                segments.append("".join(current))
+                current, current_tokens = [], 0
+            segments.extend(chunk_text_by_tokens(paragraph, max_tokens, count_tokens=count_tokens))
+            continue
+        if current and current_tokens + paragraph_tokens > max_tokens:
+            segments.append("".join(current))
+            current, current_tokens = [], 0
+        current.append(paragraph)
+        current_tokens += paragraph_tokens
+        if current_tokens >= max_tokens // 4 and _is_anchor(paragraph, boundary_every):
+            segments.append("".join(current))
+            current, current_tokens = [], 0
+    if current:
+        segments.append("".join(current))
+    return [segment.strip() for segment in segments if segment.strip()]
@@ -0,0 +1,76 @@
+"""
+翻訳メモリ
+
+翻訳済みのセグメントを、正規化した原文・言語ペア・技術用語・書式保持の指定・モデル名から計算した
+ハッシュ値をキーとして SQLite ファイルに保存します。
+
+以前の版を改訂した文書を翻訳する場合は、変更のないセグメントの翻訳を翻訳メモリから取り出し、
+変更されたセグメントだけを API に送信します。原文の正規化では Unicode の正規化（NFC）と
+空白の統一を行うため、改行位置や空白の違いだけのセグメントも同じ原文として扱います。
+"""
+
+import hashlib
+import json
+import unicodedata
+
+from sqlite_store import SQLiteStore
+
+
+def normalize_segment(segment):
+    """原文のセグメントを正規化します（Unicode の NFC 正規化と、連続する空白の統一）。"""
+    return " ".join(unicodedata.normalize("NFC", segment).split())
+
+
+def segment_key(segment, source_lang, target_lang, tech_terms, preserve_formatting, model):
+    """セグメントと翻訳の条件から翻訳メモリのキー（SHA-256）を計算します。"""
+    payload = json.dumps(
+        [
+            model,
+            source_lang,
+            target_lang,
+            sorted(set(tech_terms or [])),
+            bool(preserve_formatting),
+            normalize_segment(segment),
+        ],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class TranslationMemory(SQLiteStore):
+    """
+    SQLiteファイルに保存する翻訳メモリ（キー → 翻訳）
+
+    Args:
+        db_path (str): SQLiteデータベースファイルのパス
+    """
+
+    table = "translations"
+    key_column = "segment_key"
+    value_column = "translation"
+
+    def __init__(self, db_path):
+        super().__init__(db_path)
+        self.segments = 0
+        self.hits = 0
+        self.duplicates = 0
+        self.translated = 0
+
+    def record(self, segments, hits, duplicates, translated):
+        """1回の翻訳でのセグメント数・翻訳メモリのヒット数・文書内の重複数・新規に翻訳した数を記録します。"""
+        self.segments += segments
+        self.hits += hits
+        self.duplicates += duplicates
+        self.translated += translated
+
+    def stats(self):
+        """翻訳メモリの利用状況を返します。"""
+        reused = self.hits + self.duplicates
+        return {
+            "segments": self.segments,
+            "hits": self.hits,
+            "duplicates": self.duplicates,
+            "translated": self.translated,
+            "hit_rate": round(reused / self.segments, 4) if self.segments else 0.0,
+            "entries": len(self),
+        }
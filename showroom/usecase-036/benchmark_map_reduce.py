@@ -0,0 +1,241 @@
+"""
+文書全体の map-reduce 分析のベンチマーク
+
+200ページ程度の合成した業務委託契約書に対して、document_analysis.analyze_chunks の
+チャンクごとの分析（map）と統合（reduce）を、APIを呼び出さない疑似クライアントで実行し、
+チャンクごとの呼び出し数の上限ごとに次の値を表示します。
+
+- 分析したチャンク数・呼び出し数・文書全体に対する分析した文字数の割合
+- 時間内に完了した呼び出しの割合と、結果を得られなかった分析の数
+- 処理時間（疑似的な呼び出しの待ち時間から換算した秒数）と1秒あたりの呼び出し数
+- 入力・出力のトークン数と費用の概算
+- 統合後のリスク・重要なポイントの件数（重複の除去とリスクレベルの最大値の統合を確認）
+
+比較のため、従来の先頭のチャンクだけを分析する場合の値も表示します。
+
+アプリと同じく、同時に処理する文書（--jobs）が1つのスレッドプール（--workers）を共有し、
+各呼び出しには待ち時間の上限（--timeout）を設定します。待ち時間が上限を超えた疑似的な呼び出しは
+OpenAI クライアントと同じく上限の時間でエラーになります。値は文書1件あたりの平均です。
+
+使い方:
+    python benchmark_map_reduce.py --pages 200 --budgets 30 60 120 --workers 6 --jobs 2 --timeout 120
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+from document_analysis import ANALYSIS_PASSES, analyze_chunks, chunk_text
+
+# gpt-4-turbo の料金（100万トークンあたりのドル）
+INPUT_PRICE_PER_MILLION = 10.0
+OUTPUT_PRICE_PER_MILLION = 30.0
+
+ARTICLE_TOPICS = [
+    ("目的", "本契約は、委託者が受託者に対して業務を委託するにあたり、その条件を定めることを目的とする。"),
+    ("業務内容", "受託者は、別紙に定める仕様に従い、善良なる管理者の注意をもって委託業務を遂行する。"),
+    ("再委託", "受託者は、委託者の事前の書面による承諾なく、委託業務の全部または一部を第三者に再委託してはならない。"),
+    ("委託料及び支払条件", "委託者は、検収完了後、受託者の請求書を受領した日の翌月末日までに委託料を支払う。"),
+    ("秘密保持", "各当事者は、相手方から開示された秘密情報を、本契約の目的以外に使用してはならない。"),
+    ("知的財産権", "委託業務の成果物に関する著作権その他の知的財産権は、委託料の完済をもって委託者に移転する。"),
+    ("損害賠償", "当事者は、本契約に違反して相手方に損害を与えた場合、直接かつ通常の損害に限り賠償する責任を負う。"),
+    ("契約解除", "当事者は、相手方が本契約に違反し、催告後相当期間内に是正しない場合、本契約を解除することができる。"),
+    ("免責", "受託者は、天災地変その他の不可抗力により委託業務の履行が遅延した場合、その責任を負わない。"),
+    ("個人情報の取扱い", "受託者は、委託業務の遂行にあたり取得した個人情報を、関係法令に従い適切に管理する。"),
+    ("反社会的勢力の排除", "各当事者は、自らが反社会的勢力に該当しないことを表明し、将来にわたって保証する。"),
+    ("準拠法及び管轄", "本契約は日本法に準拠し、本契約に関する紛争は東京地方裁判所を第一審の専属的合意管轄裁判所とする。"),
+]
+
+FILLER_SENTENCES = [
+    "前項の規定は、本契約の終了後も有効に存続する。",
+    "当事者は、本条の定めに関して疑義が生じた場合、誠実に協議のうえ解決する。",
+    "委託者は、必要に応じて受託者に対し業務の進捗状況の報告を求めることができる。",
+    "本条に定める通知は、書面または電磁的方法により行うものとする。",
+    "受託者は、委託業務に従事する者に本条の義務を遵守させるものとする。",
+]
+
+RISKS = {
+    "再委託": "無断再委託による情報漏えい",
+    "委託料及び支払条件": "支払遅延",
+    "秘密保持": "秘密情報の漏えい",
+    "知的財産権": "成果物の権利帰属の不明確さ",
+    "損害賠償": "損害賠償責任の範囲",
+    "契約解除": "一方的な契約解除",
+    "免責": "不可抗力による免責の範囲",
+    "個人情報の取扱い": "個人情報の漏えい",
+}
+
+TERMS = ["善良なる管理者の注意", "再委託", "検収", "秘密情報", "知的財産権", "不可抗力", "専属的合意管轄", "反社会的勢力"]
+
+ARTICLE_PATTERN = re.compile(r"第(\d+)条（([^）]+)）")
+
+CHARS_PER_PAGE = 1200
+
+
+def generate_contract(pages, seed=0):
+    """約 pages ページ（1ページ約1,200字）の業務委託契約書を合成します。"""
+    rng = random.Random(seed)
+    lines = ["業務委託契約書", ""]
+    length, article = 0, 0
+    while length < pages * CHARS_PER_PAGE:
+        article += 1
+        title, body = ARTICLE_TOPICS[(article - 1) % len(ARTICLE_TOPICS)]
+        paragraph = [f"第{article}条（{title}）", body] + rng.sample(FILLER_SENTENCES, k=rng.randint(2, 4))
+        lines.extend(paragraph)
+        length += sum(len(line) for line in paragraph)
+    return "\n".join(lines)
+
+
+def estimate_tokens(text):
+    """トークン数の概算（ASCII は4文字で1トークン、それ以外の文字は1文字で1トークン）。"""
+    ascii_count = sum(1 for ch in text if ord(ch) < 128)
+    return ascii_count // 4 + (len(text) - ascii_count)
+
+
+class FakeCompletions:
+    """チャンクに含まれる条項から JSON の回答を作成し、一定の待ち時間の後に返す疑似クライアント。"""
+
+    def __init__(self, latency, jitter, time_scale, output_tokens, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.time_scale = time_scale
+        self.output_tokens = output_tokens
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.input_tokens = 0
+
+    def create(self, model, messages, response_format=None, timeout=None):
+        content = messages[-1]["content"]
+        with self.lock:
+            self.calls += 1
+            self.input_tokens += sum(estimate_tokens(message["content"]) for message in messages)
+            level = self.rng.choice(["高", "中", "低"])
+            latency = self.latency * self.rng.uniform(1 - self.jitter, 1 + self.jitter)
+        if timeout is not None and latency > timeout:
+            time.sleep(timeout * self.time_scale)
+            raise TimeoutError("Request timed out.")
+        time.sleep(latency * self.time_scale)
+        articles = ARTICLE_PATTERN.findall(content)
+        if response_format is None:
+            answer = f"第{articles[0][0]}条から第{articles[-1][0]}条までの要約。" if articles else "要約。"
+        elif '"points"' in content:
+            answer = json.dumps({"points": [
+                {"point": f"{title}に関する定め", "section": f"第{number}条"} for number, title in articles[:8]
+            ]}, ensure_ascii=False)
+        elif '"risks"' in content:
+            answer = json.dumps({"risks": [
+                {"risk": RISKS[title], "level": level, "section": f"第{number}条", "description": f"{title}に関するリスク"}
+                for number, title in articles if title in RISKS
+            ]}, ensure_ascii=False)
+        elif '"terms"' in content:
+            answer = json.dumps({"terms": [
+                {"term": term, "explanation": f"{term}の説明"} for term in TERMS if term in content
+            ]}, ensure_ascii=False)
+        else:
+            answer = json.dumps({"sections": [
+                {"heading": f"第{number}条（{title}）", "purpose": f"{title}を定める"} for number, title in articles
+            ]}, ensure_ascii=False)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=answer))])
+
+
+class FakeClient:
+    """with_options(timeout=...) で呼び出しの待ち時間の上限（縮尺を戻した秒数）を設定できる疑似クライアント。"""
+
+    def __init__(self, completions, time_scale, timeout=None):
+        self.completions = completions
+        self.time_scale = time_scale
+        self.timeout = timeout
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, **kwargs):
+        return self.completions.create(**kwargs, timeout=self.timeout)
+
+    def with_options(self, timeout=None):
+        return FakeClient(self.completions, self.time_scale, timeout / self.time_scale)
+
+
+def cost(input_tokens, output_tokens):
+    """費用の概算（ドル）を返します。"""
+    return (input_tokens * INPUT_PRICE_PER_MILLION + output_tokens * OUTPUT_PRICE_PER_MILLION) / 1_000_000
+
+
+def main():
+    """メイン関数"""
+    parser = argparse.ArgumentParser(description="文書全体の map-reduce 分析のベンチマーク")
+    parser.add_argument("--pages", type=int, default=200, help="合成する契約書のページ数")
+    parser.add_argument("--budgets", type=int, nargs="+", default=[30, 60, 120], help="チャンクごとの呼び出し数の上限")
+    parser.add_argument("--workers", type=int, default=6, help="同時に実行する呼び出し数（スレッドプールのスレッド数）")
+    parser.add_argument("--jobs", type=int, default=2, help="スレッドプールを共有して同時に分析する文書の数")
+    parser.add_argument("--timeout", type=float, default=120.0, help="1回の呼び出しの待ち時間の上限（秒）")
+    parser.add_argument("--latency", type=float, default=15.0, help="1回の呼び出しの平均の待ち時間（秒）")
+    parser.add_argument("--jitter", type=float, default=0.5, help="待ち時間のばらつき（0.5 の場合は平均の0.5-1.5倍）")
+    parser.add_argument("--time-scale", type=float, default=0.01, help="待ち時間の縮尺（0.01 の場合は1/100の時間で実行）")
+    parser.add_argument("--output-tokens", type=int, default=600, help="費用の概算に使う1回の呼び出しの出力トークン数")
+    parser.add_argument("--max-tokens", type=int, default=8000, help="1チャンクのトークン数の上限")
+    args = parser.parse_args()
+
+    text = generate_contract(args.pages)
+    chunks = chunk_text(text, args.max_tokens)
+    pass_names = list(ANALYSIS_PASSES)
+    print(f"契約書: {args.pages}ページ、{len(text):,}文字、{len(chunks)}チャンク、分析パス {len(pass_names)}件\n")
+
+    # 従来の処理: 先頭のチャンクだけを各分析パスに1回ずつ送信
+    legacy_input = sum(
+        estimate_tokens(system_prompt) + estimate_tokens(user_prompt) + estimate_tokens(chunks[0][:max_chars] if max_chars else chunks[0])
+        for system_prompt, user_prompt, max_chars in ANALYSIS_PASSES.values()
+    )
+    legacy_calls = len(pass_names)
+    legacy_output = legacy_calls * args.output_tokens
+    print(
+        f"{'上限':>5} | {'チャンク':>8} {'呼び出し':>8} {'網羅率':>7} {'完了率':>7} {'失敗':>4} | {'時間 (秒)':>9} {'呼び出し/秒':>10} | "
+        f"{'入力トークン':>12} {'出力トークン':>12} {'費用 ($)':>9} | {'リスク':>6} {'ポイント':>8}"
+    )
+    print(
+        f"{'従来':>5} | {1:>8} {legacy_calls:>8} {len(chunks[0]) / len(text):>7.1%} {'-':>7} {'-':>4} | {'-':>9} {'-':>10} | "
+        f"{legacy_input:>12,} {legacy_output:>12,} {cost(legacy_input, legacy_output):>9.2f} | {'-':>6} {'-':>8}"
+    )
+
+    for budget in args.budgets:
+        completions = FakeCompletions(args.latency, args.jitter, args.time_scale, args.output_tokens)
+        client = FakeClient(completions, args.time_scale)
+        with ThreadPoolExecutor(max_workers=args.workers) as executor:
+            # 同時に処理する文書の分析が、アプリと同じく1つのスレッドプールを共有する
+            with ThreadPoolExecutor(max_workers=args.jobs) as job_executor:
+                start = time.perf_counter()
+                jobs = [
+                    job_executor.submit(
+                        analyze_chunks, client, executor, chunks, pass_names,
+                        timeout=args.timeout * args.time_scale, max_chunk_calls=budget,
+                    )
+                    for _ in range(args.jobs)
+                ]
+                all_results = [job.result() for job in jobs]
+                elapsed = (time.perf_counter() - start) / args.time_scale
+        results = all_results[0]
+        coverage = results["coverage"]
+        analyzed = coverage["analyzed_chunks"]
+        analyzed_chars = sum(len(chunks[index]) for index in coverage["chunk_indices"])
+        # 時間内に完了したチャンクごとの呼び出しの割合と、結果を得られなかった分析の数（文書1件あたりの平均）
+        scheduled = sum(1 if name == "document_type" else analyzed for name in pass_names)
+        completed = sum(sum(r["coverage"]["passes"].values()) for r in all_results) / args.jobs
+        failed = sum(len(r.get("failed_passes", {})) for r in all_results) / args.jobs
+        calls = completions.calls / args.jobs
+        input_tokens = completions.input_tokens / args.jobs
+        output_tokens = calls * args.output_tokens
+        print(
+            f"{budget:>5} | {analyzed:>8} {calls:>8.0f} {analyzed_chars / len(text):>7.1%} "
+            f"{completed / scheduled:>7.1%} {failed:>4.1f} | "
+            f"{elapsed:>9.1f} {completions.calls / elapsed:>10.2f} | "
+            f"{input_tokens:>12,.0f} {output_tokens:>12,.0f} {cost(input_tokens, output_tokens):>9.2f} | "
+            f"{results.get('risks', '').count(chr(10)) + 1:>6} {results.get('key_points', '').count(chr(10)) + 1:>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,414 @@
+"""
+法的文書の分析パス（map-reduce）
+
+長い文書をチャンクに分割し、各分析パスをチャンクごとに同時に実行して（map）、
+結果を決まった手順で統合します（reduce）。これにより文書の先頭のチャンクだけでなく、
+文書全体を分析の対象にします。
+
+- 文書の種類: 先頭のチャンクの冒頭だけで特定
+- 重要なポイント・法律用語: チャンクごとにJSONで抽出し、正規化したテキストで重複を除去（文書内の順序を維持）
+- 潜在的リスク: 同じリスクはリスクレベルの最大値（高 > 中 > 低）にまとめ、関連する条項を列挙
+- 文書構造: チャンクごとのセクションを文書内の順序で連結（見出しが同じセクションはまとめる）
+- 要約: チャンクごとの要約を1回の呼び出しで文書全体の要約にまとめる
+
+1チャンクに収まる文書は、従来どおり各分析パスを1回ずつ実行します。
+チャンクごとの呼び出し数には上限（max_chunk_calls）を設け、上限を超える長さの文書は
+文書全体から均等な間隔で選んだチャンクを分析します（分析したチャンク数は結果の coverage に記録）。
+チャンクをイテレーター（pdf_extractor.iter_chunks など）で渡すと、PDFの抽出が終わる前に届いたチャンクから
+分析を開始します。
+"""
+
+import json
+import re
+import time
+import unicodedata
+from concurrent.futures import FIRST_COMPLETED, wait
+
+from colorama import Fore, Style
+
+from text_chunker import chunk_text_by_tokens
+
+# 分析に使うモデル
+ANALYSIS_MODEL = "gpt-4-turbo"
+
+# 1チャンクのトークン数の上限の既定値
+DEFAULT_CHUNK_TOKENS = 8000
+
+# 1文書あたりのチャンクごとの呼び出し数の上限の既定値
+DEFAULT_MAX_CHUNK_CALLS = 120
+
+# 呼び出しの完了と実行開始を確認する間隔（秒）
+COLLECT_POLL_INTERVAL = 1.0
+
+LEGAL_ASSISTANT_PROMPT = "あなたは法律文書の分析を専門とする法律アシスタントです。"
+
+# 分析パス: (システムプロンプト, ユーザープロンプト, 文書から渡す文字数の上限)
+ANALYSIS_PASSES = {
+    "document_type": (
+        LEGAL_ASSISTANT_PROMPT + "ユーザーが提供する文書の種類を特定してください。",
+        "以下の法的文書の種類を特定してください。契約書、利用規約、プライバシーポリシー、法律文書、その他のいずれかで分類し、理由も説明してください。",
+        2000,
+    ),
+    "summary": (
+        LEGAL_ASSISTANT_PROMPT + "与えられた法的文書の要約を500-800字程度で作成してください。",
+        "以下の法的文書の要約を作成してください：",
+        None,
+    ),
+    "key_points": (
+        LEGAL_ASSISTANT_PROMPT + "与えられた法的文書から重要なポイントを箇条書きで抽出してください。各ポイントには文書内の対応するセクションや条項番号も示してください。",
+        "以下の法的文書から重要なポイントを10-15個抽出し、箇条書きで提示してください：",
+        None,
+    ),
+    "risks": (
+        LEGAL_ASSISTANT_PROMPT + "与えられた法的文書から潜在的な法的リスクを特定し、それぞれのリスクレベル（高・中・低）を評価してください。",
+        "以下の法的文書から潜在的な法的リスクを特定し、リスクレベル（高・中・低）と共に説明してください：",
+        None,
+    ),
+    "terminology": (
+        LEGAL_ASSISTANT_PROMPT + "与えられた法的文書から専門的な法律用語を抽出し、それらを平易な言葉で説明してください。",
+        "以下の法的文書から専門的な法律用語を8-12個抽出し、それぞれを平易な言葉で説明してください：",
+        None,
+    ),
+    "structure": (
+        LEGAL_ASSISTANT_PROMPT + "与えられた法的文書の構造を分析し、主要なセクションとその目的を説明してください。",
+        "以下の法的文書の構造を分析し、主要なセクションとその目的を説明してください：",
+        None,
+    ),
+}
+
+# チャンクごとの分析パス: (システムプロンプト, ユーザープロンプト, JSONの項目のリストのキー)
+# 要約以外は統合できるようにJSONで出力させる
+CHUNK_PASSES = {
+    "summary": (
+        LEGAL_ASSISTANT_PROMPT + "与えられた法的文書の一部の要約を200-300字程度で作成してください。",
+        "以下の部分の要約を作成してください。",
+        None,
+    ),
+    "key_points": (
+        LEGAL_ASSISTANT_PROMPT + "与えられた法的文書の一部から重要なポイントを抽出し、JSONで出力してください。",
+        '以下の部分から重要なポイントを3-8個抽出し、{"points": [{"point": "ポイント", "section": "対応するセクションや条項番号"}]} の形式のJSONで出力してください。',
+        "points",
+    ),
+    "risks": (
+        LEGAL_ASSISTANT_PROMPT + "与えられた法的文書の一部から潜在的な法的リスクを特定し、JSONで出力してください。",
+        '以下の部分から潜在的な法的リスクを特定し、{"risks": [{"risk": "リスクの名前（短く）", "level": "高・中・低のいずれか", "section": "対応する条項番号", "description": "説明"}]} の形式のJSONで出力してください。',
+        "risks",
+    ),
+    "terminology": (
+        LEGAL_ASSISTANT_PROMPT + "与えられた法的文書の一部から専門的な法律用語を抽出し、JSONで出力してください。",
+        '以下の部分から専門的な法律用語を抽出し、{"terms": [{"term": "用語", "explanation": "平易な言葉での説明"}]} の形式のJSONで出力してください。',
+        "terms",
+    ),
+    "structure": (
+        LEGAL_ASSISTANT_PROMPT + "与えられた法的文書の一部の構造を分析し、JSONで出力してください。",
+        '以下の部分に含まれる主要なセクションを順に挙げ、{"sections": [{"heading": "見出しや条項番号", "purpose": "セクションの目的"}]} の形式のJSONで出力してください。',
+        "sections",
+    ),
+}
+
+SUMMARY_REDUCE_PROMPT = "以下は法的文書を分割した各部分の要約です。文書全体の要約を作成してください："
+
+# リスクレベルの順位（英語で返された場合も受け付ける）
+RISK_LEVELS = {"高": 3, "中": 2, "低": 1, "high": 3, "medium": 2, "low": 1}
+RISK_LEVEL_LABELS = {3: "高", 2: "中", 1: "低", 0: "不明"}
+
+# 重複の判定で無視する文字（空白・記号）
+KEY_IGNORE_PATTERN = re.compile(r"[\W_]+")
+
+
+def chunk_text(text, max_tokens=DEFAULT_CHUNK_TOKENS):
+    """
+    テキストをトークン数が max_tokens 以下のチャンクに、文の境界で分割します（text_chunker.chunk_text_by_tokens）。
+
+    トークン数は tiktoken で数えるため（未インストールの場合は文字種による概算）、日本語の文書でも
+    チャンクの大きさがモデルの入力の上限に収まります。文の区切りには「。」「！」「？」と改行も使います。
+    """
+    return chunk_text_by_tokens(text, max_tokens)
+
+
+def _complete(client, system_prompt, user_content, timeout=None, json_output=False):
+    api = client.with_options(timeout=timeout) if timeout else client
+    options = {"response_format": {"type": "json_object"}} if json_output else {}
+    response = api.chat.completions.create(
+        model=ANALYSIS_MODEL,
+        messages=[
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_content}
+        ],
+        **options
+    )
+    return response.choices[0].message.content
+
+
+def run_analysis_pass(client, name, text, timeout=None):
+    """1つの分析パスを文書（または先頭のチャンク）に対して実行し、モデルの回答を返す"""
+    system_prompt, user_prompt, max_chars = ANALYSIS_PASSES[name]
+    content = text[:max_chars] if max_chars else text
+    return _complete(client, system_prompt, f"{user_prompt}\n\n{content}", timeout)
+
+
+def run_chunk_pass(client, name, chunk, index, total, timeout=None):
+    """
+    1つの分析パスを1チャンクに対して実行する（total はチャンク数。不明な場合は None）
+
+    Returns:
+        要約の場合は文字列、それ以外は項目（辞書）のリスト
+    """
+    system_prompt, user_prompt, items_key = CHUNK_PASSES[name]
+    # ストリーミングで分析を開始したチャンクは、文書全体のチャンク数（total）がまだ分からない
+    position = f"文書全体を{total}分割した第{index + 1}部分" if total else f"文書の第{index + 1}部分"
+    content = f"これは{position}です。{user_prompt}\n\n{chunk}"
+    answer = _complete(client, system_prompt, content, timeout, json_output=items_key is not None)
+    if items_key is None:
+        return answer
+    items = json.loads(answer).get(items_key, [])
+    if not isinstance(items, list):
+        raise ValueError(f"{name} の回答の形式が正しくありません")
+    return [item for item in items if isinstance(item, dict)]
+
+
+def normalize_key(text):
+    """重複の判定に使うキー（Unicode の NFKC 正規化・小文字化・空白と記号の除去）を返す"""
+    return KEY_IGNORE_PATTERN.sub("", unicodedata.normalize("NFKC", str(text)).lower())
+
+
+def _unique_items(chunk_items, field):
+    """チャンクの順に項目を並べ、field の値が重複する項目は最初の項目だけを残す"""
+    seen = set()
+    items = []
+    for chunk in chunk_items:
+        for item in chunk:
+            key = normalize_key(item.get(field, ""))
+            if key and key not in seen:
+                seen.add(key)
+                items.append(item)
+    return items
+
+
+def merge_key_points(chunk_items):
+    """チャンクごとの重要なポイントを統合して箇条書きにする"""
+    lines = []
+    for item in _unique_items(chunk_items, "point"):
+        section = str(item.get("section") or "").strip()
+        lines.append(f"- {item['point']}（{section}）" if section else f"- {item['point']}")
+    return "\n".join(lines)
+
+
+def merge_terms(chunk_items):
+    """チャンクごとの法律用語を統合して箇条書きにする"""
+    return "\n".join(
+        f"- **{item['term']}**: {item.get('explanation', '')}"
+        for item in _unique_items(chunk_items, "term")
+    )
+
+
+def merge_sections(chunk_items):
+    """チャンクごとのセクションを文書内の順序で統合して箇条書きにする"""
+    return "\n".join(
+        f"- **{item['heading']}**: {item.get('purpose', '')}"
+        for item in _unique_items(chunk_items, "heading")
+    )
+
+
+def merge_risks(chunk_items):
+    """
+    チャンクごとのリスクを統合して箇条書きにする
+
+    同じリスク（正規化した名前が同じもの）は最も高いリスクレベルにまとめ、説明はそのレベルで
+    最初に現れたものを使い、関連する条項はすべて列挙します。リスクレベルの高い順に並べます。
+    """
+    merged = {}
+    for chunk in chunk_items:
+        for item in chunk:
+            key = normalize_key(item.get("risk", ""))
+            if not key:
+                continue
+            level = RISK_LEVELS.get(str(item.get("level", "")).strip().lower(), 0)
+            section = str(item.get("section") or "").strip()
+            entry = merged.get(key)
+            if entry is None:
+                entry = merged[key] = {"order": len(merged), "level": -1, "sections": []}
+            if level > entry["level"]:
+                entry.update(level=level, risk=item["risk"], description=item.get("description", ""))
+            if section and section not in entry["sections"]:
+                entry["sections"].append(section)
+
+    lines = []
+    for entry in sorted(merged.values(), key=lambda e: (-e["level"], e["order"])):
+        sections = f"（{'、'.join(entry['sections'])}）" if entry["sections"] else ""
+        description = f": {entry['description']}" if entry["description"] else ""
+        lines.append(f"- **[{RISK_LEVEL_LABELS[entry['level']]}]** {entry['risk']}{sections}{description}")
+    return "\n".join(lines)
+
+
+MERGE_FUNCTIONS = {
+    "key_points": merge_key_points,
+    "risks": merge_risks,
+    "terminology": merge_terms,
+    "structure": merge_sections,
+}
+
+
+def select_chunks(total, max_chunks):
+    """分析するチャンクの番号を、先頭と末尾を含めて文書全体から均等な間隔で最大 max_chunks 個選ぶ"""
+    if total <= max_chunks:
+        return list(range(total))
+    if max_chunks <= 1:
+        return [0][:max_chunks]
+    return sorted({round(i * (total - 1) / (max_chunks - 1)) for i in range(max_chunks)})
+
+
+def _submit(executor, futures, started, key, fn, *args):
+    """fn を executor で実行し、実行を開始した時刻を started[key] に記録する"""
+    def call():
+        started[key] = time.monotonic()
+        return fn(*args)
+    futures[executor.submit(call)] = key
+
+
+def _collect(futures, started, timeout):
+    """
+    futures の完了を待ち、(キー → 結果, キー → 失敗の理由) を返す
+
+    待ち時間の上限 timeout 秒は呼び出しごとに、executor で実行を開始した時点（started）から数えます。
+    executor の待ち行列で待っている間は上限に含めないため、呼び出し数が executor のスレッド数より多くても
+    順番を待つ呼び出しは失敗になりません。上限を過ぎた呼び出しはスレッドを止められないため、
+    OpenAI クライアントに渡した同じ timeout で終了します。
+    """
+    results, errors = {}, {}
+    pending = set(futures)
+    while pending:
+        now = time.monotonic()
+        for future in [f for f in pending if not f.done() and futures[f] in started]:
+            if now - started[futures[future]] >= timeout:
+                pending.discard(future)
+                errors[futures[future]] = f"実行開始から{timeout:.0f}秒以内に完了しませんでした"
+        deadlines = [max(0, started[futures[f]] + timeout - now) for f in pending if futures[f] in started]
+        # 待ち行列の呼び出しが実行を開始したことは通知されないため、一定の間隔で確認する
+        done, pending = wait(pending, timeout=min(deadlines + [COLLECT_POLL_INTERVAL]), return_when=FIRST_COMPLETED)
+        for future in done:
+            try:
+                results[futures[future]] = future.result()
+            except Exception as e:
+                errors[futures[future]] = str(e)
+    return results, errors
+
+
+def analyze_chunks(client, executor, chunks, pass_names, timeout, max_chunk_calls=DEFAULT_MAX_CHUNK_CALLS):
+    """
+    分析パスを実行して結果を返す
+
+    すべての呼び出しを executor で同時に実行し、チャンクごとの呼び出し（map）と要約の統合（reduce）の
+    各呼び出しを、実行を開始してから timeout 秒まで待ちます（executor の待ち行列で待つ時間は含めない）。
+    一部のチャンクが完了しなかった分析は完了したチャンクの結果だけを統合し、1つも完了しなかった分析は
+    結果に含めずに理由を failed_passes に記録します。
+
+    Args:
+        client: OpenAI クライアント
+        executor: 呼び出しを実行する concurrent.futures.Executor
+        chunks (list or iterator): 文書のチャンク（イテレーターの場合は届いたチャンクから分析を開始）
+        pass_names (list): 実行する分析パスの名前（ANALYSIS_PASSES のキー）
+        timeout (float): 1回の呼び出しの待ち時間の上限（秒）
+        max_chunk_calls (int): チャンクごとの呼び出し数の上限
+
+    Returns:
+        dict: 分析パスの名前 → 結果のテキスト、failed_passes（失敗した分析パス → 理由）、
+              coverage（チャンク数・分析したチャンク数と番号・分析パスごとの完了したチャンク数）
+    """
+    started_at = time.monotonic()
+    streaming = not isinstance(chunks, (list, tuple))
+    chunk_pass_names = [name for name in pass_names if name != "document_type"]
+    max_chunks = max(1, max_chunk_calls // max(1, len(chunk_pass_names)))
+    futures = {}
+    started = {}
+
+    def submit_chunk(index, total):
+        for name in chunk_pass_names:
+            _submit(executor, futures, started, (name, index), run_chunk_pass, client, name, received[index], index, total, timeout)
+
+    # チャンクのイテレーターを受け取った場合は、文書の長さが分かるまで上限の半分までのチャンクを届いた順に分析する
+    # （2つ目のチャンクが届いた時点で、1チャンクに収まる文書ではないことが分かる）
+    early_limit = max(1, max_chunks // 2) if streaming else 0
+    early = []
+    received = []
+    for chunk in chunks:
+        received.append(chunk)
+        if len(received) == 1 and "document_type" in pass_names:
+            _submit(executor, futures, started, ("document_type", 0), run_analysis_pass, client, "document_type", chunk, timeout)
+        while len(received) >= 2 and len(early) < min(early_limit, len(received)):
+            early.append(len(early))
+            submit_chunk(early[-1], None)
+    chunks = received
+    if not chunks:
+        raise ValueError("分析するテキストがありません")
+
+    if len(chunks) == 1:
+        # 1チャンクに収まる文書は、各分析パスを文書全体に対して1回ずつ実行する
+        indices = [0]
+        for name in chunk_pass_names:
+            _submit(executor, futures, started, (name, 0), run_analysis_pass, client, name, chunks[0], timeout)
+    else:
+        # 残りの上限の範囲で、分析を開始していないチャンクから均等な間隔で選ぶ
+        remaining = list(range(len(early), len(chunks)))
+        selected = [remaining[i] for i in select_chunks(len(remaining), max_chunks - len(early))]
+        for index in selected:
+            submit_chunk(index, len(chunks))
+        indices = early + selected
+
+    outputs, errors = _collect(futures, started, timeout)
+    call_count = len(futures)
+
+    results = {}
+    failed_passes = {}
+    completed = {}
+    for name in pass_names:
+        pass_indices = [0] if name == "document_type" else indices
+        chunk_results = [outputs[(name, index)] for index in pass_indices if (name, index) in outputs]
+        completed[name] = len(chunk_results)
+        if not chunk_results:
+            failed_passes[name] = next(reason for (pass_name, _), reason in errors.items() if pass_name == name)
+        elif len(chunks) == 1 or name == "document_type":
+            results[name] = chunk_results[0]
+        elif name in MERGE_FUNCTIONS:
+            results[name] = MERGE_FUNCTIONS[name](chunk_results)
+
+    if len(chunks) > 1 and completed.get("summary"):
+        # 各部分の要約を文書全体の要約にまとめる
+        system_prompt = ANALYSIS_PASSES["summary"][0]
+        partial_summaries = "\n\n".join(
+            f"【第{index + 1}部分】\n{outputs[('summary', index)]}"
+            for index in indices if ("summary", index) in outputs
+        )
+        # 統合の呼び出しはチャンクごとの呼び出しとは別に、実行を開始してから timeout 秒まで待つ
+        reduce_futures, reduce_started = {}, {}
+        _submit(
+            executor, reduce_futures, reduce_started, "summary",
+            _complete, client, system_prompt, f"{SUMMARY_REDUCE_PROMPT}\n\n{partial_summaries}", timeout,
+        )
+        reduced, reduce_errors = _collect(reduce_futures, reduce_started, timeout)
+        call_count += 1
+        if "summary" in reduced:
+            results["summary"] = reduced["summary"]
+        else:
+            failed_passes["summary"] = reduce_errors["summary"]
+
+    elapsed = time.monotonic() - started_at
+    print(
+        f"{len(chunks)}チャンク中{len(indices)}チャンクについて、{call_count}件の呼び出しを"
+        f"{elapsed:.1f}秒で実行しました（完了した分析: {len(pass_names) - len(failed_passes)}/{len(pass_names)}件）"
+    )
+    for name, reason in failed_passes.items():
+        print(f"{Fore.YELLOW}分析「{name}」の結果を取得できませんでした: {reason}{Style.RESET_ALL}")
+    for name in chunk_pass_names:
+        if name not in failed_passes and completed[name] < len(indices):
+            print(f"{Fore.YELLOW}分析「{name}」は{len(indices)}チャンク中{completed[name]}チャンクの結果だけを統合しました{Style.RESET_ALL}")
+
+    if failed_passes:
+        results["failed_passes"] = failed_passes
+    results["coverage"] = {
+        "chunks": len(chunks),
+        "analyzed_chunks": len(indices),
+        "chunk_indices": indices,
+        "passes": completed,
+    }
+    return results
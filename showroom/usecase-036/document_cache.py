@@ -0,0 +1,187 @@
+"""
+アップロードされた文書の分析結果のキャッシュ
+
+同じ契約書や利用規約が繰り返しアップロードされた場合に、分析をやり直さずに保存済みの分析結果と
+レポートを返すためのキャッシュです。SQLite ファイルに保存します。
+
+- キーは抽出したテキストのSHA-256と分析タイプ
+- アップロードされたファイルのSHA-256からテキストのSHA-256への対応も保存し、同じファイルの再アップロードは
+  テキストを抽出せずに判定（PDFは抽出しながら分析を開始するため、ファイルのSHA-256だけで判定する）
+- 保存する件数には上限（max_entries）を設け、最も長く使われていない分析結果から削除（LRU）
+- 分析結果を削除するときは、その分析結果のレポート（HTML / PDF）のファイルも削除し、削除したファイルを
+  on_remove に通知（完了したジョブの結果など、レポートを参照するデータの更新に使う）
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+
+
+def text_sha256(text):
+    """抽出したテキストのSHA-256を返します。"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def file_sha256(data):
+    """アップロードされたファイルの内容（バイト列）のSHA-256を返します。"""
+    return hashlib.sha256(data).hexdigest()
+
+
+class DocumentCache:
+    """
+    SQLiteファイルに保存する文書の分析結果のキャッシュ
+
+    Args:
+        db_path (str): SQLiteデータベースファイルのパス
+        max_entries (int): 保存する分析結果の件数の上限
+        on_remove (callable, optional): 削除したレポートのファイルパスのリストを受け取る関数
+    """
+
+    def __init__(self, db_path, max_entries=100, on_remove=None):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.on_remove = on_remove
+        self.hits = 0
+        self.misses = 0
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS documents (
+                    text_sha256 TEXT NOT NULL,
+                    analysis_type TEXT NOT NULL,
+                    result TEXT NOT NULL,
+                    report_files TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_used_at REAL NOT NULL,
+                    PRIMARY KEY (text_sha256, analysis_type)
+                )
+                """
+            )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS uploaded_files (
+                    file_sha256 TEXT PRIMARY KEY,
+                    text_sha256 TEXT NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS documents_last_used ON documents (last_used_at)")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, text_hash, analysis_type):
+        """
+        テキストのSHA-256と分析タイプに一致する分析結果を返します（最終使用日時を更新）。
+
+        レポートのファイルが削除されていた場合は、分析結果も削除してキャッシュにないものとして扱います。
+
+        Returns:
+            dict: 分析結果（キャッシュにない場合は None）
+        """
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT result, report_files FROM documents WHERE text_sha256 = ? AND analysis_type = ?",
+                (text_hash, analysis_type),
+            ).fetchone()
+            if row is not None and all(os.path.exists(path) for path in json.loads(row[1])):
+                conn.execute(
+                    "UPDATE documents SET last_used_at = ? WHERE text_sha256 = ? AND analysis_type = ?",
+                    (time.time(), text_hash, analysis_type),
+                )
+                self.hits += 1
+                return json.loads(row[0])
+        if row is not None:
+            self._delete([(text_hash, analysis_type, row[1])])
+        self.misses += 1
+        return None
+
+    def get_by_file(self, file_hash, analysis_type):
+        """アップロードされたファイルのSHA-256と分析タイプに一致する分析結果を返します（ない場合は None）。"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT text_sha256 FROM uploaded_files WHERE file_sha256 = ?", (file_hash,)
+            ).fetchone()
+        if row is None:
+            return None
+        return self.get(row[0], analysis_type)
+
+    def add_file(self, file_hash, text_hash):
+        """アップロードされたファイルのSHA-256と、抽出したテキストのSHA-256の対応を保存します。"""
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO uploaded_files (file_sha256, text_sha256) VALUES (?, ?)",
+                (file_hash, text_hash),
+            )
+
+    def put(self, text_hash, analysis_type, result, report_files):
+        """
+        分析結果を保存し、件数の上限を超えた場合は最も長く使われていない分析結果から削除します。
+
+        Args:
+            text_hash (str): 抽出したテキストのSHA-256
+            analysis_type (str): 分析タイプ
+            result (dict): 分析結果（JSONに変換できる辞書）
+            report_files (list): 分析結果のレポートのファイルパス（分析結果を削除するときに一緒に削除）
+        """
+        now = time.time()
+        with self._connect() as conn:
+            previous = conn.execute(
+                "SELECT report_files FROM documents WHERE text_sha256 = ? AND analysis_type = ?",
+                (text_hash, analysis_type),
+            ).fetchone()
+            conn.execute(
+                "INSERT OR REPLACE INTO documents "
+                "(text_sha256, analysis_type, result, report_files, created_at, last_used_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (text_hash, analysis_type, json.dumps(result, ensure_ascii=False), json.dumps(report_files), now, now),
+            )
+        if previous is not None:
+            # 同じ文書を同時に分析した場合などに、置き換えられた分析結果のレポートを削除する
+            self._remove_files([path for path in json.loads(previous[0]) if path not in report_files])
+        self.evict()
+
+    def evict(self):
+        """件数の上限を超えた分の分析結果を、最も長く使われていないものから削除します。"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT text_sha256, analysis_type, report_files FROM documents "
+                "ORDER BY last_used_at DESC LIMIT -1 OFFSET ?",
+                (self.max_entries,),
+            ).fetchall()
+        if rows:
+            print(f"文書キャッシュから{len(rows)}件の分析結果とレポートを削除します")
+            self._delete(rows)
+
+    def _delete(self, rows):
+        with self._connect() as conn:
+            conn.executemany(
+                "DELETE FROM documents WHERE text_sha256 = ? AND analysis_type = ?",
+                [(text_hash, analysis_type) for text_hash, analysis_type, _ in rows],
+            )
+            # どの分析結果にも対応しなくなったファイルの対応を削除する
+            conn.execute(
+                "DELETE FROM uploaded_files WHERE text_sha256 NOT IN (SELECT text_sha256 FROM documents)"
+            )
+        self._remove_files([path for _, _, report_files in rows for path in json.loads(report_files)])
+
+    def _remove_files(self, paths):
+        for path in paths:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        if paths and self.on_remove is not None:
+            self.on_remove(paths)
+
+    def __len__(self):
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
@@ -0,0 +1,282 @@
+"""
+SQLiteに保存するバックグラウンドジョブのキュー
+
+時間のかかる処理（文書の分析とレポートの作成）をリクエストのスレッドから切り離し、
+ローカルのワーカースレッドで実行します。
+
+- ジョブは SQLite ファイルの jobs テーブルに保存するため、アプリケーションを再起動しても失われない
+- 再起動時に実行中のまま残っていたジョブは待機中に戻して再実行（max_attempts 回まで）
+- 待機中のジョブは登録順に、ワーカー数（workers）までの同時実行で処理
+- ジョブの取得は SQLite のトランザクション（BEGIN IMMEDIATE）で行うため、同じジョブを二重に実行しない
+- ジョブが完了または失敗したとき（再実行しなくなったとき）に on_finish にペイロードを通知（一時ファイルの削除などに使う）
+
+ジョブの状態は queued（待機中）→ running（実行中）→ done（完了）/ failed（失敗）と変化します。
+1つのデータベースファイルは1つのプロセスのキューだけで使用してください。
+"""
+
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from colorama import Fore, Style
+
+# ジョブの状態
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+# 他のワーカーからの通知がない場合に、待機中のジョブを確認する間隔（秒）
+POLL_INTERVAL = 5.0
+
+
+class JobQueue:
+    """
+    SQLiteに保存するジョブのキューとワーカースレッド
+
+    Args:
+        db_path (str): SQLiteデータベースファイルのパス
+        handler (callable): ジョブのペイロード（辞書）を受け取り、結果（JSONに変換できる辞書）を返す関数
+        workers (int): 同時に実行するジョブの数
+        max_attempts (int): 再起動による中断を含めて、1つのジョブを実行する回数の上限
+        on_finish (callable, optional): 完了または失敗したジョブのペイロードを受け取る関数
+    """
+
+    def __init__(self, db_path, handler, workers=2, max_attempts=3, on_finish=None):
+        self.db_path = db_path
+        self.handler = handler
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.on_finish = on_finish
+        self._wakeup = threading.Condition()
+        self._stopping = threading.Event()
+        self._threads = []
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    job_id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    result TEXT,
+                    error TEXT,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def submit(self, payload, job_id=None):
+        """
+        ジョブを登録します。
+
+        Args:
+            payload (dict): handler に渡すペイロード（JSONに変換できる辞書）
+            job_id (str, optional): ジョブID（未指定の場合は生成）
+
+        Returns:
+            str: ジョブID
+        """
+        job_id = job_id or uuid.uuid4().hex
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (job_id, status, payload, created_at) VALUES (?, ?, ?, ?)",
+                (job_id, QUEUED, json.dumps(payload, ensure_ascii=False), time.time()),
+            )
+        with self._wakeup:
+            self._wakeup.notify()
+        return job_id
+
+    def get(self, job_id):
+        """
+        ジョブの状態を返します。
+
+        Returns:
+            dict: job_id, status, payload, result, error, attempts, created_at, started_at, finished_at
+                  （ジョブが存在しない場合は None）
+        """
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        job["result"] = json.loads(job["result"]) if job["result"] is not None else None
+        return job
+
+    def counts(self):
+        """状態ごとのジョブの数を返します。"""
+        with self._connect() as conn:
+            return dict(conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+    def update_results(self, field, values, changes):
+        """
+        完了したジョブのうち、結果の field の値が values のいずれかであるジョブの結果を changes で更新します。
+
+        Args:
+            field (str): 結果（辞書）のキー
+            values (list): 更新するジョブの field の値
+            changes (dict): 結果に上書きするキーと値
+
+        Returns:
+            int: 更新したジョブの数
+        """
+        values = list(values)
+        if not values:
+            return 0
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT job_id, result FROM jobs WHERE status = ? AND json_extract(result, ?) IN ({', '.join('?' * len(values))})",
+                (DONE, f"$.{field}", *values),
+            ).fetchall()
+            conn.executemany(
+                "UPDATE jobs SET result = ? WHERE job_id = ?",
+                [
+                    (json.dumps({**json.loads(row["result"]), **changes}, ensure_ascii=False), row["job_id"])
+                    for row in rows
+                ],
+            )
+        return len(rows)
+
+    def results_before(self, field, timestamp):
+        """
+        完了したジョブのうち、結果の field の値（時刻）が timestamp 以前のジョブの結果を返します。
+
+        Returns:
+            list: ジョブの結果（辞書）のリスト
+        """
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT result FROM jobs WHERE status = ? AND json_extract(result, ?) <= ?",
+                (DONE, f"$.{field}", timestamp),
+            ).fetchall()
+        return [json.loads(row["result"]) for row in rows]
+
+    # --- ワーカー ---
+    def start(self):
+        """中断されたジョブを待機中に戻し、ワーカースレッドを開始します（開始済みの場合は何もしません）。"""
+        if self._threads:
+            return
+        self._recover()
+        self._stopping.clear()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        counts = self.counts()
+        print(
+            f"ジョブキューを開始しました（ワーカー数: {self.workers}、"
+            f"待機中: {counts.get(QUEUED, 0)}件）"
+        )
+
+    def stop(self, timeout=None):
+        """ワーカースレッドを停止します（実行中のジョブは完了まで待ちます）。"""
+        self._stopping.set()
+        with self._wakeup:
+            self._wakeup.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _recover(self):
+        """前回の実行中に中断されたジョブを、実行回数の上限に達していなければ待機中に戻します。"""
+        now = time.time()
+        with self._connect() as conn:
+            failed_payloads = [
+                json.loads(row["payload"])
+                for row in conn.execute(
+                    "SELECT payload FROM jobs WHERE status = ? AND attempts >= ?",
+                    (RUNNING, self.max_attempts),
+                )
+            ]
+            failed = conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE status = ? AND attempts >= ?",
+                (FAILED, "実行中に中断された回数が上限に達しました", now, RUNNING, self.max_attempts),
+            ).rowcount
+            requeued = conn.execute(
+                "UPDATE jobs SET status = ?, started_at = NULL WHERE status = ?",
+                (QUEUED, RUNNING),
+            ).rowcount
+        if requeued or failed:
+            print(f"{Fore.YELLOW}中断されたジョブを再開します（再実行: {requeued}件、失敗: {failed}件）{Style.RESET_ALL}")
+        for payload in failed_payloads:
+            self._notify_finish(payload)
+
+    def _claim(self):
+        """最も古い待機中のジョブを実行中にして返します（待機中のジョブがない場合は None）。"""
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT job_id, payload FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1",
+                (QUEUED,),
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE jobs SET status = ?, started_at = ?, attempts = attempts + 1 WHERE job_id = ?",
+                    (RUNNING, time.time(), row["job_id"]),
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        return row
+
+    def _finish(self, job_id, result=None, error=None):
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ? WHERE job_id = ?",
+                (
+                    FAILED if error is not None else DONE,
+                    json.dumps(result, ensure_ascii=False) if result is not None else None,
+                    error,
+                    time.time(),
+                    job_id,
+                ),
+            )
+
+    def _notify_finish(self, payload):
+        if self.on_finish is None:
+            return
+        try:
+            self.on_finish(payload)
+        except Exception as e:
+            # 通知先のエラーでワーカースレッドを止めない
+            print(f"{Fore.RED}ジョブの終了の通知でエラーが発生しました: {str(e)}{Style.RESET_ALL}")
+
+    def _work(self):
+        while not self._stopping.is_set():
+            row = self._claim()
+            if row is None:
+                with self._wakeup:
+                    self._wakeup.wait(POLL_INTERVAL)
+                continue
+            job_id = row["job_id"]
+            payload = json.loads(row["payload"])
+            try:
+                result = self.handler(payload)
+            except Exception as e:
+                print(f"{Fore.RED}ジョブ {job_id} でエラーが発生しました: {str(e)}{Style.RESET_ALL}")
+                self._finish(job_id, error=str(e))
+            else:
+                self._finish(job_id, result=result)
+            self._notify_finish(payload)
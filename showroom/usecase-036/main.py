@@ -6,18 +6,26 @@ import io
 import tempfile
 import base64
 from datetime import datetime
+import itertools
 import json
+import uuid
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from dotenv import load_dotenv
 from flask import Flask, render_template, request, jsonify, send_file
 from werkzeug.utils import secure_filename
-import PyPDF2
 from openai import OpenAI
 import markdown
 import pdfkit
 from colorama import Fore, Style
 from bs4 import BeautifulSoup
 
+from document_analysis import ANALYSIS_PASSES, DEFAULT_MAX_CHUNK_CALLS, analyze_chunks, chunk_text
+from document_cache import DocumentCache, file_sha256, text_sha256
+from job_queue import DONE, FAILED, QUEUED, JobQueue
+from pdf_extractor import extract_pdf_text, iter_chunks, iter_pdf_pages
+
 # 環境変数の読み込み
 load_dotenv()
 
@@ -37,140 +45,101 @@ def allowed_file(filename):
     """ファイル拡張子が許可されているかチェック"""
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+# PDFのページを並行に抽出するプロセス数
+PDF_EXTRACT_WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", str(min(4, os.cpu_count() or 1))))
+
 def extract_text_from_pdf(file_path):
     """PDFファイルからテキストを抽出"""
-    text = ""
-    with open(file_path, 'rb') as file:
-        pdf_reader = PyPDF2.PdfReader(file)
-        for page in pdf_reader.pages:
-            text += page.extract_text() + "\n"
-    return text
-
-def chunk_text(text, max_tokens=8000):
-    """テキストを適切なサイズのチャンクに分割"""
-    # 簡易的なトークン推定: 英単語は平均4文字で1トークン程度
-    words = text.split()
-    chunks = []
-    current_chunk = []
-    current_token_count = 0
-    
-    for word in words:
-        # 単語のトークン数を単純に推定（単語の文字数/4）
-        word_token_count = len(word) // 4 + 1
-        
-        if current_token_count + word_token_count > max_tokens:
-            chunks.append(' '.join(current_chunk))
-            current_chunk = [word]
-            current_token_count = word_token_count
-        else:
-            current_chunk.append(word)
-            current_token_count += word_token_count
-    
-    if current_chunk:
-        chunks.append(' '.join(current_chunk))
-    
-    return chunks
+    return extract_pdf_text(file_path, separator="\n", workers=PDF_EXTRACT_WORKERS)
+
+# 分析パスを同時に実行するスレッド数（アプリ全体で共有）と、1回の呼び出しの待ち時間の上限（秒、実行開始から）
+ANALYSIS_MAX_WORKERS = int(os.getenv("ANALYSIS_MAX_WORKERS", "6"))
+ANALYSIS_PASS_TIMEOUT = float(os.getenv("ANALYSIS_PASS_TIMEOUT", "120"))
 
-def analyze_document(text, analysis_type):
-    """文書の分析を実行"""
+# 1文書あたりのチャンクごとの呼び出し数の上限
+ANALYSIS_MAX_CHUNK_CALLS = int(os.getenv("ANALYSIS_MAX_CHUNK_CALLS", str(DEFAULT_MAX_CHUNK_CALLS)))
+
+# 分析パスを実行するスレッドプール（同時に処理するアップロードが増えてもAPIへの同時リクエスト数を抑える）
+analysis_executor = ThreadPoolExecutor(max_workers=ANALYSIS_MAX_WORKERS, thread_name_prefix="analysis")
+
+def tap(items, callback):
+    """items の要素を callback に渡しながら、そのまま返すジェネレーター"""
+    for item in items:
+        callback(item)
+        yield item
+
+def analyze_document(text, analysis_type, timeout=None):
+    """
+    文書の分析を実行
+
+    text には文書のテキストか、チャンクのイテレーター（pdf_extractor.iter_chunks）を指定します。
+
+    文書の種類の特定と、analysis_type で指定した分析（"all" の場合はすべて）を同時に実行します。
+    長い文書はチャンクごとに分析して統合します（document_analysis.analyze_chunks を参照）。
+    実行を開始してから timeout 秒（既定値: ANALYSIS_PASS_TIMEOUT）以内に完了しなかった呼び出しや
+    失敗した呼び出しは結果に含めず、結果を得られなかった分析は理由を results["failed_passes"] に記録して、
+    完了した分析の結果だけを返します。
+    """
     # 文書が長い場合はチャンクに分割
-    chunks = chunk_text(text)
-    
-    results = {}
-    
-    # ドキュメントの種類を特定
-    doc_type_response = client.chat.completions.create(
-        model="gpt-4-turbo",
-        messages=[
-            {"role": "system", "content": "あなたは法律文書の分析を専門とする法律アシスタントです。ユーザーが提供する文書の種類を特定してください。"},
-            {"role": "user", "content": f"以下の法的文書の種類を特定してください。契約書、利用規約、プライバシーポリシー、法律文書、その他のいずれかで分類し、理由も説明してください。\n\n{chunks[0][:2000]}"}
-        ]
-    )
-    document_type = doc_type_response.choices[0].message.content
-    results["document_type"] = document_type
+    chunks = chunk_text(text) if isinstance(text, str) else text
     
     # 分析タイプに応じた処理
-    if analysis_type == "summary" or analysis_type == "all":
-        summary_response = client.chat.completions.create(
-            model="gpt-4-turbo",
-            messages=[
-                {"role": "system", "content": "あなたは法律文書の分析を専門とする法律アシスタントです。与えられた法的文書の要約を500-800字程度で作成してください。"},
-                {"role": "user", "content": f"以下の法的文書の要約を作成してください：\n\n{chunks[0]}"}
-            ]
-        )
-        results["summary"] = summary_response.choices[0].message.content
-    
-    if analysis_type == "key_points" or analysis_type == "all":
-        key_points_response = client.chat.completions.create(
-            model="gpt-4-turbo",
-            messages=[
-                {"role": "system", "content": "あなたは法律文書の分析を専門とする法律アシスタントです。与えられた法的文書から重要なポイントを箇条書きで抽出してください。各ポイントには文書内の対応するセクションや条項番号も示してください。"},
-                {"role": "user", "content": f"以下の法的文書から重要なポイントを10-15個抽出し、箇条書きで提示してください：\n\n{chunks[0]}"}
-            ]
-        )
-        results["key_points"] = key_points_response.choices[0].message.content
-    
-    if analysis_type == "risks" or analysis_type == "all":
-        risks_response = client.chat.completions.create(
-            model="gpt-4-turbo",
-            messages=[
-                {"role": "system", "content": "あなたは法律文書の分析を専門とする法律アシスタントです。与えられた法的文書から潜在的な法的リスクを特定し、それぞれのリスクレベル（高・中・低）を評価してください。"},
-                {"role": "user", "content": f"以下の法的文書から潜在的な法的リスクを特定し、リスクレベル（高・中・低）と共に説明してください：\n\n{chunks[0]}"}
-            ]
-        )
-        results["risks"] = risks_response.choices[0].message.content
-    
-    if analysis_type == "terminology" or analysis_type == "all":
-        terminology_response = client.chat.completions.create(
-            model="gpt-4-turbo",
-            messages=[
-                {"role": "system", "content": "あなたは法律文書の分析を専門とする法律アシスタントです。与えられた法的文書から専門的な法律用語を抽出し、それらを平易な言葉で説明してください。"},
-                {"role": "user", "content": f"以下の法的文書から専門的な法律用語を8-12個抽出し、それぞれを平易な言葉で説明してください：\n\n{chunks[0]}"}
-            ]
-        )
-        results["terminology"] = terminology_response.choices[0].message.content
-    
-    if analysis_type == "structure" or analysis_type == "all":
-        structure_response = client.chat.completions.create(
-            model="gpt-4-turbo",
-            messages=[
-                {"role": "system", "content": "あなたは法律文書の分析を専門とする法律アシスタントです。与えられた法的文書の構造を分析し、主要なセクションとその目的を説明してください。"},
-                {"role": "user", "content": f"以下の法的文書の構造を分析し、主要なセクションとその目的を説明してください：\n\n{chunks[0]}"}
-            ]
-        )
-        results["structure"] = structure_response.choices[0].message.content
-    
-    return results
+    pass_names = ["document_type"] + [
+        name for name in ANALYSIS_PASSES
+        if name != "document_type" and analysis_type in (name, "all")
+    ]
+    return analyze_chunks(
+        client,
+        analysis_executor,
+        chunks,
+        pass_names,
+        timeout or ANALYSIS_PASS_TIMEOUT,
+        max_chunk_calls=ANALYSIS_MAX_CHUNK_CALLS,
+    )
 
 def generate_report(analysis_results, file_name, text_content):
     """分析結果からHTMLレポートを生成"""
+    failed_passes = analysis_results.get('failed_passes', {})
+    
+    def section(key):
+        if key in analysis_results:
+            return analysis_results[key]
+        if key in failed_passes:
+            return f'この分析は完了しませんでした（{failed_passes[key]}）。'
+        return 'この分析は実行されませんでした。'
+    
+    coverage = analysis_results.get('coverage', {})
+    coverage_line = ''
+    if coverage.get('chunks', 1) > 1:
+        coverage_line = f"**分析範囲**: 全{coverage['chunks']}チャンク中{coverage['analyzed_chunks']}チャンク  \n"
+    
     # マークダウンレポートを作成
     now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     markdown_content = f"""# 法的文書分析レポート
 
 **分析日時**: {now}  
 **ファイル名**: {file_name}  
-**文書タイプ**: {analysis_results.get('document_type', 'N/A')}
-
+**文書タイプ**: {analysis_results.get('document_type', 'N/A')}  
+{coverage_line}
 ## 要約
 
-{analysis_results.get('summary', 'この分析は実行されませんでした。')}
+{section('summary')}
 
 ## 重要なポイント
 
-{analysis_results.get('key_points', 'この分析は実行されませんでした。')}
+{section('key_points')}
 
 ## 潜在的リスク
 
-{analysis_results.get('risks', 'この分析は実行されませんでした。')}
+{section('risks')}
 
 ## 法律用語の説明
 
-{analysis_results.get('terminology', 'この分析は実行されませんでした。')}
+{section('terminology')}
 
 ## 文書構造
 
-{analysis_results.get('structure', 'この分析は実行されませんでした。')}
+{section('structure')}
 
 ---
 
@@ -296,6 +265,174 @@ def generate_report(analysis_results, file_name, text_content):
 def index():
     return render_template('index.html')
 
+def process_document_job(payload):
+    """
+    アップロードされた文書を分析してレポートを作成する（ジョブキューのワーカーで実行）
+    
+    Args:
+        payload (dict): job_id, file_path, filename, analysis_type, file_sha256
+    
+    Returns:
+        dict: 分析結果とレポートのファイル名（/jobs/<job_id>/result の応答）
+    """
+    file_path = payload['file_path']
+    filename = payload['filename']
+    analysis_type = payload['analysis_type']
+    
+    # PDFはページごとに抽出しながらチャンクに分割し、抽出の完了を待たずに確定したチャンクから分析を開始する
+    if filename.endswith('.pdf'):
+        pages = iter_pdf_pages(file_path, workers=PDF_EXTRACT_WORKERS)
+    else:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            pages = [f.read()]
+    
+    # 文書キャッシュは抽出を待たずに求められるキーで確認する（PDFはアップロードされたファイルのSHA-256、
+    # テキストファイルはテキストのSHA-256）。PDFのテキストのSHA-256は抽出したページから求め、分析結果の保存に使う
+    file_hash = payload.get('file_sha256')
+    if document_cache is not None:
+        if filename.endswith('.pdf'):
+            cached = document_cache.get_by_file(file_hash, analysis_type) if file_hash else None
+        else:
+            text_hash = text_sha256("".join(page + "\n" for page in pages))
+            cached = document_cache.get(text_hash, analysis_type)
+            if cached is not None and file_hash:
+                document_cache.add_file(file_hash, text_hash)
+        if cached is not None:
+            print(f"{Fore.GREEN}文書「{filename}」は分析済みのため、保存済みの分析結果を返します{Style.RESET_ALL}")
+            return {**cached, 'cached': True}
+    
+    page_texts = []
+    chunks = iter_chunks(tap(pages, page_texts.append), chunk_text)
+    first_chunk = next(chunks, '')
+    
+    # テキストが少なすぎる場合はエラー
+    if len(first_chunk) < 100:
+        raise ValueError('テキストが抽出できないか、内容が少なすぎます。別の文書を試してください。')
+    
+    # 文書分析
+    print(f"{Fore.GREEN}文書「{filename}」の分析を開始します...{Style.RESET_ALL}")
+    analysis_results = analyze_document(itertools.chain([first_chunk], chunks), analysis_type)
+    text_content = "".join(page + "\n" for page in page_texts)
+    
+    # HTMLレポート生成
+    html_report = generate_report(analysis_results, filename, text_content)
+    
+    # 一時ファイルにHTMLレポートを保存（同時に実行されるジョブと重ならないようにジョブIDを含める）
+    report_filename = f"legal_analysis_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{payload['job_id']}.html"
+    report_path = os.path.join(app.config['UPLOAD_FOLDER'], report_filename)
+    with open(report_path, 'w', encoding='utf-8') as f:
+        f.write(html_report)
+    
+    # PDFレポートの生成（オプション）
+    pdf_path = None
+    try:
+        pdf_path = report_path.replace('.html', '.pdf')
+        pdfkit.from_string(html_report, pdf_path)
+        have_pdf = True
+    except Exception as e:
+        print(f"PDF生成エラー: {str(e)}")
+        have_pdf = False
+    
+    result = {
+        'document_type': analysis_results.get('document_type', '不明'),
+        'summary': analysis_results.get('summary', ''),
+        'key_points': analysis_results.get('key_points', ''),
+        'risks': analysis_results.get('risks', ''),
+        'terminology': analysis_results.get('terminology', ''),
+        'structure': analysis_results.get('structure', ''),
+        'failed_passes': analysis_results.get('failed_passes', {}),
+        'coverage': analysis_results.get('coverage', {}),
+        'report_path': report_filename,
+        'have_pdf': have_pdf,
+        'pdf_path': os.path.basename(pdf_path) if have_pdf else None
+    }
+    
+    # 完了しなかった分析がある結果は、次のアップロードで分析し直せるようにキャッシュしない。
+    # キャッシュしないレポートは UNCACHED_REPORT_HOURS の経過後に削除する
+    if document_cache is not None and not analysis_results.get('failed_passes'):
+        text_hash = text_sha256(text_content)
+        document_cache.put(text_hash, analysis_type, result, [report_path] + ([pdf_path] if have_pdf else []))
+        if file_hash:
+            document_cache.add_file(file_hash, text_hash)
+    else:
+        result['report_expires_at'] = time.time() + UNCACHED_REPORT_HOURS * 3600
+    
+    remove_expired_reports()
+    return result
+
+def remove_upload(payload):
+    """完了または失敗した（再実行しない）ジョブのアップロードされたファイルを削除する"""
+    try:
+        os.remove(payload['file_path'])
+    except FileNotFoundError:
+        pass
+
+def remove_expired_reports():
+    """キャッシュしなかったレポートのうち、保存期間（UNCACHED_REPORT_HOURS）を過ぎたものを削除する"""
+    paths = []
+    for result in job_queue.results_before('report_expires_at', time.time()):
+        names = [result['report_path']] + ([result['pdf_path']] if result.get('pdf_path') else [])
+        for name in names:
+            path = os.path.join(app.config['UPLOAD_FOLDER'], name)
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            paths.append(path)
+    if paths:
+        print(f"保存期間を過ぎた{len(paths)}件のレポートを削除しました")
+        expire_reports(paths)
+
+def expire_reports(paths):
+    """文書キャッシュから削除されたレポートを参照する、完了したジョブの結果からレポートへのリンクを外す"""
+    report_names = [os.path.basename(path) for path in paths if path.endswith('.html')]
+    updated = job_queue.update_results(
+        'report_path',
+        report_names,
+        {'report_path': None, 'have_pdf': False, 'pdf_path': None, 'report_expired': True, 'report_expires_at': None},
+    )
+    if updated:
+        print(f"削除されたレポートを参照する{updated}件のジョブの結果を更新しました")
+
+# 完了しなかった分析があり、キャッシュしないレポートを残す時間（時間）
+UNCACHED_REPORT_HOURS = float(os.getenv("UNCACHED_REPORT_HOURS", "24"))
+
+# 文書の分析結果のキャッシュ（抽出したテキストと分析タイプが同じ文書は分析し直さない）
+# DOCUMENT_CACHE_SIZE は保存する分析結果の件数の上限（0 の場合はキャッシュを使わない）
+DOCUMENT_CACHE_SIZE = int(os.getenv("DOCUMENT_CACHE_SIZE", "100"))
+document_cache = DocumentCache(
+    os.getenv("DOCUMENT_CACHE_PATH", os.path.join(os.path.dirname(__file__), 'document_cache.sqlite3')),
+    max_entries=DOCUMENT_CACHE_SIZE,
+    on_remove=expire_reports,
+) if DOCUMENT_CACHE_SIZE > 0 else None
+
+# 文書の分析ジョブのキュー（ジョブはSQLiteファイルに保存され、再起動後も処理を続ける）
+job_queue = JobQueue(
+    os.getenv("JOB_DB_PATH", os.path.join(os.path.dirname(__file__), 'jobs.sqlite3')),
+    process_document_job,
+    workers=int(os.getenv("JOB_WORKERS", "2")),
+    on_finish=remove_upload,
+)
+
+# ワーカーはアプリケーションの作成時に開始する（gunicorn などのWSGIサーバーに読み込まれた場合も同じ）。
+# python main.py のデバッグモードの自動リロードでは、リクエストを処理しない親プロセス（WERKZEUG_RUN_MAIN が未設定）では開始しない
+if __name__ != "__main__" or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+    job_queue.start()
+
+def job_status(job):
+    """ジョブの状態の応答（/jobs/<job_id>）を作成"""
+    return {
+        'job_id': job['job_id'],
+        'status': job['status'],
+        'filename': job['payload']['filename'],
+        'analysis_type': job['payload']['analysis_type'],
+        'error': job['error'],
+        'created_at': job['created_at'],
+        'started_at': job['started_at'],
+        'finished_at': job['finished_at'],
+        'result_url': f"/jobs/{job['job_id']}/result",
+    }
+
 @app.route('/upload', methods=['POST'])
 def upload_file():
     if 'document' not in request.files:
@@ -309,64 +446,59 @@ def upload_file():
     
     if file and allowed_file(file.filename):
         filename = secure_filename(file.filename)
-        file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(file_path)
+        data = file.read()
+        file_hash = file_sha256(data)
         
-        try:
-            # PDFからテキスト抽出
-            if filename.endswith('.pdf'):
-                text_content = extract_text_from_pdf(file_path)
-            else:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    text_content = f.read()
-            
-            # テキストが少なすぎる場合はエラー
-            if len(text_content) < 100:
-                return jsonify({'error': 'テキストが抽出できないか、内容が少なすぎます。別の文書を試してください。'}), 400
-            
-            # 文書分析
-            print(f"{Fore.GREEN}文書「{filename}」の分析を開始します...{Style.RESET_ALL}")
-            analysis_results = analyze_document(text_content, analysis_type)
-            
-            # HTMLレポート生成
-            html_report = generate_report(analysis_results, filename, text_content)
-            
-            # 一時ファイルにHTMLレポートを保存
-            report_filename = f"legal_analysis_{datetime.now().strftime('%Y%m%d_%H%M%S')}.html"
-            report_path = os.path.join(app.config['UPLOAD_FOLDER'], report_filename)
-            with open(report_path, 'w', encoding='utf-8') as f:
-                f.write(html_report)
-            
-            # PDFレポートの生成（オプション）
-            pdf_path = None
-            try:
-                pdf_path = report_path.replace('.html', '.pdf')
-                pdfkit.from_string(html_report, pdf_path)
-                have_pdf = True
-            except Exception as e:
-                print(f"PDF生成エラー: {str(e)}")
-                have_pdf = False
-            
-            # 結果を返す
-            return jsonify({
-                'success': True,
-                'document_type': analysis_results.get('document_type', '不明'),
-                'summary': analysis_results.get('summary', ''),
-                'key_points': analysis_results.get('key_points', ''),
-                'risks': analysis_results.get('risks', ''),
-                'terminology': analysis_results.get('terminology', ''),
-                'structure': analysis_results.get('structure', ''),
-                'report_path': report_filename,
-                'have_pdf': have_pdf,
-                'pdf_path': os.path.basename(pdf_path) if have_pdf else None
-            })
-            
-        except Exception as e:
-            print(f"エラー発生: {str(e)}")
-            return jsonify({'error': f'分析中にエラーが発生しました: {str(e)}'}), 500
+        # 同じファイルが分析済みの場合は、ファイルを保存せずに保存済みの分析結果をすぐに返す
+        if document_cache is not None:
+            cached = document_cache.get_by_file(file_hash, analysis_type)
+            if cached is not None:
+                print(f"{Fore.GREEN}文書「{filename}」は分析済みのため、保存済みの分析結果を返します{Style.RESET_ALL}")
+                return jsonify({'success': True, 'status': DONE, 'cached': True, **cached})
+        
+        # 同じ名前のファイルが同時にアップロードされても上書きしないよう、ジョブIDを付けて保存
+        job_id = uuid.uuid4().hex
+        file_path = os.path.join(app.config['UPLOAD_FOLDER'], f"{job_id}_{filename}")
+        with open(file_path, 'wb') as f:
+            f.write(data)
+        
+        # 分析はジョブキューのワーカーで実行し、ジョブIDをすぐに返す
+        job_queue.submit({
+            'job_id': job_id,
+            'file_path': file_path,
+            'filename': filename,
+            'analysis_type': analysis_type,
+            'file_sha256': file_hash,
+        }, job_id=job_id)
+        return jsonify({
+            'success': True,
+            'job_id': job_id,
+            'status': QUEUED,
+            'status_url': f"/jobs/{job_id}",
+            'result_url': f"/jobs/{job_id}/result",
+        }), 202
         
     return jsonify({'error': '許可されていないファイル形式です'}), 400
 
+@app.route('/jobs/<job_id>')
+def get_job(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': 'ジョブが見つかりません'}), 404
+    return jsonify(job_status(job))
+
+@app.route('/jobs/<job_id>/result')
+def get_job_result(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': 'ジョブが見つかりません'}), 404
+    if job['status'] == FAILED:
+        return jsonify({'error': f"分析中にエラーが発生しました: {job['error']}", 'status': FAILED}), 500
+    if job['status'] != DONE:
+        # まだ完了していない場合は状態だけを返す
+        return jsonify(job_status(job)), 202
+    return jsonify({'success': True, 'status': DONE, **job['result']})
+
 @app.route('/download/<filename>')
 def download_file(filename):
     return send_file(os.path.join(app.config['UPLOAD_FOLDER'], filename), as_attachment=True)
@@ -0,0 +1,122 @@
+"""
+PDFのページ単位のストリーミング抽出
+
+PDFのテキストをページごとにジェネレーターで返し、文書全体を1つの文字列に連結しながら
+抽出する（ページ数に対して2乗の時間がかかる）処理を置き換えます。
+
+- iter_pdf_pages: ページのテキストを順に返す（workers が2以上の場合はページ範囲をプロセスプールで並行に抽出）
+- extract_pdf_text: すべてのページのテキストを1回の結合で連結して返す
+- iter_chunks: ページのテキストを少しずつチャンク分割の関数に渡し、確定したチャンクから順に返す
+  （抽出の完了を待たずに先頭のチャンクの処理を開始できる）
+
+プロセスプールで抽出する場合も、先読みするページ範囲を workers の2倍までに抑えるため、
+メモリに保持するページ数はPDFのページ数によらず一定です。
+
+usecase-034 に同じ内容のコピーがあります。変更した場合はコピーも更新してください。
+"""
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import PyPDF2
+
+# プロセスプールの1タスクで抽出するページ数
+DEFAULT_PAGES_PER_TASK = 16
+
+# iter_chunks でチャンク分割を実行する間隔（前回の分割以降に追加された文字数）
+DEFAULT_FLUSH_CHARS = 50000
+
+
+def count_pages(file_path):
+    """PDFのページ数を返します。"""
+    with open(file_path, "rb") as f:
+        return len(PyPDF2.PdfReader(f).pages)
+
+
+def _extract_page_range(file_path, start, stop):
+    """ページ範囲 [start, stop) のテキストのリストを返します（プロセスプールのワーカーで実行）。"""
+    with open(file_path, "rb") as f:
+        pages = PyPDF2.PdfReader(f).pages
+        return [pages[i].extract_text() or "" for i in range(start, stop)]
+
+
+def iter_pdf_pages(file_path, workers=1, pages_per_task=DEFAULT_PAGES_PER_TASK, start=0, stop=None):
+    """
+    PDFのページのテキストを先頭から順に返すジェネレーター
+
+    Args:
+        file_path (str): PDFファイルのパス
+        workers (int): 並行に抽出するプロセス数（1 の場合はこのプロセスで1ページずつ抽出）
+        pages_per_task (int): プロセスプールの1タスクで抽出するページ数
+        start (int): 抽出を開始するページ（0始まり）
+        stop (int, optional): 抽出を終了するページ（このページは含まない。未指定の場合は最後のページまで）
+
+    Yields:
+        str: ページのテキスト
+    """
+    if workers <= 1:
+        with open(file_path, "rb") as f:
+            pages = PyPDF2.PdfReader(f).pages
+            stop = len(pages) if stop is None else min(stop, len(pages))
+            for i in range(start, stop):
+                yield pages[i].extract_text() or ""
+        return
+
+    total = count_pages(file_path)
+    stop = total if stop is None else min(stop, total)
+    ranges = iter([(s, min(s + pages_per_task, stop)) for s in range(start, stop, pages_per_task)])
+    executor = ProcessPoolExecutor(max_workers=workers)
+    try:
+        # 先読みするページ範囲を workers の2倍までに抑え、完了した範囲から順に返す
+        pending = deque(executor.submit(_extract_page_range, file_path, s, e) for s, e in islice(ranges, workers * 2))
+        while pending:
+            texts = pending.popleft().result()
+            for s, e in islice(ranges, 1):
+                pending.append(executor.submit(_extract_page_range, file_path, s, e))
+            yield from texts
+    finally:
+        # 途中で読み出しをやめた場合は、まだ開始していないタスクを取り消す
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def extract_pdf_text(file_path, separator="\n", workers=1):
+    """PDFのすべてのページのテキストを、各ページの後に separator を付けて連結して返します。"""
+    return "".join(page + separator for page in iter_pdf_pages(file_path, workers=workers))
+
+
+def iter_chunks(pages, chunker, separator="\n", flush_chars=DEFAULT_FLUSH_CHARS):
+    """
+    ページのテキストを順にチャンク分割し、確定したチャンクから返すジェネレーター
+
+    flush_chars 文字のテキストが追加されるごとに、未確定のテキストを chunker で分割し、
+    最後のチャンク以外を確定して返します。最後のチャンクは、未確定のテキストのうちそのチャンクが始まる位置
+    以降（chunker が除去した末尾の空白や区切りを含む元のテキスト）を残し、後続のページとつなげて分割し直します。
+    先頭から詰めて分割し、元のテキストの部分文字列（前後の空白を除去したもの）をチャンクとして返す chunker の場合、
+    結果は全ページを連結して分割した場合と同じです。
+
+    Args:
+        pages (iterable): ページのテキスト
+        chunker (callable): テキストを受け取り、チャンクのリストを返す関数
+        separator (str): 各ページの後に付ける区切り
+        flush_chars (int): チャンク分割を実行する間隔（追加された文字数）
+
+    Yields:
+        str: チャンク
+    """
+    buffer, added_chars = [], 0
+    for page in pages:
+        buffer.append(page + separator)
+        added_chars += len(page) + len(separator)
+        if added_chars < flush_chars:
+            continue
+        added_chars = 0
+        text = "".join(buffer)
+        chunks = chunker(text)
+        if len(chunks) > 1:
+            yield from chunks[:-1]
+            tail_start = text.rfind(chunks[-1])
+            # チャンクが元のテキストに見つからない chunker では、最後のチャンクに区切りを付けて残す
+            buffer = [text[tail_start:] if tail_start >= 0 else chunks[-1] + separator]
+    if buffer:
+        yield from chunker("".join(buffer))
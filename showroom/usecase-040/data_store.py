@@ -0,0 +1,200 @@
+"""
+行政サービスデータのインメモリ検索エンジン
+
+手続き・施設・イベント・FAQの各データを、検索しやすい形に索引付けして保持します。
+
+- ID → レコードのハッシュマップ（IDによる取得をO(1)で実行）
+- カテゴリ・タイプごとのビットマップ（Pythonの整数をビット集合として使用し、条件の組み合わせをAND演算で評価）
+- 日付でソートしたインデックス（bisectによる範囲検索。検索のたびに日付を解析しない）
+- 文字バイグラムによるテキストインデックス（日本語のキーワード検索に対応）
+
+インデックスは構築後に変更しないため、データが変わった場合は新しいインスタンスを構築して
+参照を差し替えることで、検索中のスレッドに影響を与えずに更新できます。
+"""
+
+import unicodedata
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from datetime import datetime
+
+DATE_FORMAT = "%Y-%m-%d"
+
+
+def normalize_text(text):
+    """検索用にテキストを正規化します（NFKC正規化 + 小文字化）。"""
+    if not text:
+        return ""
+    return unicodedata.normalize("NFKC", str(text)).lower()
+
+
+def tokenize(text):
+    """正規化済みテキストを文字バイグラムに分割します（空白をまたぐバイグラムは除外）。"""
+    tokens = set()
+    for word in text.split():
+        for i in range(len(word) - 1):
+            tokens.add(word[i : i + 2])
+    return tokens
+
+
+def normalize_date(value):
+    """YYYY-MM-DD形式の日付を検証し、ゼロ埋めした文字列に揃えます（文字列のまま大小比較できる形式）。"""
+    return datetime.strptime(value, DATE_FORMAT).strftime(DATE_FORMAT)
+
+
+def bitmap_from_positions(positions, size):
+    """位置のリストからビットマップ（整数）を作成します。"""
+    bits = bytearray((size + 7) // 8)
+    for pos in positions:
+        bits[pos >> 3] |= 1 << (pos & 7)
+    return int.from_bytes(bits, "little")
+
+
+def iter_bits(bitmap):
+    """ビットマップで1になっている位置を昇順に返します。"""
+    bits = bin(bitmap)[:1:-1]
+    pos = bits.find("1")
+    while pos != -1:
+        yield pos
+        pos = bits.find("1", pos + 1)
+
+
+class IndexedCollection:
+    """
+    索引付きのレコードコレクション
+
+    Args:
+        records (list): レコード（辞書）のリスト。検索結果は元のリストの順序で返します
+        text_fields (tuple): キーワード検索の対象フィールド（値は文字列または文字列のリスト）
+        facet_fields (tuple): ビットマップで絞り込むフィールド（カテゴリ、タイプなど）
+        date_field (str, optional): 範囲検索に使う日付フィールド（YYYY-MM-DD形式）
+        id_field (str): ID フィールド名
+    """
+
+    def __init__(self, records, text_fields, facet_fields=(), date_field=None, id_field="id"):
+        self.records = list(records)
+        self.size = len(self.records)
+        self.all_bitmap = (1 << self.size) - 1
+        self.by_id = {record[id_field]: record for record in self.records}
+
+        facet_positions = {field: defaultdict(list) for field in facet_fields}
+        token_positions = defaultdict(list)
+        self._texts = []
+        dated = []
+
+        for pos, record in enumerate(self.records):
+            for field, values in facet_positions.items():
+                values[record.get(field)].append(pos)
+
+            texts = []
+            for field in text_fields:
+                value = record.get(field)
+                values = value if isinstance(value, (list, tuple)) else [value]
+                texts.extend(normalize_text(v) for v in values if v)
+            self._texts.append(tuple(texts))
+            for token in set().union(*(tokenize(text) for text in texts)):
+                token_positions[token].append(pos)
+
+            if date_field and record.get(date_field):
+                dated.append((normalize_date(record[date_field]), pos))
+
+        self._facets = {
+            field: {value: bitmap_from_positions(p, self.size) for value, p in values.items()}
+            for field, values in facet_positions.items()
+        }
+        self._tokens = {token: frozenset(p) for token, p in token_positions.items()}
+
+        dated.sort()
+        self._dates = [date for date, _ in dated]
+        self._date_positions = [pos for _, pos in dated]
+
+    def get(self, record_id):
+        """IDを指定してレコードを取得します。見つからない場合は None を返します。"""
+        return self.by_id.get(record_id)
+
+    def facet_bitmap(self, field, value):
+        """カテゴリ・タイプなどの値に一致するレコードのビットマップを返します。"""
+        return self._facets[field].get(value, 0)
+
+    def date_bitmap(self, date_from=None, date_to=None):
+        """日付が [date_from, date_to] の範囲にあるレコードのビットマップを返します。"""
+        lo = bisect_left(self._dates, normalize_date(date_from)) if date_from else 0
+        hi = bisect_right(self._dates, normalize_date(date_to)) if date_to else len(self._dates)
+        return bitmap_from_positions(self._date_positions[lo:hi], self.size)
+
+    def text_bitmap(self, query, candidates=None):
+        """
+        キーワードを含むレコードのビットマップを返します。
+
+        バイグラムのインデックスで候補を絞り込んでから、部分文字列として含まれるかを確認します。
+        """
+        term = normalize_text(query).strip()
+        if not term:
+            return self.all_bitmap if candidates is None else candidates
+
+        tokens = tokenize(term)
+        if tokens:
+            postings = []
+            for token in tokens:
+                positions = self._tokens.get(token)
+                if not positions:
+                    return 0
+                postings.append(positions)
+            postings.sort(key=len)
+            positions = set(postings[0]).intersection(*postings[1:])
+            if candidates is not None:
+                positions.intersection_update(iter_bits(candidates))
+        else:
+            # バイグラムを作れない短いキーワードはインデックスを使わずに候補を直接確認する
+            positions = range(self.size) if candidates is None else iter_bits(candidates)
+
+        matched = [pos for pos in positions if any(term in text for text in self._texts[pos])]
+        return bitmap_from_positions(matched, self.size)
+
+    def search(self, query=None, facets=None, date_from=None, date_to=None):
+        """
+        条件に一致するレコードを元のリストの順序で返します。
+
+        Args:
+            query (str, optional): キーワード
+            facets (dict, optional): フィールド名と値の対応（値が None の条件は無視）
+            date_from (str, optional): 開始日（YYYY-MM-DD形式）
+            date_to (str, optional): 終了日（YYYY-MM-DD形式）
+
+        Returns:
+            list: 一致したレコードのリスト
+        """
+        bitmap = self.all_bitmap
+        for field, value in (facets or {}).items():
+            if value is not None:
+                bitmap &= self.facet_bitmap(field, value)
+        if date_from or date_to:
+            bitmap &= self.date_bitmap(date_from, date_to)
+        if query and bitmap:
+            bitmap = self.text_bitmap(query, bitmap)
+        return [self.records[pos] for pos in iter_bits(bitmap)]
+
+
+class GovernmentDataStore:
+    """
+    行政サービスデータ全体の検索エンジン
+
+    Args:
+        procedures (list): 行政手続き情報のリスト
+        facilities (list): 施設情報のリスト
+        events (list): イベント情報のリスト
+        faqs (list): FAQのリスト
+    """
+
+    def __init__(self, procedures, facilities, events, faqs):
+        self.procedures = IndexedCollection(
+            procedures, text_fields=("name", "description"), facet_fields=("category",)
+        )
+        self.facilities = IndexedCollection(
+            facilities, text_fields=("name", "address", "services"), facet_fields=("facility_type",)
+        )
+        self.events = IndexedCollection(
+            events, text_fields=("name", "description"), facet_fields=("event_type",), date_field="date"
+        )
+        self.faqs = IndexedCollection(
+            faqs, text_fields=("question", "answer"), facet_fields=("category",), id_field="question"
+        )
@@ -3,12 +3,20 @@
 
 このモジュールは、行政手続き情報、施設情報、イベント情報、FAQ、緊急情報などの
 データを管理し、検索・取得するための関数を提供します。
+
+get_emergency_info の結果は tool_cache で短時間キャッシュします。
+EMERGENCY_INFO を更新した場合は tool_cache.invalidate("get_emergency_info") を呼び出してください
+（reload_store() はすべてのキャッシュを破棄します）。
 """
 
 import json
+import threading
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Any
 
+from data_store import GovernmentDataStore
+from tool_cache import cached_tool, invalidate
+
 
 # --- サンプルデータ ---
 
@@ -427,6 +435,47 @@ EMERGENCY_INFO = {
 }
 
 
+# --- 検索インデックス ---
+
+# (データの識別子, GovernmentDataStore) の組。1つの参照として差し替えることで更新をアトミックに行う
+_store_entry = None
+_store_lock = threading.Lock()
+
+
+def _data_signature():
+    """データリストの差し替えや件数の変化を検出するための識別子を返します。"""
+    return tuple((id(data), len(data)) for data in (PROCEDURES, FACILITIES, EVENTS, FAQS))
+
+
+def reload_store() -> GovernmentDataStore:
+    """
+    データから検索インデックスを再構築します。
+
+    新しいインデックスの構築が完了してから参照を差し替えるため、
+    再構築中の検索は古いインデックスで処理されます。
+    データを直接書き換えた（件数が変わらない変更をした）場合は、この関数を呼び出してください。
+    """
+    global _store_entry
+    with _store_lock:
+        signature = _data_signature()
+        store = GovernmentDataStore(PROCEDURES, FACILITIES, EVENTS, FAQS)
+        _store_entry = (signature, store)
+    invalidate()
+    return store
+
+
+def get_store() -> GovernmentDataStore:
+    """検索インデックスを取得します。データリストが差し替えられていた場合は再構築します。"""
+    entry = _store_entry
+    if entry is None or entry[0] != _data_signature():
+        return reload_store()
+    return entry[1]
+
+
+# モジュール読み込み時に検索インデックスを構築
+reload_store()
+
+
 # --- 検索・取得関数 ---
 
 def get_procedure_info(procedure_id: str) -> Dict:
@@ -439,9 +488,9 @@ def get_procedure_info(procedure_id: str) -> Dict:
     Returns:
         Dict: 手続き情報の辞書
     """
-    for procedure in PROCEDURES:
-        if procedure["id"] == procedure_id:
-            return procedure
+    procedure = get_store().procedures.get(procedure_id)
+    if procedure is not None:
+        return procedure
     return {"error": "指定された手続きIDが見つかりませんでした。"}
 
 
@@ -456,14 +505,8 @@ def search_procedures(query: str, category: Optional[str] = None) -> List[Dict]:
     Returns:
         List[Dict]: 検索結果のリスト
     """
-    results = []
-    
-    for procedure in PROCEDURES:
-        # キーワード検索（名前と説明文に対して）
-        if query.lower() in procedure["name"].lower() or query.lower() in procedure["description"].lower():
-            # カテゴリが指定されている場合は、カテゴリも一致するかチェック
-            if category is None or procedure["category"] == category:
-                results.append(procedure)
+    # キーワード検索（名前と説明文に対して）とカテゴリによる絞り込み
+    results = get_store().procedures.search(query, facets={"category": category})
     
     return results if results else {"message": "検索条件に一致する手続きが見つかりませんでした。"}
 
@@ -478,9 +521,9 @@ def get_facility_info(facility_id: str) -> Dict:
     Returns:
         Dict: 施設情報の辞書
     """
-    for facility in FACILITIES:
-        if facility["id"] == facility_id:
-            return facility
+    facility = get_store().facilities.get(facility_id)
+    if facility is not None:
+        return facility
     return {"error": "指定された施設IDが見つかりませんでした。"}
 
 
@@ -495,17 +538,8 @@ def search_facilities(query: str, facility_type: Optional[str] = None) -> List[D
     Returns:
         List[Dict]: 検索結果のリスト
     """
-    results = []
-    
-    for facility in FACILITIES:
-        # キーワード検索（名前、住所、サービスに対して）
-        if (query.lower() in facility["name"].lower() or 
-            query.lower() in facility["address"].lower() or 
-            any(query.lower() in service.lower() for service in facility["services"])):
-            
-            # 施設タイプが指定されている場合は、タイプも一致するかチェック
-            if facility_type is None or facility["facility_type"] == facility_type:
-                results.append(facility)
+    # キーワード検索（名前、住所、サービスに対して）と施設タイプによる絞り込み
+    results = get_store().facilities.search(query, facets={"facility_type": facility_type})
     
     return results if results else {"message": "検索条件に一致する施設が見つかりませんでした。"}
 
@@ -520,9 +554,9 @@ def get_event_info(event_id: str) -> Dict:
     Returns:
         Dict: イベント情報の辞書
     """
-    for event in EVENTS:
-        if event["id"] == event_id:
-            return event
+    event = get_store().events.get(event_id)
+    if event is not None:
+        return event
     return {"error": "指定されたイベントIDが見つかりませんでした。"}
 
 
@@ -540,32 +574,13 @@ def search_events(query: Optional[str] = None, date_from: Optional[str] = None,
     Returns:
         List[Dict]: 検索結果のリスト
     """
-    results = []
-    
-    # 日付範囲の変換
-    date_from_obj = datetime.strptime(date_from, "%Y-%m-%d") if date_from else None
-    date_to_obj = datetime.strptime(date_to, "%Y-%m-%d") if date_to else None
-    
-    for event in EVENTS:
-        event_date = datetime.strptime(event["date"], "%Y-%m-%d")
-        is_match = True
-        
-        # キーワード検索
-        if query and not (query.lower() in event["name"].lower() or query.lower() in event["description"].lower()):
-            is_match = False
-            
-        # 日付範囲の検証
-        if date_from_obj and event_date < date_from_obj:
-            is_match = False
-        if date_to_obj and event_date > date_to_obj:
-            is_match = False
-            
-        # イベントタイプの検証
-        if event_type and event["event_type"] != event_type:
-            is_match = False
-            
-        if is_match:
-            results.append(event)
+    # 日付範囲はソート済みの日付インデックスで求め、イベントタイプ・キーワードと組み合わせて絞り込む
+    results = get_store().events.search(
+        query,
+        facets={"event_type": event_type or None},
+        date_from=date_from,
+        date_to=date_to,
+    )
     
     return results if results else {"message": "検索条件に一致するイベントが見つかりませんでした。"}
 
@@ -581,25 +596,13 @@ def get_faq(query: Optional[str] = None, category: Optional[str] = None) -> List
     Returns:
         List[Dict]: 検索結果のリスト
     """
-    results = []
-    
-    for faq in FAQS:
-        is_match = True
-        
-        # キーワード検索
-        if query and not (query.lower() in faq["question"].lower() or query.lower() in faq["answer"].lower()):
-            is_match = False
-            
-        # カテゴリの検証
-        if category and faq["category"] != category:
-            is_match = False
-            
-        if is_match:
-            results.append(faq)
+    # キーワード検索（質問と回答に対して）とカテゴリによる絞り込み
+    results = get_store().faqs.search(query, facets={"category": category or None})
     
     return results if results else {"message": "検索条件に一致するFAQが見つかりませんでした。"}
 
 
+@cached_tool(ttl=60)
 def get_emergency_info(info_type: Optional[str] = None) -> Dict:
     """
     現在の緊急情報を取得します。
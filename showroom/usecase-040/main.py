@@ -11,7 +11,6 @@ import sys
 import json
 from datetime import datetime
 from typing import Dict, List, Optional, Any, Union
-from pydantic import BaseModel, Field
 from dotenv import load_dotenv
 import openai
 from flask import Flask, request, jsonify, render_template
@@ -27,6 +26,10 @@ from government_data import (
     get_faq,
     get_emergency_info,
 )
+from prompt_config import TOOLS, INSTRUCTIONS, PROMPT_VERSION
+from agent_loop import BUDGET_EXCEEDED_MESSAGE, format_trace, run_tool_loop
+from tool_cache import cache_stats
+from tool_dispatcher import ToolRegistry
 
 # Python 3.7以降の場合、標準入出力のエンコーディングをUTF-8に設定
 if sys.version_info >= (3, 7):
@@ -47,258 +50,53 @@ def setup_environment():
     return api_key
 
 
-# --- ツール関数のモデル定義 ---
+def setup_tool_registry():
+    """ツール名と実行する関数の対応を登録したレジストリを作成します。"""
+    registry = ToolRegistry(max_workers=5, default_timeout=10.0)
+    registry.register("get_procedure_info", get_procedure_info)
+    registry.register("search_procedures", search_procedures)
+    registry.register("get_facility_info", get_facility_info)
+    registry.register("search_facilities", search_facilities)
+    registry.register("get_event_info", get_event_info)
+    registry.register("search_events", search_events)
+    registry.register("get_faq", get_faq)
+    registry.register("get_emergency_info", get_emergency_info)
+    return registry
 
 
-class ProcedureInfoRequest(BaseModel):
-    """行政手続き情報取得のリクエストモデル"""
-
-    procedure_id: str = Field(..., description="手続きID（例: CERT-001）")
-
-
-class SearchProceduresRequest(BaseModel):
-    """行政手続き検索のリクエストモデル"""
-
-    query: str = Field(..., description="検索キーワード")
-    category: Optional[str] = Field(
-        None,
-        description="手続きカテゴリ（residence:住民関連, tax:税金関連, welfare:福祉関連）",
-    )
-
-
-class FacilityInfoRequest(BaseModel):
-    """施設情報取得のリクエストモデル"""
-
-    facility_id: str = Field(..., description="施設ID（例: LIB-001）")
-
-
-class SearchFacilitiesRequest(BaseModel):
-    """施設検索のリクエストモデル"""
-
-    query: str = Field(..., description="検索キーワード")
-    facility_type: Optional[str] = Field(
-        None,
-        description="施設タイプ（library:図書館, community:公民館, sports:スポーツ施設, government:行政施設）",
-    )
-
-
-class EventInfoRequest(BaseModel):
-    """イベント情報取得のリクエストモデル"""
-
-    event_id: str = Field(..., description="イベントID（例: EVENT-001）")
-
-
-class SearchEventsRequest(BaseModel):
-    """イベント検索のリクエストモデル"""
-
-    query: Optional[str] = Field(None, description="検索キーワード")
-    date_from: Optional[str] = Field(None, description="開始日（YYYY-MM-DD形式）")
-    date_to: Optional[str] = Field(None, description="終了日（YYYY-MM-DD形式）")
-    event_type: Optional[str] = Field(
-        None,
-        description="イベントタイプ（seminar:セミナー, festival:お祭り, consultation:相談会, workshop:ワークショップ）",
-    )
-
-
-class FaqRequest(BaseModel):
-    """FAQ検索のリクエストモデル"""
-
-    query: Optional[str] = Field(
-        None, description="検索キーワード（指定しない場合は全FAQを取得）"
-    )
-    category: Optional[str] = Field(
-        None,
-        description="カテゴリ（garbage:ゴミ, tax:税金, childcare:子育て, elderly:高齢者, disaster:防災）",
-    )
-
-
-class EmergencyInfoRequest(BaseModel):
-    """緊急情報取得のリクエストモデル"""
-
-    info_type: Optional[str] = Field(
-        None,
-        description="情報タイプ（disaster:災害情報, weather:気象情報, health:健康・感染症情報）",
-    )
-
-
-# --- ツール定義 ---
-
-
-def setup_tools():
-    """ツール定義を設定します。"""
-    return [
-        {
-            "type": "function",
-            "name": "get_procedure_info",
-            "description": "行政手続きIDを指定して手続きの詳細情報を取得します",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "procedure_id": {
-                        "type": "string",
-                        "description": "手続きID（例: CERT-001）",
-                    }
-                },
-                "required": ["procedure_id"],
-            },
-        },
-        {
-            "type": "function",
-            "name": "search_procedures",
-            "description": "キーワードで行政手続きを検索します",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "query": {"type": "string", "description": "検索キーワード"},
-                    "category": {
-                        "type": "string",
-                        "description": "手続きカテゴリ（residence:住民関連, tax:税金関連, welfare:福祉関連）",
-                    },
-                },
-                "required": ["query"],
-            },
-        },
-        {
-            "type": "function",
-            "name": "get_facility_info",
-            "description": "施設IDを指定して施設の詳細情報を取得します",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "facility_id": {
-                        "type": "string",
-                        "description": "施設ID（例: LIB-001）",
-                    }
-                },
-                "required": ["facility_id"],
-            },
-        },
-        {
-            "type": "function",
-            "name": "search_facilities",
-            "description": "キーワードで施設を検索します",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "query": {"type": "string", "description": "検索キーワード"},
-                    "facility_type": {
-                        "type": "string",
-                        "description": "施設タイプ（library:図書館, community:公民館, sports:スポーツ施設, government:行政施設）",
-                    },
-                },
-                "required": ["query"],
-            },
-        },
-        {
-            "type": "function",
-            "name": "get_event_info",
-            "description": "イベントIDを指定してイベントの詳細情報を取得します",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "event_id": {
-                        "type": "string",
-                        "description": "イベントID（例: EVENT-001）",
-                    }
-                },
-                "required": ["event_id"],
-            },
-        },
-        {
-            "type": "function",
-            "name": "search_events",
-            "description": "条件を指定してイベントを検索します",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "query": {"type": "string", "description": "検索キーワード"},
-                    "date_from": {
-                        "type": "string",
-                        "description": "開始日（YYYY-MM-DD形式）",
-                    },
-                    "date_to": {
-                        "type": "string",
-                        "description": "終了日（YYYY-MM-DD形式）",
-                    },
-                    "event_type": {
-                        "type": "string",
-                        "description": "イベントタイプ（seminar:セミナー, festival:お祭り, consultation:相談会, workshop:ワークショップ）",
-                    },
-                },
-            },
-        },
-        {
-            "type": "function",
-            "name": "get_faq",
-            "description": "行政サービスに関するよくある質問（FAQ）を検索します",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "query": {"type": "string", "description": "検索キーワード"},
-                    "category": {
-                        "type": "string",
-                        "description": "カテゴリ（garbage:ゴミ, tax:税金, childcare:子育て, elderly:高齢者, disaster:防災）",
-                    },
-                },
-            },
-        },
-        {
-            "type": "function",
-            "name": "get_emergency_info",
-            "description": "現在の緊急情報を取得します",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "info_type": {
-                        "type": "string",
-                        "description": "情報タイプ（disaster:災害情報, weather:気象情報, health:健康・感染症情報）",
-                    }
-                },
-            },
-        },
-    ]
+TOOL_REGISTRY = setup_tool_registry()
 
 
 # --- チャットボット処理関数 ---
 
 
-def process_chat(client, user_message, conversation_history=None):
+def process_chat(
+    client,
+    user_message,
+    conversation_history=None,
+    max_iterations=None,
+    max_tokens=None,
+    max_seconds=None,
+):
     """
     ユーザーからのメッセージを処理し、適切な応答を生成します。
 
+    モデルがツールを連鎖して呼び出す場合も、予算の範囲内でツールの実行と応答の生成を繰り返し、
+    最終的な回答を返します（agent_loop.run_tool_loop）。
+
     Args:
         client (openai.Client): OpenAIクライアント
         user_message (str): ユーザーからのメッセージ
         conversation_history (list, optional): 過去の会話履歴
+        max_iterations (int, optional): 応答生成の回数の上限
+        max_tokens (int, optional): 使用トークン数の合計の上限
+        max_seconds (float, optional): 経過時間の上限（秒）
 
     Returns:
-        dict: 応答メッセージとステータス
-    """
-    tools = setup_tools()
-    instructions = """
-    あなたは地方自治体の行政サービス案内AIアシスタントです。
-    市民からの行政手続き、公共施設、イベント、その他行政サービスに関する
-    問い合わせに丁寧に回答してください。必要に応じて提供されたツールを使用して
-    最新の正確な情報を提供してください。
-
-    以下のガイドラインに従ってください：
-    1. 常に礼儀正しく、敬語を使って対応する
-    2. 質問に対しては具体的かつ簡潔に回答する
-    3. 行政手続きや施設に関する質問には、必ずツールを使用して正確な情報を提供する
-    4. わからないことや情報がない場合は、誤った情報を提供せず、正直に伝える
-    5. 個人の状況によって異なる可能性がある場合は、一般的な情報を提供し、詳細は窓口での相談を案内する
-    6. 行政サービスの利用方法についてはできるだけ具体的に説明し、必要書類や手続き方法を案内する
-    7. 緊急の相談（災害、生活困窮など）については、適切な窓口や連絡先を案内する
-    8. Markdownは使用せず、HTMLタグを使って情報を整形する。番号付きリストは<ol><li>項目</li></ol>、箇条書きは<ul><li>項目</li></ul>を使用
-    9. 電話番号やリンクはHTML形式で記述する（例：<a href="URL">テキスト</a>）
-    
-    市民が以下のような質問をした場合は、対応するツールを使用してください：
-    - 行政手続きに関する質問 → get_procedure_info または search_procedures
-    - 公共施設に関する質問 → get_facility_info または search_facilities
-    - イベントに関する質問 → get_event_info または search_events
-    - よくある質問 → get_faq
-    - 緊急情報 → get_emergency_info
+        dict: 応答メッセージとステータス（成功時は各反復の実行時間などを記録した trace を含む）
     """
+    tools = TOOLS
+    instructions = INSTRUCTIONS
 
     # 会話履歴がある場合は、それを含めてリクエストを作成
     messages = []
@@ -315,74 +113,25 @@ def process_chat(client, user_message, conversation_history=None):
     # 現在のユーザーメッセージを追加
     messages.append({"role": "user", "content": user_message})
 
-    # OpenAI APIを呼び出し
+    # OpenAI APIを呼び出し（関数呼び出しがなくなるまで繰り返す）
     try:
-        response = client.responses.create(
-            model="gpt-4o",
-            instructions=instructions,
-            input=messages,
-            tools=tools,
-            tool_choice="auto",
+        response, trace = run_tool_loop(
+            client,
+            messages,
+            TOOL_REGISTRY,
+            tools,
+            instructions,
             previous_response_id=previous_response_id,
+            max_iterations=max_iterations,
+            max_tokens=max_tokens,
+            max_seconds=max_seconds,
         )
 
-        # 関数呼び出しがある場合は処理
-        function_calls = [msg for msg in response.output if msg.type == "function_call"]
-        if function_calls:
-            function_outputs = []
-            for fc in function_calls:
-                # 関数名とパラメータを取得
-                func_name = fc.name
-                params = json.loads(fc.arguments)
-
-                # 対応する関数を呼び出し
-                if func_name == "get_procedure_info":
-                    result = get_procedure_info(**params)
-                elif func_name == "search_procedures":
-                    result = search_procedures(**params)
-                elif func_name == "get_facility_info":
-                    result = get_facility_info(**params)
-                elif func_name == "search_facilities":
-                    result = search_facilities(**params)
-                elif func_name == "get_event_info":
-                    result = get_event_info(**params)
-                elif func_name == "search_events":
-                    result = search_events(**params)
-                elif func_name == "get_faq":
-                    result = get_faq(**params)
-                elif func_name == "get_emergency_info":
-                    result = get_emergency_info(**params)
-                else:
-                    result = {"error": "未実装の関数です"}
-
-                # 関数の出力を追加
-                function_outputs.append(
-                    {
-                        "type": "function_call_output",
-                        "call_id": fc.call_id,
-                        "output": json.dumps(result, ensure_ascii=False),
-                    }
-                )
-
-            # ツール出力を含めて最終応答を生成
-            final_response = client.responses.create(
-                model="gpt-4o",
-                instructions=instructions,
-                input=function_outputs,
-                previous_response_id=response.id,
-            )
-
-            return {
-                "status": "success",
-                "message": final_response.output_text,
-                "response_id": final_response.id,
-            }
-
-        # 関数呼び出しがない場合は直接レスポンスを返す
         return {
             "status": "success",
-            "message": response.output_text,
+            "message": response.output_text or BUDGET_EXCEEDED_MESSAGE,
             "response_id": response.id,
+            "trace": trace,
         }
 
     except Exception as e:
@@ -424,6 +173,7 @@ def console_interface():
 
         if response["status"] == "success":
             print(f"アシスタント: {response['message']}\n")
+            print(f"{format_trace(response['trace'])}\n")
             # アシスタントの応答を会話履歴に追加
             conversation_history.append(
                 {
@@ -462,6 +212,12 @@ def chat():
     return jsonify(response)
 
 
+@app.route("/api/cache/stats", methods=["GET"])
+def tool_cache_stats():
+    """ツール結果キャッシュのヒット数・ミス数などの統計を返すエンドポイント"""
+    return jsonify(cache_stats())
+
+
 def web_interface():
     """Webベースのチャットインターフェース"""
     global api_client
@@ -559,6 +315,18 @@ def web_interface():
                 color: #999;
                 font-style: italic;
             }
+            .trace {
+                margin: -5px 0 15px 0;
+                font-size: 12px;
+                color: #666;
+            }
+            .trace summary {
+                cursor: pointer;
+            }
+            .trace ul {
+                margin: 5px 0;
+                padding-left: 20px;
+            }
             footer {
                 text-align: center;
                 margin-top: 20px;
@@ -651,6 +419,31 @@ def web_interface():
                 chatContainer.scrollTop = chatContainer.scrollHeight;
             }
             
+            function addTrace(trace) {
+                // ツール呼び出しループのトレース（反復ごとの応答時間とツールの実行時間）を表示
+                if (!trace) return;
+                const details = document.createElement('details');
+                details.classList.add('trace');
+                const summary = document.createElement('summary');
+                summary.textContent = `トレース: 反復 ${trace.iterations.length}回 / ツール ${trace.tool_call_count}件 / ` +
+                    `${trace.total_tokens} トークン / ${Math.round(trace.total_latency_ms)} ms (${trace.stop_reason}${trace.budget_exhausted ? ': ' + trace.budget_exhausted : ''})`;
+                details.appendChild(summary);
+                const list = document.createElement('ul');
+                trace.iterations.forEach(step => {
+                    const item = document.createElement('li');
+                    const tools = step.tool_calls.map(call =>
+                        `${call.name} ${call.latency_ms} ms${call.status === 'success' ? '' : '（エラー）'}`
+                    );
+                    item.textContent = `#${step.iteration} 応答生成 ${Math.round(step.latency_ms)} ms` +
+                        (step.timed_out ? '（タイムアウト）' : '') +
+                        (tools.length ? ` → ${tools.join(', ')}` : '');
+                    list.appendChild(item);
+                });
+                details.appendChild(list);
+                chatContainer.appendChild(details);
+                chatContainer.scrollTop = chatContainer.scrollHeight;
+            }
+            
             function addLoadingIndicator() {
                 const loadingDiv = document.createElement('div');
                 loadingDiv.classList.add('message', 'bot-message', 'loading');
@@ -704,6 +497,7 @@ def web_interface():
                     if (data.status === 'success') {
                         // ボットの応答を表示
                         addMessage(data.message);
+                        addTrace(data.trace);
                         
                         // response_idがある場合は会話履歴に追加
                         if (data.response_id) {
@@ -747,6 +541,7 @@ def web_interface():
 
     # Flaskアプリの起動
     print("Webインターフェースを起動しています...")
+    print(f"プロンプトバージョン: {PROMPT_VERSION}")
     print("以下のURLにアクセスしてください: http://localhost:5003")
     app.run(host="localhost", port=5003, debug=True)
 
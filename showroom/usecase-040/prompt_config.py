@@ -0,0 +1,219 @@
+"""
+ツール定義とインストラクション
+
+ツール定義とインストラクションはリクエストごとに変わらないため、モジュールの読み込み時に
+一度だけ構築し、変更できない形で共有します。毎回同じ内容を送信することでプロンプトの先頭部分が
+リクエスト間でバイト単位で一致し、サーバー側のプロンプトキャッシュが効きやすくなります。
+内容を変更すると PROMPT_VERSION（内容のハッシュ値）も変わります。
+"""
+
+import hashlib
+import json
+
+
+class FrozenDict(dict):
+    """変更できない辞書（JSONへのシリアライズは通常の辞書と同じ）"""
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("FrozenDict は変更できません")
+
+    __setitem__ = __delitem__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+    def __hash__(self):
+        return hash(json.dumps(self, ensure_ascii=False, sort_keys=True))
+
+
+def freeze(value):
+    """辞書とリストを再帰的に FrozenDict とタプルに変換します。"""
+    if isinstance(value, dict):
+        return FrozenDict((key, freeze(item)) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+# --- ツール定義 ---
+
+
+def setup_tools():
+    """ツール定義を設定します。"""
+    return [
+        {
+            "type": "function",
+            "name": "get_procedure_info",
+            "description": "行政手続きIDを指定して手続きの詳細情報を取得します",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "procedure_id": {
+                        "type": "string",
+                        "description": "手続きID（例: CERT-001）",
+                    }
+                },
+                "required": ["procedure_id"],
+            },
+        },
+        {
+            "type": "function",
+            "name": "search_procedures",
+            "description": "キーワードで行政手続きを検索します",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "query": {"type": "string", "description": "検索キーワード"},
+                    "category": {
+                        "type": "string",
+                        "description": "手続きカテゴリ（residence:住民関連, tax:税金関連, welfare:福祉関連）",
+                    },
+                },
+                "required": ["query"],
+            },
+        },
+        {
+            "type": "function",
+            "name": "get_facility_info",
+            "description": "施設IDを指定して施設の詳細情報を取得します",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "facility_id": {
+                        "type": "string",
+                        "description": "施設ID（例: LIB-001）",
+                    }
+                },
+                "required": ["facility_id"],
+            },
+        },
+        {
+            "type": "function",
+            "name": "search_facilities",
+            "description": "キーワードで施設を検索します",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "query": {"type": "string", "description": "検索キーワード"},
+                    "facility_type": {
+                        "type": "string",
+                        "description": "施設タイプ（library:図書館, community:公民館, sports:スポーツ施設, government:行政施設）",
+                    },
+                },
+                "required": ["query"],
+            },
+        },
+        {
+            "type": "function",
+            "name": "get_event_info",
+            "description": "イベントIDを指定してイベントの詳細情報を取得します",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "event_id": {
+                        "type": "string",
+                        "description": "イベントID（例: EVENT-001）",
+                    }
+                },
+                "required": ["event_id"],
+            },
+        },
+        {
+            "type": "function",
+            "name": "search_events",
+            "description": "条件を指定してイベントを検索します",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "query": {"type": "string", "description": "検索キーワード"},
+                    "date_from": {
+                        "type": "string",
+                        "description": "開始日（YYYY-MM-DD形式）",
+                    },
+                    "date_to": {
+                        "type": "string",
+                        "description": "終了日（YYYY-MM-DD形式）",
+                    },
+                    "event_type": {
+                        "type": "string",
+                        "description": "イベントタイプ（seminar:セミナー, festival:お祭り, consultation:相談会, workshop:ワークショップ）",
+                    },
+                },
+            },
+        },
+        {
+            "type": "function",
+            "name": "get_faq",
+            "description": "行政サービスに関するよくある質問（FAQ）を検索します",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "query": {"type": "string", "description": "検索キーワード"},
+                    "category": {
+                        "type": "string",
+                        "description": "カテゴリ（garbage:ゴミ, tax:税金, childcare:子育て, elderly:高齢者, disaster:防災）",
+                    },
+                },
+            },
+        },
+        {
+            "type": "function",
+            "name": "get_emergency_info",
+            "description": "現在の緊急情報を取得します",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "info_type": {
+                        "type": "string",
+                        "description": "情報タイプ（disaster:災害情報, weather:気象情報, health:健康・感染症情報）",
+                    }
+                },
+            },
+        },
+    ]
+
+
+# --- インストラクション ---
+
+
+def setup_instructions():
+    """アシスタントへの指示（インストラクション）を設定します。"""
+    return """
+    あなたは地方自治体の行政サービス案内AIアシスタントです。
+    市民からの行政手続き、公共施設、イベント、その他行政サービスに関する
+    問い合わせに丁寧に回答してください。必要に応じて提供されたツールを使用して
+    最新の正確な情報を提供してください。
+
+    以下のガイドラインに従ってください：
+    1. 常に礼儀正しく、敬語を使って対応する
+    2. 質問に対しては具体的かつ簡潔に回答する
+    3. 行政手続きや施設に関する質問には、必ずツールを使用して正確な情報を提供する
+    4. わからないことや情報がない場合は、誤った情報を提供せず、正直に伝える
+    5. 個人の状況によって異なる可能性がある場合は、一般的な情報を提供し、詳細は窓口での相談を案内する
+    6. 行政サービスの利用方法についてはできるだけ具体的に説明し、必要書類や手続き方法を案内する
+    7. 緊急の相談（災害、生活困窮など）については、適切な窓口や連絡先を案内する
+    8. Markdownは使用せず、HTMLタグを使って情報を整形する。番号付きリストは<ol><li>項目</li></ol>、箇条書きは<ul><li>項目</li></ul>を使用
+    9. 電話番号やリンクはHTML形式で記述する（例：<a href="URL">テキスト</a>）
+    
+    市民が以下のような質問をした場合は、対応するツールを使用してください：
+    - 行政手続きに関する質問 → get_procedure_info または search_procedures
+    - 公共施設に関する質問 → get_facility_info または search_facilities
+    - イベントに関する質問 → get_event_info または search_events
+    - よくある質問 → get_faq
+    - 緊急情報 → get_emergency_info
+    """
+
+
+def compute_prompt_version(instructions, tools):
+    """インストラクションとツール定義の内容からバージョンハッシュを計算します。"""
+    payload = json.dumps(
+        {"instructions": instructions, "tools": tools},
+        ensure_ascii=False,
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:12]
+
+
+# モジュール読み込み時に一度だけ構築する共有定義
+TOOLS = freeze(setup_tools())
+INSTRUCTIONS = setup_instructions()
+PROMPT_VERSION = compute_prompt_version(INSTRUCTIONS, TOOLS)
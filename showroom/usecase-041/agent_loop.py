@@ -0,0 +1,222 @@
+"""
+予算付きのツール呼び出しループ
+
+モデルがツールの結果を見てから別のツールを呼び出す（ツールを連鎖させる）場合に備えて、
+function_call がなくなるまで「ツールの実行 → 結果を渡して再度応答を生成」を繰り返します。
+
+無制限に繰り返さないように、以下の予算を設定できます。
+
+- 反復回数の上限: responses.create を呼び出す回数（最後の1回はツールを使わずに回答させる）
+- トークン数の上限: 各レスポンスの使用トークン数の合計
+- 経過時間の上限: ループ開始からの秒数（responses.create には残りの秒数をタイムアウトとして渡す）
+
+トークン数または経過時間の予算を使い切った時点でツール呼び出しが残っている場合は、
+それまでのツール結果だけを使って回答するよう、ツールを使わない呼び出しを最後に1回だけ行います。
+最後の呼び出しで回答が生成された場合の終了理由は completed で、使い切った予算は budget_exhausted に記録します。
+
+ツールの実行は tool_dispatcher.ToolRegistry に任せ、1回の応答の複数の function_call を
+ツールごとのタイムアウト付きで並行に実行します。
+
+各反復のレイテンシ・トークン数・ツールごとの実行時間はトレース（辞書）に記録し、
+コンソールやWebインターフェースで表示できるようにします。
+
+usecase-040/agent_loop.py のコピーです。変更はコピー元に行い、このファイルにも反映してください。
+"""
+
+import json
+import os
+import time
+
+import openai
+
+DEFAULT_MAX_ITERATIONS = int(os.environ.get("AGENT_MAX_ITERATIONS", "5"))
+DEFAULT_MAX_TOKENS = int(os.environ.get("AGENT_MAX_TOKENS", "20000"))
+DEFAULT_MAX_SECONDS = float(os.environ.get("AGENT_MAX_SECONDS", "60"))
+# ツールを使わずに回答させる最後の呼び出しに、経過時間の予算の残りが少なくても確保する待ち時間（秒）
+DEFAULT_FINAL_SECONDS = float(os.environ.get("AGENT_FINAL_SECONDS", "20"))
+
+# 予算を使い切ったが回答を生成できなかった場合のメッセージ
+BUDGET_EXCEEDED_MESSAGE = "処理の上限に達したため回答を完了できませんでした。質問を分けて再度お試しください。"
+
+
+def _elapsed_ms(start):
+    return round((time.perf_counter() - start) * 1000, 1)
+
+
+def new_trace(max_iterations, max_tokens, max_seconds):
+    """空のトレースを作成します。"""
+    return {
+        "budget": {
+            "max_iterations": max_iterations,
+            "max_tokens": max_tokens,
+            "max_seconds": max_seconds,
+        },
+        "iterations": [],
+        "total_tokens": 0,
+        "tool_call_count": 0,
+        "total_latency_ms": 0.0,
+        "budget_exhausted": None,
+        "stop_reason": None,
+    }
+
+
+def run_tool_loop(
+    client,
+    input_items,
+    registry,
+    tools,
+    instructions,
+    previous_response_id=None,
+    model="gpt-4o",
+    max_iterations=None,
+    max_tokens=None,
+    max_seconds=None,
+    final_seconds=None,
+):
+    """
+    function_call がなくなるまでツールの実行と応答の生成を繰り返します。
+
+    ツールは registry（tool_dispatcher.ToolRegistry）でツールごとのタイムアウト付きで並行に実行します。
+    responses.create には経過時間の予算の残りをタイムアウトとして渡し、予算内に応答が返らなかった場合は
+    ツールを使わない最後の呼び出しに進みます（最後の呼び出しには少なくとも final_seconds 秒を確保）。
+
+    Args:
+        client (openai.Client): OpenAIクライアント
+        input_items (list): 最初の呼び出しの入力メッセージ
+        registry (ToolRegistry): ツール関数を登録したレジストリ
+        tools (list): ツール定義
+        instructions (str): インストラクション
+        previous_response_id (str, optional): 前回のレスポンスID
+        model (str): モデル名
+        max_iterations (int, optional): ツールを使う応答生成の回数と、最後の1回の合計の上限
+        max_tokens (int, optional): 使用トークン数の合計の上限
+        max_seconds (float, optional): 経過時間の上限（秒）
+        final_seconds (float, optional): ツールを使わない最後の呼び出しのタイムアウトの最小値（秒）
+
+    Returns:
+        tuple: (最後のレスポンス, トレース)
+    """
+    max_iterations = max(1, max_iterations or DEFAULT_MAX_ITERATIONS)
+    max_tokens = max_tokens or DEFAULT_MAX_TOKENS
+    max_seconds = max_seconds or DEFAULT_MAX_SECONDS
+    final_seconds = final_seconds or DEFAULT_FINAL_SECONDS
+
+    trace = new_trace(max_iterations, max_tokens, max_seconds)
+    loop_start = time.perf_counter()
+    pending_input = input_items
+    tool_choice = "none" if max_iterations == 1 else "auto"
+    if tool_choice == "none":
+        trace["budget_exhausted"] = "max_iterations"
+    response = None
+    iteration = 0
+
+    while True:
+        iteration += 1
+        remaining = max_seconds - (time.perf_counter() - loop_start)
+        timeout = max(remaining, final_seconds) if tool_choice == "none" else max(remaining, 0.0)
+        call_start = time.perf_counter()
+        try:
+            response = client.with_options(timeout=timeout).responses.create(
+                model=model,
+                instructions=instructions,
+                input=pending_input,
+                tools=tools,
+                tool_choice=tool_choice,
+                previous_response_id=previous_response_id,
+            )
+        except openai.APITimeoutError:
+            if tool_choice == "none":
+                raise
+            # 予算内に応答が返らなかった場合は、同じ入力でツールを使わずに回答させる
+            trace["iterations"].append(
+                {
+                    "iteration": iteration,
+                    "tool_choice": tool_choice,
+                    "latency_ms": _elapsed_ms(call_start),
+                    "input_tokens": 0,
+                    "output_tokens": 0,
+                    "tool_calls": [],
+                    "timed_out": True,
+                }
+            )
+            trace["budget_exhausted"] = "time_budget"
+            tool_choice = "none"
+            continue
+
+        usage = getattr(response, "usage", None)
+        step = {
+            "iteration": iteration,
+            "tool_choice": tool_choice,
+            "latency_ms": _elapsed_ms(call_start),
+            "input_tokens": getattr(usage, "input_tokens", 0) or 0,
+            "output_tokens": getattr(usage, "output_tokens", 0) or 0,
+            "tool_calls": [],
+        }
+        trace["iterations"].append(step)
+        trace["total_tokens"] += getattr(usage, "total_tokens", 0) or (
+            step["input_tokens"] + step["output_tokens"]
+        )
+
+        function_calls = [item for item in response.output if item.type == "function_call"]
+        if not function_calls:
+            # 予算を使い切った後の最後の呼び出しでも、回答が生成されていれば完了として扱う
+            # （使い切った予算は budget_exhausted に記録）
+            trace["stop_reason"] = "completed"
+            break
+        if tool_choice == "none":
+            # ツールを使わない指定でも function_call が返った場合はここで打ち切る
+            trace["stop_reason"] = trace["budget_exhausted"]
+            break
+
+        timings = []
+        pending_input = registry.dispatch(function_calls, timings=timings)
+        for fc, output, latency_ms in zip(function_calls, pending_input, timings):
+            result = json.loads(output["output"])
+            step["tool_calls"].append(
+                {
+                    "name": fc.name,
+                    "arguments": fc.arguments,
+                    "latency_ms": latency_ms,
+                    "status": "error" if isinstance(result, dict) and "error" in result else "success",
+                }
+            )
+        trace["tool_call_count"] += len(function_calls)
+        previous_response_id = response.id
+
+        # 予算を使い切る場合は、次の呼び出しでツールを使わずに回答させる
+        if trace["total_tokens"] >= max_tokens:
+            trace["budget_exhausted"] = "token_budget"
+        elif time.perf_counter() - loop_start >= max_seconds:
+            trace["budget_exhausted"] = "time_budget"
+        elif iteration + 1 >= max_iterations:
+            trace["budget_exhausted"] = "max_iterations"
+        if trace["budget_exhausted"]:
+            tool_choice = "none"
+
+    trace["total_latency_ms"] = _elapsed_ms(loop_start)
+    return response, trace
+
+
+def format_trace(trace):
+    """トレースをコンソール表示用の文字列に変換します。"""
+    lines = [
+        f"[トレース] 反復 {len(trace['iterations'])}/{trace['budget']['max_iterations']}回"
+        f" / ツール {trace['tool_call_count']}件"
+        f" / {trace['total_tokens']:,} トークン"
+        f" / {trace['total_latency_ms']:.0f} ms"
+        f" / 終了理由: {trace['stop_reason']}"
+        + (f"（使い切った予算: {trace['budget_exhausted']}）" if trace.get("budget_exhausted") else "")
+    ]
+    for step in trace["iterations"]:
+        lines.append(
+            f"  #{step['iteration']} 応答生成 {step['latency_ms']:.0f} ms"
+            + (
+                "（タイムアウト）"
+                if step.get("timed_out")
+                else f"（入力 {step['input_tokens']:,} / 出力 {step['output_tokens']:,} トークン）"
+            )
+        )
+        for call in step["tool_calls"]:
+            mark = "" if call["status"] == "success" else "（エラー）"
+            lines.append(f"    - {call['name']} {call['latency_ms']:.1f} ms{mark}")
+    return "\n".join(lines)
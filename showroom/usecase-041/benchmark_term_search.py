@@ -0,0 +1,159 @@
+"""
+医療用語検索の再現率と検索時間の評価
+
+漢字・ひらがな・カタカナ・半角カナ・ローマ字・英語名など、様々な表記で入力した
+検索キーワードのコーパスに対して、従来の検索（NFKC正規化 + 小文字化の部分一致のみ）と
+表記ゆれの正規化・読み・同義語に対応した検索の再現率と検索時間を比較します。
+
+- デモデータ: medical_data の医療用語に対する表記ゆれのコーパス
+- 合成データ: 漢字の部品と読みを組み合わせた大量の医療用語に対する検索時間
+
+使い方:
+    python benchmark_term_search.py --terms 50000 --queries 500
+"""
+
+import argparse
+import random
+import time
+
+import medical_data
+from ranked_collection import RankedCollection
+from term_normalizer import build_aliases, expand_query, normalize_term
+
+# (検索キーワード, 期待する用語ID)
+QUERY_CORPUS = [
+    ("血糖値", "TERM-001"),
+    ("けっとうち", "TERM-001"),
+    ("ケットウチ", "TERM-001"),
+    ("ｹｯﾄｳﾁ", "TERM-001"),
+    ("kettouchi", "TERM-001"),
+    ("kettochi", "TERM-001"),
+    ("KETTOUCHI", "TERM-001"),
+    ("血糖", "TERM-001"),
+    ("blood sugar", "TERM-001"),
+    ("Blood Glucose", "TERM-001"),
+    ("ＢＳ", "TERM-001"),
+    ("高血圧", "TERM-002"),
+    ("こうけつあつ", "TERM-002"),
+    ("コウケツアツ", "TERM-002"),
+    ("kouketsuatsu", "TERM-002"),
+    ("koketsuatsu", "TERM-002"),
+    ("高血圧症", "TERM-002"),
+    ("hypertension", "TERM-002"),
+    ("ハイパーテンション", "TERM-002"),
+    ("ﾊｲﾊﾟｰﾃﾝｼｮﾝ", "TERM-002"),
+]
+
+# 合成データの部品: (漢字, 読み, ローマ字)
+PARTS = [
+    ("血", "けつ", "ketsu"), ("糖", "とう", "tou"), ("圧", "あつ", "atsu"), ("心", "しん", "shin"),
+    ("肺", "はい", "hai"), ("肝", "かん", "kan"), ("腎", "じん", "jin"), ("胃", "い", "i"),
+    ("炎", "えん", "en"), ("症", "しょう", "shou"), ("性", "せい", "sei"), ("慢", "まん", "man"),
+    ("急", "きゅう", "kyuu"), ("硬", "こう", "kou"), ("化", "か", "ka"), ("不", "ふ", "fu"),
+    ("全", "ぜん", "zen"), ("梗", "こう", "kou"), ("塞", "そく", "soku"), ("脈", "みゃく", "myaku"),
+]
+CATEGORIES = ["disease", "test", "anatomy", "drug"]
+
+
+def generate_terms(size, seed=0):
+    """漢字の部品を組み合わせた合成の医療用語（名前の重複なし）と、その読み・ローマ字表記を生成します。"""
+    rng = random.Random(seed)
+    terms, readings, romaji = [], {}, {}
+    while len(terms) < size:
+        parts = rng.sample(PARTS, rng.randint(2, 5))
+        name = "".join(p[0] for p in parts)
+        if name in readings:
+            continue
+        readings[name] = "".join(p[1] for p in parts)
+        romaji[name] = "".join(p[2] for p in parts)
+        terms.append(
+            {
+                "id": f"TERM-{len(terms):06d}",
+                "name": name,
+                "category": rng.choice(CATEGORIES),
+                "definition": f"{''.join(p[0] for p in rng.sample(PARTS, 3))}に関する用語です。",
+            }
+        )
+    return terms, readings, romaji
+
+
+def hiragana_to_katakana(text):
+    """ひらがなをカタカナに変換します。"""
+    return "".join(chr(ord(c) + 0x60) if "ぁ" <= c <= "ゖ" else c for c in text)
+
+
+def build_collections(terms, readings, synonyms):
+    """従来の検索と表記ゆれに対応した検索のコレクションを構築します。"""
+    baseline = RankedCollection(terms, text_fields={"name": 3, "definition": 1}, facet_fields=("category",))
+    reading_aware = RankedCollection(
+        terms,
+        text_fields={"name": 3, "definition": 1},
+        facet_fields=("category",),
+        normalizer=normalize_term,
+        aliases=lambda term: build_aliases(term["name"], readings, synonyms),
+        query_expander=expand_query,
+    )
+    return baseline, reading_aware
+
+
+def evaluate(collection, corpus):
+    """コーパスの各キーワードで検索し、再現率と1クエリあたりの検索時間を返します。"""
+    hits = 0
+    start = time.perf_counter()
+    for query, expected_id in corpus:
+        results = collection.search(query, limit=10)["results"]
+        hits += any(result["id"] == expected_id for result in results)
+    elapsed = time.perf_counter() - start
+    return hits / len(corpus), elapsed / len(corpus)
+
+
+def print_result(label, baseline, reading_aware):
+    """評価結果を表示します。"""
+    print(f"[{label}]")
+    print(f"  従来の検索:         再現率 {baseline[0]:.1%} / {baseline[1] * 1e6:.1f} µs/クエリ")
+    print(f"  表記ゆれ対応の検索: 再現率 {reading_aware[0]:.1%} / {reading_aware[1] * 1e6:.1f} µs/クエリ")
+
+
+def main():
+    """メイン関数"""
+    parser = argparse.ArgumentParser(description="医療用語検索の再現率と検索時間の評価")
+    parser.add_argument("--terms", type=int, default=50000, help="生成する合成用語数")
+    parser.add_argument("--queries", type=int, default=500, help="合成データで実行するクエリ数")
+    parser.add_argument("--seed", type=int, default=0, help="乱数シード")
+    args = parser.parse_args()
+
+    baseline, reading_aware = build_collections(
+        medical_data.medical_terms_data,
+        medical_data.medical_term_readings,
+        medical_data.medical_term_synonyms,
+    )
+    print_result(
+        f"デモデータ: {len(QUERY_CORPUS)} クエリ",
+        evaluate(baseline, QUERY_CORPUS),
+        evaluate(reading_aware, QUERY_CORPUS),
+    )
+
+    terms, readings, romaji = generate_terms(args.terms, args.seed)
+    start = time.perf_counter()
+    baseline, reading_aware = build_collections(terms, readings, {})
+    build_time = time.perf_counter() - start
+
+    # 漢字・ひらがな・カタカナ・ローマ字の表記を同じ割合で混ぜる
+    rng = random.Random(args.seed)
+    corpus = []
+    for i in range(args.queries):
+        term = rng.choice(terms)
+        name = term["name"]
+        query = [name, readings[name], hiragana_to_katakana(readings[name]), romaji[name]][i % 4]
+        corpus.append((query, term["id"]))
+
+    print(f"インデックス構築（{args.terms:,} 用語, 2種類）: {build_time:.2f} 秒")
+    print_result(
+        f"合成データ: {args.terms:,} 用語 / {args.queries:,} クエリ",
+        evaluate(baseline, corpus),
+        evaluate(reading_aware, corpus),
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -10,7 +10,6 @@ import sys
 import json
 from datetime import datetime
 from typing import Dict, List, Optional, Any, Union
-from pydantic import BaseModel, Field
 from dotenv import load_dotenv
 import openai
 from flask import Flask, request, jsonify, render_template
@@ -28,6 +27,10 @@ from medical_data import (
     get_prevention_info,
     get_faq,
 )
+from prompt_config import TOOLS, INSTRUCTIONS, PROMPT_VERSION
+from agent_loop import BUDGET_EXCEEDED_MESSAGE, format_trace, run_tool_loop
+from tool_cache import cache_stats
+from tool_dispatcher import ToolRegistry
 
 # Python 3.7以降の場合、標準入出力のエンコーディングをUTF-8に設定
 if sys.version_info >= (3, 7):
@@ -48,301 +51,55 @@ def setup_environment():
     return api_key
 
 
-# --- ツール関数のモデル定義 ---
+def setup_tool_registry():
+    """ツール名と実行する関数の対応を登録したレジストリを作成します。"""
+    registry = ToolRegistry(max_workers=5, default_timeout=10.0)
+    registry.register("get_medical_term", get_medical_term)
+    registry.register("search_medical_terms", search_medical_terms)
+    registry.register("get_symptom_info", get_symptom_info)
+    registry.register("search_symptoms", search_symptoms)
+    registry.register("get_treatment_info", get_treatment_info)
+    registry.register("search_treatments", search_treatments)
+    registry.register("get_healthcare_system_info", get_healthcare_system_info)
+    registry.register("search_healthcare_systems", search_healthcare_systems)
+    registry.register("get_prevention_info", get_prevention_info)
+    registry.register("get_faq", get_faq)
+    return registry
 
 
-class MedicalTermRequest(BaseModel):
-    """医療用語情報取得のリクエストモデル"""
-
-    term_id: str = Field(..., description="医療用語ID（例: TERM-001）")
-
-
-class SearchMedicalTermsRequest(BaseModel):
-    """医療用語検索のリクエストモデル"""
-
-    query: str = Field(..., description="検索キーワード")
-    category: Optional[str] = Field(
-        None,
-        description="用語カテゴリ（anatomy:解剖学, disease:疾病, test:検査, treatment:治療）",
-    )
-
-
-class SymptomInfoRequest(BaseModel):
-    """症状情報取得のリクエストモデル"""
-
-    symptom_id: str = Field(..., description="症状ID（例: SYMP-001）")
-
-
-class SearchSymptomsRequest(BaseModel):
-    """症状検索のリクエストモデル"""
-
-    query: str = Field(..., description="検索キーワード")
-    body_part: Optional[str] = Field(
-        None,
-        description="身体部位（head:頭部, chest:胸部, abdomen:腹部, limbs:四肢, skin:皮膚）",
-    )
-
-
-class TreatmentInfoRequest(BaseModel):
-    """治療法情報取得のリクエストモデル"""
-
-    treatment_id: str = Field(..., description="治療法ID（例: TRT-001）")
-
-
-class SearchTreatmentsRequest(BaseModel):
-    """治療法検索のリクエストモデル"""
-
-    query: str = Field(..., description="検索キーワード")
-    treatment_type: Optional[str] = Field(
-        None,
-        description="治療タイプ（medication:薬物治療, surgery:手術, physical:理学療法, mental:精神療法）",
-    )
-
-
-class HealthcareSystemInfoRequest(BaseModel):
-    """医療制度情報取得のリクエストモデル"""
-
-    system_id: str = Field(..., description="制度ID（例: SYS-001）")
-
-
-class SearchHealthcareSystemsRequest(BaseModel):
-    """医療制度検索のリクエストモデル"""
-
-    query: str = Field(..., description="検索キーワード")
-    system_type: Optional[str] = Field(
-        None,
-        description="制度タイプ（insurance:保険, subsidy:助成, welfare:福祉, service:サービス）",
-    )
-
-
-class PreventionInfoRequest(BaseModel):
-    """予防医学情報取得のリクエストモデル"""
-
-    disease_type: Optional[str] = Field(
-        None,
-        description="疾患タイプ（lifestyle:生活習慣病, infectious:感染症, mental:精神疾患, other:その他）",
-    )
-
-
-class FaqRequest(BaseModel):
-    """FAQ検索のリクエストモデル"""
-
-    query: Optional[str] = Field(
-        None, description="検索キーワード（指定しない場合は全FAQを取得）"
-    )
-    category: Optional[str] = Field(
-        None,
-        description="カテゴリ（general:一般, medication:薬, examination:検査, insurance:保険）",
-    )
-
-
-# --- ツール定義 ---
-
-
-def setup_tools():
-    """ツール定義を設定します。"""
-    return [
-        {
-            "type": "function",
-            "name": "get_medical_term",
-            "description": "医療用語IDを指定して医療用語の詳細説明を取得します",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "term_id": {
-                        "type": "string",
-                        "description": "医療用語ID（例: TERM-001）",
-                    }
-                },
-                "required": ["term_id"],
-            },
-        },
-        {
-            "type": "function",
-            "name": "search_medical_terms",
-            "description": "キーワードで医療用語を検索します",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "query": {"type": "string", "description": "検索キーワード"},
-                    "category": {
-                        "type": "string",
-                        "description": "用語カテゴリ（anatomy:解剖学, disease:疾病, test:検査, treatment:治療）",
-                    },
-                },
-                "required": ["query"],
-            },
-        },
-        {
-            "type": "function",
-            "name": "get_symptom_info",
-            "description": "症状IDを指定して症状の詳細情報を取得します",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "symptom_id": {
-                        "type": "string",
-                        "description": "症状ID（例: SYMP-001）",
-                    }
-                },
-                "required": ["symptom_id"],
-            },
-        },
-        {
-            "type": "function",
-            "name": "search_symptoms",
-            "description": "キーワードで症状を検索します",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "query": {"type": "string", "description": "検索キーワード"},
-                    "body_part": {
-                        "type": "string",
-                        "description": "身体部位（head:頭部, chest:胸部, abdomen:腹部, limbs:四肢, skin:皮膚）",
-                    },
-                },
-                "required": ["query"],
-            },
-        },
-        {
-            "type": "function",
-            "name": "get_treatment_info",
-            "description": "治療法IDを指定して治療法の詳細情報を取得します",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "treatment_id": {
-                        "type": "string",
-                        "description": "治療法ID（例: TRT-001）",
-                    }
-                },
-                "required": ["treatment_id"],
-            },
-        },
-        {
-            "type": "function",
-            "name": "search_treatments",
-            "description": "キーワードで治療法を検索します",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "query": {"type": "string", "description": "検索キーワード"},
-                    "treatment_type": {
-                        "type": "string",
-                        "description": "治療タイプ（medication:薬物治療, surgery:手術, physical:理学療法, mental:精神療法）",
-                    },
-                },
-                "required": ["query"],
-            },
-        },
-        {
-            "type": "function",
-            "name": "get_healthcare_system_info",
-            "description": "医療制度IDを指定して医療制度の詳細情報を取得します",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "system_id": {
-                        "type": "string",
-                        "description": "制度ID（例: SYS-001）",
-                    }
-                },
-                "required": ["system_id"],
-            },
-        },
-        {
-            "type": "function",
-            "name": "search_healthcare_systems",
-            "description": "キーワードで医療制度を検索します",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "query": {"type": "string", "description": "検索キーワード"},
-                    "system_type": {
-                        "type": "string",
-                        "description": "制度タイプ（insurance:保険, subsidy:助成, welfare:福祉, service:サービス）",
-                    },
-                },
-                "required": ["query"],
-            },
-        },
-        {
-            "type": "function",
-            "name": "get_prevention_info",
-            "description": "予防医学の情報を取得します",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "disease_type": {
-                        "type": "string",
-                        "description": "疾患タイプ（lifestyle:生活習慣病, infectious:感染症, mental:精神疾患, other:その他）",
-                    }
-                },
-            },
-        },
-        {
-            "type": "function",
-            "name": "get_faq",
-            "description": "医療に関するよくある質問（FAQ）を検索します",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "query": {"type": "string", "description": "検索キーワード"},
-                    "category": {
-                        "type": "string",
-                        "description": "カテゴリ（general:一般, medication:薬, examination:検査, insurance:保険）",
-                    },
-                },
-            },
-        },
-    ]
+TOOL_REGISTRY = setup_tool_registry()
 
 
 # --- チャットボット処理関数 ---
 
 
-def process_chat(client, user_message, conversation_history=None):
+def process_chat(
+    client,
+    user_message,
+    conversation_history=None,
+    max_iterations=None,
+    max_tokens=None,
+    max_seconds=None,
+):
     """
     ユーザーからのメッセージを処理し、適切な応答を生成します。
 
+    モデルがツールを連鎖して呼び出す場合も、予算の範囲内でツールの実行と応答の生成を繰り返し、
+    最終的な回答を返します（agent_loop.run_tool_loop）。
+
     Args:
         client (openai.Client): OpenAIクライアント
         user_message (str): ユーザーからのメッセージ
         conversation_history (list, optional): 過去の会話履歴
+        max_iterations (int, optional): 応答生成の回数の上限
+        max_tokens (int, optional): 使用トークン数の合計の上限
+        max_seconds (float, optional): 経過時間の上限（秒）
 
     Returns:
-        dict: 応答メッセージとステータス
-    """
-    tools = setup_tools()
-    instructions = """
-    あなたは医療情報の理解を支援するAIアシスタントです。
-    医療用語や情報をわかりやすく説明し、一般の方の健康リテラシー向上をサポートします。
-    
-    以下のガイドラインに従ってください：
-    
-    1. 常に正確で最新の医療情報を提供するよう努める
-    2. 専門用語を使う場合は、必ず平易な言葉で補足説明する
-    3. あなたは診断や具体的な医療アドバイスを提供できない旨を適切に伝える
-    4. 質問に答える際は、適切なツールを使用して情報を取得する
-    5. 答えられない質問や専門的すぎる内容の場合は、専門家への相談を勧める
-    6. 個人の症状や状態に基づく具体的なアドバイスは避け、一般的な情報提供に留める
-    7. 不安を煽る表現や断定的な言い回しは避け、バランスの取れた情報を提供する
-    8. 情報の限界や不確実性について適切に伝える
-    9. Markdownを使って情報を整理して表示する（見出し、箇条書き、太字などを活用）
-    10. 医療情報源や参考文献の重要性を伝え、信頼できる情報源を紹介する
-    
-    ユーザーが以下のような質問をした場合は、対応するツールを使用してください：
-    - 医療用語に関する質問 → get_medical_term または search_medical_terms
-    - 症状に関する質問 → get_symptom_info または search_symptoms
-    - 治療法に関する質問 → get_treatment_info または search_treatments
-    - 医療制度に関する質問 → get_healthcare_system_info または search_healthcare_systems
-    - 予防医学に関する質問 → get_prevention_info
-    - よくある質問 → get_faq
-    
-    必ず以下の免責事項を念頭に置いてください：
-    このサービスは医療アドバイスや診断を提供するものではありません。具体的な症状や健康上の懸念がある場合は、
-    医療専門家に相談することをお勧めします。提供される情報は一般的な教育目的であり、個人の医療判断の代わりにはなりません。
+        dict: 応答メッセージとステータス（成功時は各反復の実行時間などを記録した trace を含む）
     """
+    tools = TOOLS
+    instructions = INSTRUCTIONS
 
     # 会話履歴がある場合は、それを含めてリクエストを作成
     messages = []
@@ -359,78 +116,25 @@ def process_chat(client, user_message, conversation_history=None):
     # 現在のユーザーメッセージを追加
     messages.append({"role": "user", "content": user_message})
 
-    # OpenAI APIを呼び出し
+    # OpenAI APIを呼び出し（関数呼び出しがなくなるまで繰り返す）
     try:
-        response = client.responses.create(
-            model="gpt-4o",
-            instructions=instructions,
-            input=messages,
-            tools=tools,
-            tool_choice="auto",
+        response, trace = run_tool_loop(
+            client,
+            messages,
+            TOOL_REGISTRY,
+            tools,
+            instructions,
             previous_response_id=previous_response_id,
+            max_iterations=max_iterations,
+            max_tokens=max_tokens,
+            max_seconds=max_seconds,
         )
 
-        # 関数呼び出しがある場合は処理
-        function_calls = [msg for msg in response.output if msg.type == "function_call"]
-        if function_calls:
-            function_outputs = []
-            for fc in function_calls:
-                # 関数名とパラメータを取得
-                func_name = fc.name
-                params = json.loads(fc.arguments)
-
-                # 対応する関数を呼び出し
-                if func_name == "get_medical_term":
-                    result = get_medical_term(**params)
-                elif func_name == "search_medical_terms":
-                    result = search_medical_terms(**params)
-                elif func_name == "get_symptom_info":
-                    result = get_symptom_info(**params)
-                elif func_name == "search_symptoms":
-                    result = search_symptoms(**params)
-                elif func_name == "get_treatment_info":
-                    result = get_treatment_info(**params)
-                elif func_name == "search_treatments":
-                    result = search_treatments(**params)
-                elif func_name == "get_healthcare_system_info":
-                    result = get_healthcare_system_info(**params)
-                elif func_name == "search_healthcare_systems":
-                    result = search_healthcare_systems(**params)
-                elif func_name == "get_prevention_info":
-                    result = get_prevention_info(**params)
-                elif func_name == "get_faq":
-                    result = get_faq(**params)
-                else:
-                    result = {"error": "未実装の関数です"}
-
-                # 関数の出力を追加
-                function_outputs.append(
-                    {
-                        "type": "function_call_output",
-                        "call_id": fc.call_id,
-                        "output": json.dumps(result, ensure_ascii=False),
-                    }
-                )
-
-            # ツール出力を含めて最終応答を生成
-            final_response = client.responses.create(
-                model="gpt-4o",
-                instructions=instructions,
-                input=function_outputs,
-                previous_response_id=response.id,
-            )
-
-            return {
-                "status": "success",
-                "message": final_response.output_text,
-                "response_id": final_response.id,
-            }
-
-        # 関数呼び出しがない場合は直接レスポンスを返す
         return {
             "status": "success",
-            "message": response.output_text,
+            "message": response.output_text or BUDGET_EXCEEDED_MESSAGE,
             "response_id": response.id,
+            "trace": trace,
         }
 
     except Exception as e:
@@ -475,6 +179,7 @@ def console_interface():
 
         if response["status"] == "success":
             print(f"アシスタント: {response['message']}\n")
+            print(f"{format_trace(response['trace'])}\n")
             # アシスタントの応答を会話履歴に追加
             conversation_history.append(
                 {
@@ -513,6 +218,12 @@ def chat():
     return jsonify(response)
 
 
+@app.route("/api/cache/stats", methods=["GET"])
+def tool_cache_stats():
+    """ツール結果キャッシュのヒット数・ミス数などの統計を返すエンドポイント"""
+    return jsonify(cache_stats())
+
+
 def web_interface():
     """Webベースのチャットインターフェース"""
     global api_client
@@ -612,6 +323,18 @@ def web_interface():
             color: #999;
             font-style: italic;
         }
+        .trace {
+            margin: -5px 0 15px 0;
+            font-size: 12px;
+            color: #666;
+        }
+        .trace summary {
+            cursor: pointer;
+        }
+        .trace ul {
+            margin: 5px 0;
+            padding-left: 20px;
+        }
         footer {
             text-align: center;
             margin-top: 20px;
@@ -719,6 +442,31 @@ def web_interface():
             chatContainer.scrollTop = chatContainer.scrollHeight;
         }
         
+        function addTrace(trace) {
+            // ツール呼び出しループのトレース（反復ごとの応答時間とツールの実行時間）を表示
+            if (!trace) return;
+            const details = document.createElement('details');
+            details.classList.add('trace');
+            const summary = document.createElement('summary');
+            summary.textContent = `トレース: 反復 ${trace.iterations.length}回 / ツール ${trace.tool_call_count}件 / ` +
+                `${trace.total_tokens} トークン / ${Math.round(trace.total_latency_ms)} ms (${trace.stop_reason}${trace.budget_exhausted ? ': ' + trace.budget_exhausted : ''})`;
+            details.appendChild(summary);
+            const list = document.createElement('ul');
+            trace.iterations.forEach(step => {
+                const item = document.createElement('li');
+                const tools = step.tool_calls.map(call =>
+                    `${call.name} ${call.latency_ms} ms${call.status === 'success' ? '' : '（エラー）'}`
+                );
+                item.textContent = `#${step.iteration} 応答生成 ${Math.round(step.latency_ms)} ms` +
+                    (step.timed_out ? '（タイムアウト）' : '') +
+                    (tools.length ? ` → ${tools.join(', ')}` : '');
+                list.appendChild(item);
+            });
+            details.appendChild(list);
+            chatContainer.appendChild(details);
+            chatContainer.scrollTop = chatContainer.scrollHeight;
+        }
+        
         function addLoadingIndicator() {
             const loadingDiv = document.createElement('div');
             loadingDiv.classList.add('message', 'bot-message', 'loading');
@@ -772,6 +520,7 @@ def web_interface():
                 if (data.status === 'success') {
                     // ボットの応答を表示
                     addMessage(data.message);
+                    addTrace(data.trace);
                     
                     // response_idがある場合は会話履歴に追加
                     if (data.response_id) {
@@ -818,6 +567,7 @@ def web_interface():
 
     # Flaskアプリの起動
     print("Webインターフェースを起動しています...")
+    print(f"プロンプトバージョン: {PROMPT_VERSION}")
     print("以下のURLにアクセスしてください: http://localhost:5004")
     app.run(host="localhost", port=5004, debug=True)
 
@@ -3,8 +3,16 @@
 
 このモジュールでは、医療用語、症状、治療法、医療制度、予防医学、FAQの情報を
 ダミーデータとして定義し、各種検索・取得用の関数を実装しています。
+検索は ranked_collection.RankedCollection による索引付きの検索で行います。
+医療用語の検索では、term_normalizer による表記ゆれの正規化と読み・同義語テーブルを使い、
+漢字・ひらがな・カタカナ・ローマ字・英語名のいずれの表記でも同じ用語に一致させます。
+get_prevention_info の結果は tool_cache でキャッシュします（reload_collections() で破棄）。
 """
 
+from ranked_collection import RankedCollection
+from term_normalizer import build_aliases, expand_query, normalize_term
+from tool_cache import cached_tool, invalidate
+
 # --- ダミーデータ定義 ---
 
 # 医療用語データ
@@ -25,6 +33,18 @@ medical_terms_data = [
     },
 ]
 
+# 医療用語の読み（ひらがな）
+medical_term_readings = {
+    "血糖値": "けっとうち",
+    "高血圧": "こうけつあつ",
+}
+
+# 医療用語の同義語（英語名・略語・言い換えなど）
+medical_term_synonyms = {
+    "血糖値": ["血糖", "グルコース値", "blood sugar", "blood glucose", "BS"],
+    "高血圧": ["高血圧症", "ハイパーテンション", "hypertension", "HT"],
+}
+
 # 症状データ
 symptoms_data = [
     {
@@ -112,6 +132,42 @@ faq_data = [
     },
 ]
 
+# --- 検索インデックス ---
+
+# 各データの検索インデックス（データを変更した場合は reload_collections() で再構築）
+_collections = {}
+
+
+def reload_collections():
+    """データから検索インデックスを構築します。"""
+    global _collections
+    _collections = {
+        "medical_terms": RankedCollection(
+            medical_terms_data,
+            text_fields={"name": 3, "definition": 1},
+            facet_fields=("category",),
+            normalizer=normalize_term,
+            aliases=lambda term: build_aliases(term["name"], medical_term_readings, medical_term_synonyms),
+            query_expander=expand_query,
+        ),
+        "symptoms": RankedCollection(
+            symptoms_data, text_fields={"name": 3, "description": 1}, facet_fields=("body_part",)
+        ),
+        "treatments": RankedCollection(
+            treatments_data, text_fields={"name": 3, "description": 1}, facet_fields=("treatment_type",)
+        ),
+        "healthcare_systems": RankedCollection(
+            healthcare_systems_data, text_fields={"name": 3, "description": 1}, facet_fields=("system_type",)
+        ),
+        "faqs": RankedCollection(
+            faq_data, text_fields={"question": 2, "answer": 1}, facet_fields=("category",)
+        ),
+    }
+    invalidate()
+
+
+reload_collections()
+
 # --- 関数実装 ---
 
 
@@ -119,121 +175,71 @@ def get_medical_term(term_id: str) -> dict:
     """
     指定した医療用語IDに対応する詳細情報を取得します。
     """
-    for term in medical_terms_data:
-        if term["id"] == term_id:
-            return term
+    term = _collections["medical_terms"].get(term_id)
+    if term is not None:
+        return term
     return {"error": "該当する医療用語が見つかりません"}
 
 
-def search_medical_terms(query: str, category: str = None) -> dict:
+def search_medical_terms(query: str, category: str = None, limit: int = None, offset: int = 0) -> dict:
     """
     検索キーワードと任意のカテゴリで医療用語を検索します。
     """
-    results = []
-    query_lower = query.lower()
-    for term in medical_terms_data:
-        if (
-            query_lower in term["name"].lower()
-            or query_lower in term["definition"].lower()
-        ):
-            if category:
-                if term.get("category", "").lower() == category.lower():
-                    results.append(term)
-            else:
-                results.append(term)
-    return {"results": results}
+    return _collections["medical_terms"].search(query, {"category": category}, limit, offset)
 
 
 def get_symptom_info(symptom_id: str) -> dict:
     """
     指定した症状IDに対応する詳細情報を取得します。
     """
-    for symptom in symptoms_data:
-        if symptom["id"] == symptom_id:
-            return symptom
+    symptom = _collections["symptoms"].get(symptom_id)
+    if symptom is not None:
+        return symptom
     return {"error": "該当する症状情報が見つかりません"}
 
 
-def search_symptoms(query: str, body_part: str = None) -> dict:
+def search_symptoms(query: str, body_part: str = None, limit: int = None, offset: int = 0) -> dict:
     """
     検索キーワードと任意の身体部位で症状を検索します。
     """
-    results = []
-    query_lower = query.lower()
-    for symptom in symptoms_data:
-        if (
-            query_lower in symptom["name"].lower()
-            or query_lower in symptom["description"].lower()
-        ):
-            if body_part:
-                if symptom.get("body_part", "").lower() == body_part.lower():
-                    results.append(symptom)
-            else:
-                results.append(symptom)
-    return {"results": results}
+    return _collections["symptoms"].search(query, {"body_part": body_part}, limit, offset)
 
 
 def get_treatment_info(treatment_id: str) -> dict:
     """
     指定した治療法IDに対応する詳細情報を取得します。
     """
-    for treatment in treatments_data:
-        if treatment["id"] == treatment_id:
-            return treatment
+    treatment = _collections["treatments"].get(treatment_id)
+    if treatment is not None:
+        return treatment
     return {"error": "該当する治療法情報が見つかりません"}
 
 
-def search_treatments(query: str, treatment_type: str = None) -> dict:
+def search_treatments(query: str, treatment_type: str = None, limit: int = None, offset: int = 0) -> dict:
     """
     検索キーワードと任意の治療タイプで治療法を検索します。
     """
-    results = []
-    query_lower = query.lower()
-    for treatment in treatments_data:
-        if (
-            query_lower in treatment["name"].lower()
-            or query_lower in treatment["description"].lower()
-        ):
-            if treatment_type:
-                if (
-                    treatment.get("treatment_type", "").lower()
-                    == treatment_type.lower()
-                ):
-                    results.append(treatment)
-            else:
-                results.append(treatment)
-    return {"results": results}
+    return _collections["treatments"].search(query, {"treatment_type": treatment_type}, limit, offset)
 
 
 def get_healthcare_system_info(system_id: str) -> dict:
     """
     指定した医療制度IDに対応する詳細情報を取得します。
     """
-    for system in healthcare_systems_data:
-        if system["id"] == system_id:
-            return system
+    system = _collections["healthcare_systems"].get(system_id)
+    if system is not None:
+        return system
     return {"error": "該当する医療制度情報が見つかりません"}
 
 
-def search_healthcare_systems(query: str, system_type: str = None) -> dict:
+def search_healthcare_systems(query: str, system_type: str = None, limit: int = None, offset: int = 0) -> dict:
     """
     検索キーワードと任意の制度タイプで医療制度を検索します。
     """
-    results = []
-    query_lower = query.lower()
-    for system in healthcare_systems_data:
-        if (
-            query_lower in system["name"].lower()
-            or query_lower in system["description"].lower()
-        ):
-            if system_type:
-                if system.get("system_type", "").lower() == system_type.lower():
-                    results.append(system)
-            else:
-                results.append(system)
-    return {"results": results}
+    return _collections["healthcare_systems"].search(query, {"system_type": system_type}, limit, offset)
 
 
+@cached_tool(ttl=3600)
 def get_prevention_info(disease_type: str = None) -> dict:
     """
     指定した疾患タイプに対応する予防医学情報を取得します。
@@ -255,19 +261,4 @@ def get_faq(query: str = None, category: str = None) -> dict:
     FAQを検索します。検索キーワードまたはカテゴリが指定された場合は、条件に合致するFAQを返します。
     何も指定されない場合は全FAQを返します。
     """
-    results = []
-    for faq in faq_data:
-        match = True
-        if query:
-            query_lower = query.lower()
-            if (
-                query_lower not in faq["question"].lower()
-                and query_lower not in faq["answer"].lower()
-            ):
-                match = False
-        if category:
-            if faq.get("category", "").lower() != category.lower():
-                match = False
-        if match:
-            results.append(faq)
-    return {"results": results}
+    return _collections["faqs"].search(query, {"category": category})
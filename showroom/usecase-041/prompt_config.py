@@ -0,0 +1,288 @@
+"""
+ツール定義とインストラクション
+
+ツール定義とインストラクションはリクエストごとに変わらないため、モジュールの読み込み時に
+一度だけ構築し、変更できない形で共有します。毎回同じ内容を送信することでプロンプトの先頭部分が
+リクエスト間でバイト単位で一致し、サーバー側のプロンプトキャッシュが効きやすくなります。
+内容を変更すると PROMPT_VERSION（内容のハッシュ値）も変わります。
+"""
+
+import hashlib
+import json
+
+
+class FrozenDict(dict):
+    """変更できない辞書（JSONへのシリアライズは通常の辞書と同じ）"""
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("FrozenDict は変更できません")
+
+    __setitem__ = __delitem__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+    def __hash__(self):
+        return hash(json.dumps(self, ensure_ascii=False, sort_keys=True))
+
+
+def freeze(value):
+    """辞書とリストを再帰的に FrozenDict とタプルに変換します。"""
+    if isinstance(value, dict):
+        return FrozenDict((key, freeze(item)) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+# --- ツール定義 ---
+
+
+def setup_tools():
+    """ツール定義を設定します。"""
+    return [
+        {
+            "type": "function",
+            "name": "get_medical_term",
+            "description": "医療用語IDを指定して医療用語の詳細説明を取得します",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "term_id": {
+                        "type": "string",
+                        "description": "医療用語ID（例: TERM-001）",
+                    }
+                },
+                "required": ["term_id"],
+            },
+        },
+        {
+            "type": "function",
+            "name": "search_medical_terms",
+            "description": "キーワードで医療用語を検索します",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "query": {"type": "string", "description": "検索キーワード"},
+                    "category": {
+                        "type": "string",
+                        "description": "用語カテゴリ（anatomy:解剖学, disease:疾病, test:検査, treatment:治療）",
+                    },
+                    "limit": {
+                        "type": "integer",
+                        "minimum": 0,
+                        "description": "取得する件数の上限（関連度の高い順。指定しない場合はすべて）",
+                    },
+                    "offset": {
+                        "type": "integer",
+                        "minimum": 0,
+                        "description": "結果の先頭から読み飛ばす件数（続きを取得する場合に指定）",
+                    },
+                },
+                "required": ["query"],
+            },
+        },
+        {
+            "type": "function",
+            "name": "get_symptom_info",
+            "description": "症状IDを指定して症状の詳細情報を取得します",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "symptom_id": {
+                        "type": "string",
+                        "description": "症状ID（例: SYMP-001）",
+                    }
+                },
+                "required": ["symptom_id"],
+            },
+        },
+        {
+            "type": "function",
+            "name": "search_symptoms",
+            "description": "キーワードで症状を検索します",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "query": {"type": "string", "description": "検索キーワード"},
+                    "body_part": {
+                        "type": "string",
+                        "description": "身体部位（head:頭部, chest:胸部, abdomen:腹部, limbs:四肢, skin:皮膚）",
+                    },
+                    "limit": {
+                        "type": "integer",
+                        "minimum": 0,
+                        "description": "取得する件数の上限（関連度の高い順。指定しない場合はすべて）",
+                    },
+                    "offset": {
+                        "type": "integer",
+                        "minimum": 0,
+                        "description": "結果の先頭から読み飛ばす件数（続きを取得する場合に指定）",
+                    },
+                },
+                "required": ["query"],
+            },
+        },
+        {
+            "type": "function",
+            "name": "get_treatment_info",
+            "description": "治療法IDを指定して治療法の詳細情報を取得します",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "treatment_id": {
+                        "type": "string",
+                        "description": "治療法ID（例: TRT-001）",
+                    }
+                },
+                "required": ["treatment_id"],
+            },
+        },
+        {
+            "type": "function",
+            "name": "search_treatments",
+            "description": "キーワードで治療法を検索します",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "query": {"type": "string", "description": "検索キーワード"},
+                    "treatment_type": {
+                        "type": "string",
+                        "description": "治療タイプ（medication:薬物治療, surgery:手術, physical:理学療法, mental:精神療法）",
+                    },
+                    "limit": {
+                        "type": "integer",
+                        "minimum": 0,
+                        "description": "取得する件数の上限（関連度の高い順。指定しない場合はすべて）",
+                    },
+                    "offset": {
+                        "type": "integer",
+                        "minimum": 0,
+                        "description": "結果の先頭から読み飛ばす件数（続きを取得する場合に指定）",
+                    },
+                },
+                "required": ["query"],
+            },
+        },
+        {
+            "type": "function",
+            "name": "get_healthcare_system_info",
+            "description": "医療制度IDを指定して医療制度の詳細情報を取得します",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "system_id": {
+                        "type": "string",
+                        "description": "制度ID（例: SYS-001）",
+                    }
+                },
+                "required": ["system_id"],
+            },
+        },
+        {
+            "type": "function",
+            "name": "search_healthcare_systems",
+            "description": "キーワードで医療制度を検索します",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "query": {"type": "string", "description": "検索キーワード"},
+                    "system_type": {
+                        "type": "string",
+                        "description": "制度タイプ（insurance:保険, subsidy:助成, welfare:福祉, service:サービス）",
+                    },
+                    "limit": {
+                        "type": "integer",
+                        "minimum": 0,
+                        "description": "取得する件数の上限（関連度の高い順。指定しない場合はすべて）",
+                    },
+                    "offset": {
+                        "type": "integer",
+                        "minimum": 0,
+                        "description": "結果の先頭から読み飛ばす件数（続きを取得する場合に指定）",
+                    },
+                },
+                "required": ["query"],
+            },
+        },
+        {
+            "type": "function",
+            "name": "get_prevention_info",
+            "description": "予防医学の情報を取得します",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "disease_type": {
+                        "type": "string",
+                        "description": "疾患タイプ（lifestyle:生活習慣病, infectious:感染症, mental:精神疾患, other:その他）",
+                    }
+                },
+            },
+        },
+        {
+            "type": "function",
+            "name": "get_faq",
+            "description": "医療に関するよくある質問（FAQ）を検索します",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "query": {"type": "string", "description": "検索キーワード"},
+                    "category": {
+                        "type": "string",
+                        "description": "カテゴリ（general:一般, medication:薬, examination:検査, insurance:保険）",
+                    },
+                },
+            },
+        },
+    ]
+
+
+# --- インストラクション ---
+
+
+def setup_instructions():
+    """アシスタントへの指示（インストラクション）を設定します。"""
+    return """
+    あなたは医療情報の理解を支援するAIアシスタントです。
+    医療用語や情報をわかりやすく説明し、一般の方の健康リテラシー向上をサポートします。
+    
+    以下のガイドラインに従ってください：
+    
+    1. 常に正確で最新の医療情報を提供するよう努める
+    2. 専門用語を使う場合は、必ず平易な言葉で補足説明する
+    3. あなたは診断や具体的な医療アドバイスを提供できない旨を適切に伝える
+    4. 質問に答える際は、適切なツールを使用して情報を取得する
+    5. 答えられない質問や専門的すぎる内容の場合は、専門家への相談を勧める
+    6. 個人の症状や状態に基づく具体的なアドバイスは避け、一般的な情報提供に留める
+    7. 不安を煽る表現や断定的な言い回しは避け、バランスの取れた情報を提供する
+    8. 情報の限界や不確実性について適切に伝える
+    9. Markdownを使って情報を整理して表示する（見出し、箇条書き、太字などを活用）
+    10. 医療情報源や参考文献の重要性を伝え、信頼できる情報源を紹介する
+    
+    ユーザーが以下のような質問をした場合は、対応するツールを使用してください：
+    - 医療用語に関する質問 → get_medical_term または search_medical_terms
+    - 症状に関する質問 → get_symptom_info または search_symptoms
+    - 治療法に関する質問 → get_treatment_info または search_treatments
+    - 医療制度に関する質問 → get_healthcare_system_info または search_healthcare_systems
+    - 予防医学に関する質問 → get_prevention_info
+    - よくある質問 → get_faq
+    
+    必ず以下の免責事項を念頭に置いてください：
+    このサービスは医療アドバイスや診断を提供するものではありません。具体的な症状や健康上の懸念がある場合は、
+    医療専門家に相談することをお勧めします。提供される情報は一般的な教育目的であり、個人の医療判断の代わりにはなりません。
+    """
+
+
+def compute_prompt_version(instructions, tools):
+    """インストラクションとツール定義の内容からバージョンハッシュを計算します。"""
+    payload = json.dumps(
+        {"instructions": instructions, "tools": tools},
+        ensure_ascii=False,
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:12]
+
+
+# モジュール読み込み時に一度だけ構築する共有定義
+TOOLS = freeze(setup_tools())
+INSTRUCTIONS = setup_instructions()
+PROMPT_VERSION = compute_prompt_version(INSTRUCTIONS, TOOLS)
@@ -0,0 +1,192 @@
+"""
+スコア順に検索する索引付きのコレクション
+
+医療用語・症状・治療法・医療制度などのデータを、共通の仕組みで検索するためのクラスを提供します。
+（usecase-040/data_store.py の IndexedCollection はビットマップで絞り込んで元の順序で返すクラスで、
+こちらはキーワードの一致をスコアにして上位k件を返すクラスです）
+
+- 文字バイグラムの転置インデックスでキーワードに一致する候補を絞り込み（日本語に対応）
+- カテゴリ・身体部位などのファセットによる絞り込み（大文字・小文字を区別しない）
+- フィールドごとの重みによるスコアリングと上位k件の取得
+- 読み・同義語などの別名の索引と、検索キーワードの複数の表記での照合
+- offset / limit によるページング
+"""
+
+import heapq
+import unicodedata
+from collections import defaultdict
+
+
+def normalize_text(text):
+    """検索用にテキストを正規化します（NFKC正規化 + 小文字化）。"""
+    if not text:
+        return ""
+    return unicodedata.normalize("NFKC", str(text)).lower()
+
+
+def iter_bigrams(text):
+    """正規化済みテキストから文字バイグラムを生成します（空白をまたぐバイグラムは除外）。"""
+    for word in text.split():
+        for i in range(len(word) - 1):
+            yield word[i : i + 2]
+
+
+class RankedCollection:
+    """
+    キーワードの一致をスコアにして検索する索引付きのレコードコレクション
+
+    Args:
+        records (list): レコード（辞書）のリスト
+        text_fields (dict): キーワード検索の対象フィールドと重み（例: {"name": 3, "description": 1}）
+        facet_fields (tuple): 絞り込みに使うフィールド（カテゴリ、タイプなど）
+        id_field (str): ID フィールド名
+        normalizer (callable): テキストと検索キーワードの正規化関数
+        aliases (callable, optional): レコードから別名（読み・同義語など）のリストを返す関数
+        alias_weight (int): 別名に一致した場合の重み
+        query_expander (callable, optional): 検索キーワードから照合する表記のリストを返す関数
+            （未指定の場合は normalizer で正規化したキーワードのみで照合）
+    """
+
+    # 名前などの先頭フィールドがキーワードと完全一致・前方一致した場合の加点
+    EXACT_MATCH_BONUS = 100
+    PREFIX_MATCH_BONUS = 10
+
+    def __init__(
+        self,
+        records,
+        text_fields,
+        facet_fields=(),
+        id_field="id",
+        normalizer=normalize_text,
+        aliases=None,
+        alias_weight=2,
+        query_expander=None,
+    ):
+        self.records = list(records)
+        self.text_fields = dict(text_fields)
+        self.normalizer = normalizer
+        self.aliases = aliases
+        self.query_expander = query_expander
+        self._weights = tuple(self.text_fields.values()) + ((alias_weight,) if aliases else ())
+        self.by_id = {record[id_field]: record for record in self.records if id_field in record}
+
+        self._texts = []
+        self._postings = defaultdict(set)
+        self._facets = {field: defaultdict(set) for field in facet_fields}
+
+        for pos, record in enumerate(self.records):
+            texts = tuple(self._field_texts(record, field) for field in self.text_fields)
+            if aliases:
+                # 別名は索引構築時に正規化しておき、検索時は正規化済みの形と照合する
+                texts += (tuple(self.normalizer(alias) for alias in aliases(record) if alias),)
+            self._texts.append(texts)
+            for field_texts in texts:
+                for text in field_texts:
+                    for gram in iter_bigrams(text):
+                        self._postings[gram].add(pos)
+            for field, values in self._facets.items():
+                values[normalize_text(record.get(field))].add(pos)
+
+    def __len__(self):
+        return len(self.records)
+
+    def _field_texts(self, record, field):
+        """レコードのフィールド値を正規化済みテキストのタプルに変換します。"""
+        value = record.get(field)
+        values = value if isinstance(value, (list, tuple)) else [value]
+        return tuple(self.normalizer(v) for v in values if v)
+
+    def get(self, record_id):
+        """IDを指定してレコードを取得します。見つからない場合は None を返します。"""
+        return self.by_id.get(record_id)
+
+    def _terms(self, query):
+        """検索キーワードを照合する表記のリストに変換します。"""
+        if not query:
+            return [""]
+        if self.query_expander:
+            return list(self.query_expander(query)) or [""]
+        return [self.normalizer(query).strip()]
+
+    def _candidates(self, terms, filters):
+        """キーワードとファセットの条件から候補のレコード位置を求めます（いずれかの表記に一致する候補）。"""
+        doc_sets = []
+        for field, value in filters.items():
+            doc_sets.append(self._facets[field].get(normalize_text(value), set()))
+
+        term_docs = None
+        for term in terms:
+            grams = set(iter_bigrams(term))
+            if not grams:
+                # バイグラムを作れない短い表記はインデックスで絞り込めない
+                term_docs = None
+                break
+            postings = [self._postings.get(gram, set()) for gram in grams]
+            matched = min(postings, key=len).intersection(*postings)
+            term_docs = matched if term_docs is None else term_docs | matched
+        if term_docs is not None:
+            doc_sets.append(term_docs)
+
+        if not doc_sets:
+            return range(len(self.records))
+        doc_sets.sort(key=len)
+        return doc_sets[0].intersection(*doc_sets[1:])
+
+    def _score_terms(self, pos, terms):
+        """複数の表記のうち、最も高いスコアを返します。"""
+        return max(self._score(pos, term) for term in terms)
+
+    def _score(self, pos, term):
+        """キーワードに一致したフィールドの重みからスコアを計算します（一致しない場合は0）。"""
+        if not term:
+            return 1
+        score = 0
+        for weight, field_texts in zip(self._weights, self._texts[pos]):
+            for text in field_texts:
+                if term in text:
+                    score += weight
+                    if text == term:
+                        score += self.EXACT_MATCH_BONUS
+                    elif text.startswith(term):
+                        score += self.PREFIX_MATCH_BONUS
+        return score
+
+    def search(self, query=None, filters=None, limit=None, offset=0):
+        """
+        キーワードとファセットでレコードを検索し、スコアの高い順に返します。
+
+        Args:
+            query (str, optional): 検索キーワード（未指定の場合はファセットのみで絞り込み）
+            filters (dict, optional): ファセットのフィールド名と値の対応（値が空の条件は無視）
+            limit (int, optional): 返す件数の上限（上位k件、0以上）
+            offset (int): 結果の先頭から読み飛ばす件数（0以上）
+
+        Returns:
+            dict: results（検索結果のリスト）と total（一致した総件数）
+
+        Raises:
+            ValueError: limit または offset が負の値の場合
+        """
+        if limit is not None and limit < 0:
+            raise ValueError("limit は0以上を指定してください")
+        if offset < 0:
+            raise ValueError("offset は0以上を指定してください")
+        terms = self._terms(query)
+        filters = {field: value for field, value in (filters or {}).items() if value}
+
+        ranked = []
+        for pos in self._candidates(terms, filters):
+            score = self._score_terms(pos, terms)
+            if score:
+                ranked.append((-score, pos))
+
+        if limit is None:
+            ranked.sort()
+            page = ranked[offset:]
+        else:
+            page = heapq.nsmallest(offset + limit, ranked)[offset:]
+
+        return {
+            "results": [self.records[pos] for _, pos in page],
+            "total": len(ranked),
+        }
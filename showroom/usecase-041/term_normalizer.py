@@ -0,0 +1,170 @@
+"""
+医療用語の表記ゆれの正規化
+
+ユーザーは医療用語を漢字・ひらがな・カタカナ・ローマ字など様々な表記で入力するため、
+検索前に以下の正規化を行い、同じ語が同じ形になるように揃えます。
+
+- NFKC正規化（全角英数字・半角カタカナの統一）と小文字化
+- カタカナをひらがなに変換（「ケットウチ」→「けっとうち」）
+- 長音符・促音・オ段の長音「う」を除去（「こうけつあつ」と「こけつあつ」を同一視）
+- ローマ字のクエリをひらがなに変換（「kouketsuatsu」→「こうけつあつ」）
+
+漢字の読みや同義語（英語名・略語など）は同義語テーブルから索引構築時に展開して保持するため、
+検索時に辞書を引く必要はありません。
+"""
+
+import re
+import unicodedata
+
+# 長音・促音として読み飛ばす文字
+_SKIPPED_KANA = frozenset("ーっ")
+# 直後の「う」を長音として読み飛ばすオ段の文字
+_O_ROW_KANA = frozenset("おこそとのほもよろごぞどぼぽょ")
+
+_ROMAJI_TABLE = {
+    "a": "あ", "i": "い", "u": "う", "e": "え", "o": "お",
+    "ka": "か", "ki": "き", "ku": "く", "ke": "け", "ko": "こ",
+    "ga": "が", "gi": "ぎ", "gu": "ぐ", "ge": "げ", "go": "ご",
+    "sa": "さ", "si": "し", "shi": "し", "su": "す", "se": "せ", "so": "そ",
+    "za": "ざ", "zi": "じ", "ji": "じ", "zu": "ず", "ze": "ぜ", "zo": "ぞ",
+    "ta": "た", "ti": "ち", "chi": "ち", "tu": "つ", "tsu": "つ", "te": "て", "to": "と",
+    "da": "だ", "di": "ぢ", "du": "づ", "de": "で", "do": "ど",
+    "na": "な", "ni": "に", "nu": "ぬ", "ne": "ね", "no": "の",
+    "ha": "は", "hi": "ひ", "hu": "ふ", "fu": "ふ", "he": "へ", "ho": "ほ",
+    "ba": "ば", "bi": "び", "bu": "ぶ", "be": "べ", "bo": "ぼ",
+    "pa": "ぱ", "pi": "ぴ", "pu": "ぷ", "pe": "ぺ", "po": "ぽ",
+    "ma": "ま", "mi": "み", "mu": "む", "me": "め", "mo": "も",
+    "ya": "や", "yu": "ゆ", "yo": "よ",
+    "ra": "ら", "ri": "り", "ru": "る", "re": "れ", "ro": "ろ",
+    "la": "ら", "li": "り", "lu": "る", "le": "れ", "lo": "ろ",
+    "wa": "わ", "wo": "を",
+    "kya": "きゃ", "kyu": "きゅ", "kyo": "きょ",
+    "gya": "ぎゃ", "gyu": "ぎゅ", "gyo": "ぎょ",
+    "sha": "しゃ", "shu": "しゅ", "sho": "しょ", "sya": "しゃ", "syu": "しゅ", "syo": "しょ",
+    "ja": "じゃ", "ju": "じゅ", "jo": "じょ", "zya": "じゃ", "zyu": "じゅ", "zyo": "じょ",
+    "cha": "ちゃ", "chu": "ちゅ", "cho": "ちょ", "tya": "ちゃ", "tyu": "ちゅ", "tyo": "ちょ",
+    "nya": "にゃ", "nyu": "にゅ", "nyo": "にょ",
+    "hya": "ひゃ", "hyu": "ひゅ", "hyo": "ひょ",
+    "bya": "びゃ", "byu": "びゅ", "byo": "びょ",
+    "pya": "ぴゃ", "pyu": "ぴゅ", "pyo": "ぴょ",
+    "mya": "みゃ", "myu": "みゅ", "myo": "みょ",
+    "rya": "りゃ", "ryu": "りゅ", "ryo": "りょ",
+    "fa": "ふぁ", "fi": "ふぃ", "fe": "ふぇ", "fo": "ふぉ",
+    "she": "しぇ", "je": "じぇ", "che": "ちぇ",
+    "-": "ー",
+}
+_ROMAJI_MAX_LEN = max(len(key) for key in _ROMAJI_TABLE)
+_VOWELS = frozenset("aeiou")
+_ROMAJI_PATTERN = re.compile(r"^[a-z'\-]+$")
+
+
+def normalize_width(text):
+    """NFKC正規化と小文字化を行います（全角英数字・半角カタカナを統一）。"""
+    if not text:
+        return ""
+    return unicodedata.normalize("NFKC", str(text)).lower()
+
+
+def katakana_to_hiragana(text):
+    """カタカナをひらがなに変換します。"""
+    return "".join(chr(ord(c) - 0x60) if "ァ" <= c <= "ヶ" else c for c in text)
+
+
+def fold_kana(text):
+    """長音符・促音・オ段の長音「う」を除去し、表記ゆれの少ない読みの形にします。"""
+    folded = []
+    for c in text:
+        if c in _SKIPPED_KANA:
+            continue
+        if c == "う" and folded and folded[-1] in _O_ROW_KANA:
+            continue
+        folded.append(c)
+    return "".join(folded)
+
+
+def romaji_to_hiragana(text):
+    """
+    ローマ字（ヘボン式・訓令式）をひらがなに変換します。
+
+    Args:
+        text (str): 小文字に正規化済みのテキスト
+
+    Returns:
+        str | None: 変換したひらがな（ローマ字として解釈できない場合は None）
+    """
+    if not _ROMAJI_PATTERN.match(text):
+        return None
+
+    kana = []
+    i = 0
+    while i < len(text):
+        c = text[i]
+        nxt = text[i + 1] if i + 1 < len(text) else ""
+        if c == "n" and nxt == "'":
+            kana.append("ん")
+            i += 2
+            continue
+        if c == "n" and (nxt == "n" or not nxt or (nxt not in _VOWELS and nxt != "y")):
+            kana.append("ん")
+            i += 1
+            continue
+        if (c == nxt and c not in _VOWELS) or (c == "t" and nxt == "c"):
+            kana.append("っ")
+            i += 1
+            continue
+        for size in range(_ROMAJI_MAX_LEN, 0, -1):
+            chunk = text[i : i + size]
+            if chunk in _ROMAJI_TABLE:
+                kana.append(_ROMAJI_TABLE[chunk])
+                i += size
+                break
+        else:
+            return None
+    return "".join(kana)
+
+
+def normalize_term(text):
+    """索引と検索キーワードの共通の正規化（NFKC・小文字化・ひらがな化・長音などの除去）。"""
+    return fold_kana(katakana_to_hiragana(normalize_width(text)))
+
+
+def expand_query(query):
+    """
+    検索キーワードを照合用の形のリストに変換します。
+
+    ローマ字として読めるキーワードは、そのままの形（英語名・略語との照合用）に加えて
+    ひらがなに変換した形（読みとの照合用）も返します。
+
+    Returns:
+        list: 正規化済みの検索キーワード（重複なし）
+    """
+    term = normalize_term(query).strip()
+    if not term:
+        return []
+    forms = [term]
+    words = [romaji_to_hiragana(word) for word in term.split()]
+    if all(words):
+        reading = fold_kana(" ".join(words))
+        if reading != term:
+            forms.append(reading)
+    return forms
+
+
+def build_aliases(name, readings=None, synonyms=None):
+    """
+    レコードの名前に対応する読み・同義語の一覧を作成します。
+
+    Args:
+        name (str): レコードの名前（同義語テーブルのキー）
+        readings (dict, optional): 名前 → 読み（ひらがな）の対応
+        synonyms (dict, optional): 名前 → 同義語のリストの対応
+
+    Returns:
+        list: 読みと同義語のリスト
+    """
+    aliases = []
+    if readings and name in readings:
+        aliases.append(readings[name])
+    if synonyms:
+        aliases.extend(synonyms.get(name, ()))
+    return aliases
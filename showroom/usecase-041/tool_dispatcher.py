@@ -0,0 +1,166 @@
+"""
+ツール呼び出しのディスパッチャー
+
+モデルが1回の応答で複数の function_call を返した場合に、登録済みのツール関数を
+スレッドプールで並行に実行します。実際のバックエンド（注文状況、在庫など）は
+I/O待ちが中心のため、並行に実行することでツール呼び出し全体の待ち時間を
+最も遅い呼び出し1回分に近づけることができます。
+
+usecase-030/tool_dispatcher.py のコピーです。変更はコピー元に行い、このファイルにも反映してください。
+"""
+
+import json
+import threading
+import time
+from concurrent.futures import CancelledError, ThreadPoolExecutor, TimeoutError as FutureTimeoutError, wait
+
+# 待ち行列にあるツール呼び出しが実行を開始したかを確認する間隔（秒）
+START_POLL_INTERVAL = 0.05
+
+
+class ToolRegistry:
+    """
+    ツール関数の登録と並行実行を行うレジストリ
+
+    Args:
+        max_workers (int): 同時に実行するツール呼び出しの上限
+        default_timeout (float): ツールごとのタイムアウトが未指定の場合に使う秒数
+        queue_timeout (float): スレッドの空きを待つ時間の上限（秒）。タイムアウトしたツールがスレッドを
+            占有し続けても、後続の呼び出しは queue_timeout + ツールのタイムアウト以内に結果を返す
+    """
+
+    def __init__(self, max_workers=4, default_timeout=10.0, queue_timeout=30.0):
+        self.max_workers = max_workers
+        self.default_timeout = default_timeout
+        self.queue_timeout = queue_timeout
+        self._tools = {}
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def register(self, name, func, timeout=None):
+        """ツール関数を登録します。"""
+        self._tools[name] = (func, timeout or self.default_timeout)
+
+    def tool(self, name=None, timeout=None):
+        """ツール関数を登録するデコレーター"""
+
+        def decorator(func):
+            self.register(name or func.__name__, func, timeout)
+            return func
+
+        return decorator
+
+    def __contains__(self, name):
+        return name in self._tools
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="tool"
+                )
+            return self._executor
+
+    def call(self, name, arguments):
+        """
+        ツール関数を同期的に呼び出します。
+
+        Args:
+            name (str): ツール名
+            arguments (str | dict): JSON文字列または辞書形式の引数
+
+        Returns:
+            dict: ツールの実行結果（失敗時は error キーを含む辞書）
+        """
+        if name not in self._tools:
+            return {"error": "未実装の関数です"}
+        func, _ = self._tools[name]
+        try:
+            params = json.loads(arguments) if isinstance(arguments, str) else dict(arguments or {})
+        except (TypeError, ValueError) as e:
+            return {"error": f"引数の解析に失敗しました: {str(e)}"}
+        try:
+            return func(**params)
+        except Exception as e:
+            return {"error": f"{name} の実行中にエラーが発生しました: {str(e)}"}
+
+    def _call_timed(self, started, name, arguments):
+        """実行を開始した時刻を started に追加してから、ツール関数を呼び出します（終了した時刻も追加）。"""
+        started.append(time.monotonic())
+        try:
+            return self.call(name, arguments)
+        finally:
+            started.append(time.monotonic())
+
+    def _result(self, future, started, timeout, queue_deadline):
+        """
+        ツールの実行を開始してから timeout 秒まで future の完了を待ち、結果を返します。
+
+        スレッドの空きを待っている間は timeout に含めず、queue_deadline までに実行を開始しなかった
+        呼び出しは取り消して FutureTimeoutError を送出します。
+        """
+        while not started and not future.done():
+            if time.monotonic() >= queue_deadline and future.cancel():
+                raise FutureTimeoutError()
+            wait([future], timeout=START_POLL_INTERVAL)
+        if not started:
+            return future.result()
+        return future.result(timeout=max(0.0, started[0] + timeout - time.monotonic()))
+
+    def dispatch(self, function_calls, timings=None):
+        """
+        複数の function_call を並行に実行し、function_call_output のリストを返します。
+
+        出力の順序は function_calls の順序と同じです。タイムアウトしたツールは
+        エラー内容を出力として返すため、他のツールの結果は失われません。
+        ツールごとのタイムアウトは、そのツールの実行を開始した時点から数えます
+        （同時実行の上限 max_workers を超えて待ち行列で待つ時間は含めない）。
+        待ち行列で queue_timeout 秒を超えて待った呼び出しも、タイムアウトとして出力します。
+
+        Args:
+            function_calls (list): Responses APIの function_call アイテムのリスト
+            timings (list, optional): 各呼び出しの実行時間（ミリ秒、実行を開始しなかった場合は 0）を
+                function_calls の順序で追加するリスト
+
+        Returns:
+            list: function_call_output 形式の辞書のリスト
+        """
+        if not function_calls:
+            return []
+
+        executor = self._get_executor()
+        submitted = []
+        queue_deadline = time.monotonic() + self.queue_timeout
+        for fc in function_calls:
+            _, timeout = self._tools.get(fc.name, (None, self.default_timeout))
+            started = []
+            future = executor.submit(self._call_timed, started, fc.name, fc.arguments)
+            submitted.append((fc, future, started, timeout))
+
+        function_outputs = []
+        for fc, future, started, timeout in submitted:
+            try:
+                result = self._result(future, started, timeout, queue_deadline)
+            except FutureTimeoutError:
+                result = {"error": f"{fc.name} の実行がタイムアウトしました"}
+            except CancelledError:
+                result = {"error": f"{fc.name} の実行が取り消されました"}
+            if timings is not None:
+                end = started[1] if len(started) > 1 else time.monotonic()
+                timings.append(round((end - started[0]) * 1000, 1) if started else 0.0)
+
+            function_outputs.append(
+                {
+                    "type": "function_call_output",
+                    "call_id": fc.call_id,
+                    "output": json.dumps(result, ensure_ascii=False),
+                }
+            )
+        return function_outputs
+
+    def shutdown(self):
+        """スレッドプールを停止します。"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None